@@ -0,0 +1,105 @@
+import random
+from pathlib import Path
+
+BASES = 'ACGT'
+
+
+def write_gtf(gtf_file, genes=1000, transcripts=3, exons=4, chroms=5):
+    """
+    Write a gencode-like GTF: each gene followed by its transcripts, each transcript followed by its exons
+    """
+    genes_per_chrom = max(1, genes // chroms)
+    with open(gtf_file, 'w') as gtf:
+        gtf.write("##description: synthetic benchmark annotation\n")
+        for gene in range(genes):
+            chrom = "chr{}".format(gene // genes_per_chrom + 1)
+            start = (gene % genes_per_chrom) * 10000 + 1
+            strand = '+' if gene % 2 else '-'
+            gene_id = 'ENSG{:011d}.1'.format(gene)
+            gene_attributes = 'gene_id "{}"; gene_name "GENE{}";'.format(gene_id, gene)
+            gtf.write("{}\tHAVANA\tgene\t{}\t{}\t.\t{}\t.\t{}\n".format(chrom, start, start + 8999, strand, gene_attributes))
+            for transcript in range(transcripts):
+                transcript_attributes = '{} transcript_id "ENST{:011d}.1"; transcript_name "GENE{}-{}";'.format(
+                    gene_attributes, gene * transcripts + transcript, gene, 201 + transcript
+                )
+                transcript_start = start + transcript * 100
+                gtf.write("{}\tHAVANA\ttranscript\t{}\t{}\t.\t{}\t.\t{}\n".format(
+                    chrom, transcript_start, start + 8999, strand, transcript_attributes
+                ))
+                for exon in range(exons):
+                    exon_start = transcript_start + exon * 2000
+                    gtf.write("{}\tHAVANA\texon\t{}\t{}\t.\t{}\t.\t{}\n".format(
+                        chrom, exon_start, exon_start + 499, strand, transcript_attributes
+                    ))
+    return Path(gtf_file)
+
+
+def write_bed(bed_file, regions=10000, chroms=5, seed=0):
+    """
+    Write an unsorted BED of random, partly overlapping regions
+    """
+    rng = random.Random(seed)
+    with open(bed_file, 'w') as bed:
+        bed.write("track name=benchmark\n")
+        for region in range(regions):
+            start = rng.randrange(0, 10000000)
+            bed.write("chr{}\t{}\t{}\tregion{}\n".format(rng.randrange(chroms) + 1, start, start + rng.randrange(50, 500), region))
+    return Path(bed_file)
+
+
+def write_fasta(fasta_file, chroms=5, length=100000, line_width=60, seed=0):
+    rng = random.Random(seed)
+    with open(fasta_file, 'w') as fasta:
+        for chrom in range(chroms):
+            fasta.write(">chr{}\n".format(chrom + 1))
+            sequence = ''.join(rng.choice(BASES) for _ in range(length))
+            for start in range(0, length, line_width):
+                fasta.write(sequence[start:start + line_width] + "\n")
+    return Path(fasta_file)
+
+
+def write_config(config_file, sections=50, options=20):
+    with open(config_file, 'w') as config:
+        for section in range(sections):
+            config.write("[SECTION_{}]\n".format(section))
+            for option in range(options):
+                config.write("option_{} = value_{}_{}\n".format(option, section, option))
+            config.write("\n")
+    return Path(config_file)
+
+
+def write_parameter_files(parameter_dir, files=1000):
+    """
+    Per-sample parameter files, one in ten invalid
+    """
+    Path(parameter_dir).mkdir(parents=True, exist_ok=True)
+    for sample in range(files):
+        mincov = -1 if sample % 10 == 0 else sample
+        Path(parameter_dir, 'sample_{}.ini'.format(sample)).write_text(
+            "[ANALYSIS]\nmincov = {}\nminfreq = 5\ncaller = vardict\n".format(mincov)
+        )
+    return Path(parameter_dir)
+
+
+def build_reference_dir(reference_dir, entries=10000, gencode_version=38, bams=100):
+    """
+    Reference directory with the files PipelineParameters looks for, drowned in <entries> other files:
+    one fasta, one bed, the gtf and collapsed gtf, and the UHRR BAMs
+    """
+    reference_dir = Path(reference_dir)
+    gtf_dir = Path(reference_dir, 'gtf')
+    uhrr_dir = Path(reference_dir, 'UHRR_v{}'.format(gencode_version))
+    for directory in [reference_dir, gtf_dir, uhrr_dir]:
+        directory.mkdir(parents=True, exist_ok=True)
+    for entry in range(entries):
+        Path(reference_dir, 'annotation_{}.txt'.format(entry)).touch()
+    for entry in range(entries // 10):
+        Path(gtf_dir, 'gencode.v{}.annotation.gff3'.format(entry)).touch()
+    for bam in range(bams):
+        Path(uhrr_dir, 'UHRR_{}.bam'.format(bam)).touch()
+        Path(uhrr_dir, 'UHRR_{}.bam.bai'.format(bam)).touch()
+    Path(reference_dir, 'genome.fa').touch()
+    Path(reference_dir, 'panel.bed').touch()
+    Path(gtf_dir, 'gencode.v{}.annotation.gtf'.format(gencode_version)).touch()
+    Path(gtf_dir, 'gencode.v{}.collapsed.gtf'.format(gencode_version)).touch()
+    return reference_dir
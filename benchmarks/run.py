@@ -0,0 +1,416 @@
+import argparse
+import datetime
+import json
+import logging
+import os
+import platform
+import random
+import statistics
+import sys
+import tempfile
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from schematics.models import Model
+from schematics.types import FloatType, IntType, StringType
+from bioit_module import BioitLauncher, CommandParser, PipelineParameters
+from bioit_module.__version__ import __version__
+from benchmarks import fixtures
+
+# The core benchmarks only use the 2.4.0 API so a 2.4.0 install can be measured: modules added since are imported
+# in the benchmark setup, and a benchmark raising ImportError or SkipBenchmark is reported as skipped
+BENCHMARKS = {}
+
+
+class SkipBenchmark(Exception):
+    pass
+
+
+def benchmark(name):
+    """
+    Register a benchmark: a function of the BenchmarkContext returning the function to time.
+    Setup done before returning is not timed.
+    """
+    def register(setup):
+        BENCHMARKS[name] = setup
+        return setup
+    return register
+
+
+class BenchmarkContext:
+    """
+    Synthetic fixtures shared by the benchmarks, written once in a work directory
+    """
+    def __init__(self, work_dir, scale=1.0):
+        self.work_dir = Path(work_dir)
+        self.scale = scale
+        self._fixtures = {}
+
+    def size(self, size):
+        return max(1, int(size * self.scale))
+
+    def fixture(self, name, build):
+        if name not in self._fixtures:
+            self._fixtures[name] = build(Path(self.work_dir, name))
+        return self._fixtures[name]
+
+    @property
+    def reference_dir(self):
+        return self.fixture('reference', lambda path: fixtures.build_reference_dir(path, entries=self.size(10000)))
+
+    @property
+    def gtf_file(self):
+        return self.fixture('gencode.v38.annotation.gtf', lambda path: fixtures.write_gtf(path, genes=self.size(2000)))
+
+    @property
+    def bed_file(self):
+        return self.fixture('panel.bed', lambda path: fixtures.write_bed(path, regions=self.size(20000)))
+
+    @property
+    def fasta_file(self):
+        return self.fixture('genome.fa', lambda path: fixtures.write_fasta(path, length=self.size(200000)))
+
+    @property
+    def params_file(self):
+        return self.fixture('params.ini', lambda path: fixtures.write_config(path))
+
+    @property
+    def pipe_params_file(self):
+        def write(path):
+            path.write_text("[PIPE_CONFIG]\ngencode_version = 38\n")
+            return path
+        return self.fixture('pipe.ini', write)
+
+    def launcher_argv(self):
+        return [
+            '-o', str(Path(self.work_dir, 'out', 'sample')), '-p', str(self.params_file),
+            '--pipe_params', str(self.pipe_params_file), '--reference_dir', str(self.reference_dir),
+        ]
+
+
+class BenchmarkCommandParser(CommandParser):
+    option_count = 200
+
+    def __init__(self):
+        super().__init__("1.0", need_pipeline_parameters=True)
+
+    def set_custom_option(self):
+        for option in range(self.option_count):
+            self.parser.add_argument("--option-{}".format(option), dest="option_{}".format(option),
+                                     type=self._is_valid_integer)
+
+
+class BenchmarkLauncher(BioitLauncher):
+    def read_parameters(self):
+        return self._read_config_file(self.args.params)
+
+    def launch(self):
+        pass
+
+
+@contextmanager
+def command_line(argv):
+    """
+    Run with sys.argv set to argv: 2.4.0 CommandParser.parse() only reads sys.argv
+    """
+    original_argv = sys.argv
+    sys.argv = ['benchmark'] + list(argv)
+    try:
+        yield
+    finally:
+        sys.argv = original_argv
+
+
+def get_reference_catalog():
+    """
+    ReferenceCatalog class, None if the installed bioit_module has no catalog
+    """
+    try:
+        from bioit_module.reference_catalog import ReferenceCatalog
+    except ImportError:
+        return None
+    return ReferenceCatalog
+
+
+def clear_reference_catalog():
+    reference_catalog = get_reference_catalog()
+    if reference_catalog is not None:
+        reference_catalog.clear()
+
+
+@benchmark("command_parser.parse")
+def bench_parse(context):
+    command_parser = BenchmarkCommandParser()
+    argv = context.launcher_argv()
+    for option in range(BenchmarkCommandParser.option_count):
+        argv += ["--option-{}".format(option), str(option)]
+
+    def parse():
+        with command_line(argv):
+            command_parser.parse()
+    return parse
+
+
+def _launcher_benchmark(context, cache_configs):
+    command_parser = BenchmarkCommandParser()
+    argv = context.launcher_argv()
+    launcher_class = type('BenchmarkLauncher', (BenchmarkLauncher,), {'cache_configs': cache_configs})
+    # Launchers log to the root logger, which isn't configured again once it has a handler
+    logging.getLogger().addHandler(logging.NullHandler())
+
+    def construct():
+        clear_reference_catalog()
+        with command_line(argv):
+            launcher_class(command_parser)
+    return construct
+
+
+@benchmark("launcher.construction")
+def bench_launcher(context):
+    return _launcher_benchmark(context, cache_configs=False)
+
+
+@benchmark("launcher.construction_cached_configs")
+def bench_launcher_cached(context):
+    if not hasattr(BioitLauncher, 'cache_configs'):
+        raise SkipBenchmark("BioitLauncher has no config cache")
+    return _launcher_benchmark(context, cache_configs=True)
+
+
+@benchmark("launcher.read_config_file")
+def bench_read_config_file(context):
+    launcher = BioitLauncher.__new__(BioitLauncher)
+    params_file = str(context.params_file)
+    return lambda: launcher._read_config_file(params_file)
+
+
+def _pipeline_parameters(context):
+    parameters = PipelineParameters()
+    parameters.reference_dir = str(context.reference_dir)
+    parameters.gencode_version = '38'
+    parameters.validate()
+    return parameters
+
+
+def _get_all(parameters):
+    parameters.get_fasta_ref()
+    parameters.get_bed_ref()
+    parameters.get_gtf_file()
+    parameters.get_gtf_collapse_file()
+    parameters.get_UHRR_bam()
+
+
+class BenchmarkParameters(Model):
+    mincov = IntType(required=True, min_value=0)
+    minfreq = FloatType(required=True, min_value=0, max_value=100)
+    caller = StringType(default="mutect", choices=["mutect", "vardict"])
+
+
+@benchmark("bulk_validation.validate")
+def bench_bulk_validation(context):
+    from bioit_module.bulk_validation import BulkValidator
+    parameter_dir = context.fixture('sample_parameters', lambda path: fixtures.write_parameter_files(
+        path, context.size(2000)
+    ))
+    validator = BulkValidator(BenchmarkParameters, section='ANALYSIS')
+    return lambda: validator.validate(parameter_dir)
+
+
+@benchmark("pipeline_parameters.get_all_cold")
+def bench_get_all_cold(context):
+    parameters = _pipeline_parameters(context)
+    reference_catalog = get_reference_catalog()
+    if reference_catalog is None:
+        # Without catalog every lookup lists the reference directory
+        return lambda: _get_all(parameters)
+    manifest_file = reference_catalog(parameters.reference_dir).manifest_file
+
+    def get_all():
+        reference_catalog.clear()
+        if manifest_file.exists():
+            manifest_file.unlink()
+        _get_all(parameters)
+    return get_all
+
+
+@benchmark("pipeline_parameters.get_all_manifest")
+def bench_get_all_manifest(context):
+    reference_catalog = get_reference_catalog()
+    if reference_catalog is None:
+        raise SkipBenchmark("bioit_module has no reference catalog")
+    parameters = _pipeline_parameters(context)
+    _get_all(parameters)
+
+    def get_all():
+        reference_catalog.clear()
+        _get_all(parameters)
+    return get_all
+
+
+@benchmark("pipeline_parameters.get_all_warm")
+def bench_get_all_warm(context):
+    parameters = _pipeline_parameters(context)
+    _get_all(parameters)
+    return lambda: _get_all(parameters)
+
+
+@benchmark("gtf_index.build")
+def bench_gtf_build(context):
+    from bioit_module.gtf_index import GtfIndex
+    gtf_file = str(context.gtf_file)
+    index_file = str(Path(context.work_dir, 'benchmark.bioidx'))
+    return lambda: GtfIndex.build(gtf_file, index_file)
+
+
+@benchmark("gtf_index.lookup_overlap")
+def bench_gtf_lookup(context):
+    from bioit_module.gtf_index import GtfIndex
+    index = GtfIndex.open(context.gtf_file)
+    rng = random.Random(0)
+    genes = context.size(2000)
+    gene_ids = ['ENSG{:011d}.1'.format(rng.randrange(genes)) for _ in range(1000)]
+    chroms = index.get_chroms()
+    intervals = [(rng.choice(chroms), rng.randrange(1, 4000000)) for _ in range(1000)]
+
+    def lookup_overlap():
+        for gene_id in gene_ids:
+            index.lookup(gene_id)
+        for chrom, start in intervals:
+            index.overlap(chrom, start, start + 1000)
+    return lookup_overlap
+
+
+@benchmark("fasta_reference.build_fai")
+def bench_build_fai(context):
+    from bioit_module.fasta_reference import FastaReference
+    fasta_file = str(context.fasta_file)
+    fai_file = str(Path(context.work_dir, 'benchmark.fai'))
+    return lambda: FastaReference.build_fai(fasta_file, fai_file)
+
+
+@benchmark("fasta_reference.fetch")
+def bench_fetch(context):
+    from bioit_module.fasta_reference import FastaReference
+    fasta = FastaReference(context.fasta_file)
+    rng = random.Random(0)
+    length = context.size(200000)
+    intervals = []
+    for _ in range(1000):
+        start = rng.randrange(length)
+        intervals.append((rng.choice(fasta.references), start, start + 150))
+    return lambda: [fasta.fetch(*interval) for interval in intervals]
+
+
+@benchmark("bed_regions.parse")
+def bench_bed_parse(context):
+    from bioit_module.bed_regions import BedRegions
+    bed_file = str(context.bed_file)
+    return lambda: BedRegions.read(bed_file, cache=False)
+
+
+@benchmark("bed_regions.count_overlaps")
+def bench_bed_overlaps(context):
+    import numpy as np
+    from bioit_module.bed_regions import BedRegions
+    regions = BedRegions.read(context.bed_file, cache=False)
+    positions = np.random.RandomState(0).randint(0, 10000000, size=100000)
+    return lambda: [regions.count_overlaps(chrom, positions) for chrom in regions.get_chroms()]
+
+
+def time_function(function, repeat):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        timings.append(time.perf_counter() - start)
+    return {
+        'repeat': repeat,
+        'min': min(timings),
+        'median': statistics.median(timings),
+        'mean': statistics.mean(timings),
+    }
+
+
+def run_benchmarks(work_dir, scale=1.0, repeat=5, names=None):
+    """
+    Run the benchmarks (every registered benchmark if names is None), return the results as a JSON-able dict.
+    A benchmark needing a missing optional dependency (numpy) or a module missing in the installed bioit_module
+    is reported as skipped.
+    """
+    context = BenchmarkContext(work_dir, scale)
+    results = {}
+    for name, setup in BENCHMARKS.items():
+        if names is not None and name not in names:
+            continue
+        try:
+            function = setup(context)
+        except (ImportError, SkipBenchmark) as e:
+            results[name] = {'skipped': str(e)}
+            continue
+        results[name] = time_function(function, repeat)
+    clear_reference_catalog()
+    return {
+        'bioit_module_version': __version__,
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'date': datetime.datetime.now().isoformat(timespec='seconds'),
+        'scale': scale,
+        'benchmarks': results,
+    }
+
+
+def compare(previous, current, threshold=1.2):
+    """
+    Benchmarks whose median time grew by more than threshold between two results: [(name, previous, current, ratio)]
+    """
+    regressions = []
+    for name, result in current['benchmarks'].items():
+        previous_result = previous['benchmarks'].get(name, {})
+        if 'median' not in result or not previous_result.get('median'):
+            continue
+        ratio = result['median'] / previous_result['median']
+        if ratio > threshold:
+            regressions.append((name, previous_result['median'], result['median'], ratio))
+    return regressions
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description="Run the bioit_module benchmarks on synthetic fixtures.")
+    parser.add_argument("-o", "--output", dest="output", help="JSON results file, STDOUT if not defined.")
+    parser.add_argument("--compare", dest="compare",
+                        help="Previous JSON results: exit with 1 if a benchmark is slower by more than --threshold.")
+    parser.add_argument("--threshold", dest="threshold", type=float, default=1.2,
+                        help="Maximum ratio between the current and previous median times.")
+    parser.add_argument("--repeat", dest="repeat", type=int, default=5, help="Number of runs of each benchmark.")
+    parser.add_argument("--scale", dest="scale", type=float, default=1.0, help="Size factor of the fixtures.")
+    parser.add_argument("--work-dir", dest="work_dir", help="Fixtures directory, a temporary directory if not defined.")
+    parser.add_argument("benchmarks", nargs="*", help="Benchmarks to run, all if not defined: {}.".format(
+        ", ".join(BENCHMARKS)
+    ))
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    if args.work_dir:
+        os.makedirs(args.work_dir, exist_ok=True)
+        results = run_benchmarks(args.work_dir, args.scale, args.repeat, args.benchmarks or None)
+    else:
+        with tempfile.TemporaryDirectory() as work_dir:
+            results = run_benchmarks(work_dir, args.scale, args.repeat, args.benchmarks or None)
+    if args.output:
+        with open(args.output, 'w') as output:
+            json.dump(results, output, indent=2)
+    else:
+        json.dump(results, sys.stdout, indent=2)
+        print()
+    if args.compare:
+        with open(args.compare) as previous_file:
+            previous = json.load(previous_file)
+        regressions = compare(previous, results, args.threshold)
+        for name, previous_median, median, ratio in regressions:
+            print("{}: {:.6f}s -> {:.6f}s (x{:.2f}) since {}".format(
+                name, previous_median, median, ratio, previous.get('bioit_module_version')
+            ), file=sys.stderr)
+        return 1 if regressions else 0
+    return 0
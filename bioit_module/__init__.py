@@ -1,7 +1,31 @@
-import bioit_module.exit_code
-import bioit_module.exception
-import bioit_module.config_type
-from .command_parser import CommandParser
-from .pipeline_parameters import PipelineParameters
-from .logger import build_logger
-from .bioit_launcher import BioitLauncher
+"""
+Public names are loaded on first access so a module answering --version or --help
+doesn't pay for schematics, configparser or the launcher imports.
+"""
+import importlib
+
+_LAZY_NAMES = {
+    'CommandParser': 'bioit_module.command_parser',
+    'PipelineParameters': 'bioit_module.pipeline_parameters',
+    'build_logger': 'bioit_module.logger',
+    'BioitLauncher': 'bioit_module.bioit_launcher',
+    'BatchLauncher': 'bioit_module.batch_launcher',
+}
+_LAZY_SUBMODULES = ['exit_code', 'exception', 'config_type']
+
+__all__ = list(_LAZY_NAMES) + _LAZY_SUBMODULES
+
+
+def __getattr__(name):
+    if name in _LAZY_NAMES:
+        value = getattr(importlib.import_module(_LAZY_NAMES[name]), name)
+    elif name in _LAZY_SUBMODULES:
+        value = importlib.import_module('bioit_module.' + name)
+    else:
+        raise AttributeError("module 'bioit_module' has no attribute '{}'".format(name))
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(list(globals()) + __all__)
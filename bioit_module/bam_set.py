@@ -0,0 +1,147 @@
+import os
+import hashlib
+import logging
+import pickle
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from bioit_module.utils import atomic_write, get_cache_dir
+
+
+class SummaryCache:
+    """
+    On disk cache of BAM summaries, one pickle file per BAM and summary key (function and args).
+    An entry is keyed by the BAM path, mtime and size: a modified BAM is summarized again.
+    cache_dir must only be writable by the user running the modules.
+    """
+    SUFFIX = '.summary.pickle'
+
+    def __init__(self, cache_dir):
+        self.cache_dir = cache_dir
+
+    def lookup(self, bam_file, key):
+        """
+        Return (True, summary) if a summary of this BAM is cached, (False, None) else
+        """
+        full_key = self._build_key(bam_file, key)
+        if full_key is None:
+            return False, None
+        try:
+            with open(self._cache_file(full_key), 'rb') as cache_file:
+                cached_key, summary = pickle.load(cache_file)
+        except Exception:
+            return False, None
+        if cached_key != full_key:
+            return False, None
+        return True, summary
+
+    def store(self, bam_file, key, summary):
+        """
+        Write the summary of a BAM, a summary that can't be pickled isn't cached
+        """
+        full_key = self._build_key(bam_file, key)
+        if full_key is None:
+            return
+        try:
+            with atomic_write(self._cache_file(full_key)) as cache_file:
+                pickle.dump((full_key, summary), cache_file)
+        except Exception:
+            pass
+
+    @staticmethod
+    def _build_key(bam_file, key):
+        try:
+            stat = os.stat(bam_file)
+        except OSError:
+            return None
+        return (os.path.abspath(bam_file), stat.st_mtime_ns, stat.st_size) + tuple(key)
+
+    def _cache_file(self, full_key):
+        return os.path.join(self.cache_dir, hashlib.sha1(repr(full_key).encode()).hexdigest() + self.SUFFIX)
+
+
+class BamSet:
+    """
+    Set of BAM files processed in parallel, like the UHRR BAMs of PipelineParameters.get_UHRR_bam().
+    Per-BAM summaries are cached by file path, mtime and size: a BAM of the same reference release
+    is never processed twice by the same function.
+    """
+    def __init__(self, bam_files, workers=None, cache_dir=None, logger=None, require_index=True):
+        """
+        :param bam_files: list of BAM paths
+        :param require_index: if True, map and summarize fail before starting when a BAM has no index
+        :param workers: number of processes, os.cpu_count() if None
+        :param cache_dir: summaries cache directory, <BIOIT_CACHE_DIR>/bam_summaries if None
+        """
+        self.bam_files = [str(bam_file) for bam_file in bam_files]
+        self.workers = workers
+        self.cache = SummaryCache(cache_dir or os.path.join(get_cache_dir(), 'bam_summaries'))
+        self.logger = logger or logging.getLogger(__name__)
+        self.require_index = require_index
+
+    def __len__(self):
+        return len(self.bam_files)
+
+    @staticmethod
+    def get_index_file(bam_file):
+        """
+        Index of a BAM: <bam>.bai or <bam without .bam>.bai, None if missing
+        """
+        for index_file in [bam_file + '.bai', os.path.splitext(bam_file)[0] + '.bai']:
+            if os.path.isfile(index_file):
+                return index_file
+        return None
+
+    def check_indexes(self):
+        """
+        Raise an exception listing every BAM without index
+        """
+        missing = [bam_file for bam_file in self.bam_files if self.get_index_file(bam_file) is None]
+        if missing:
+            raise Exception("BAM index (.bai) not found for: {}".format(', '.join(missing)))
+
+    def map(self, function, *args):
+        """
+        Run function(bam_file, *args) for each BAM on a process pool.
+        Results are returned in the order of bam_files, progress is logged as each BAM ends.
+        function must be picklable (module level function).
+        """
+        if self.require_index:
+            self.check_indexes()
+        return self._run(function, args, self.bam_files)
+
+    def summarize(self, function, *args):
+        """
+        Like map, with results cached on disk by BAM path, mtime, size, function and args
+        """
+        if self.require_index:
+            self.check_indexes()
+        key = self._key(function, args)
+        results = {}
+        missing = []
+        for bam_file in self.bam_files:
+            found, summary = self.cache.lookup(bam_file, key)
+            if found:
+                results[bam_file] = summary
+            else:
+                missing.append(bam_file)
+        if missing:
+            self.logger.info("{} BAM summaries cached, {} to compute".format(len(results), len(missing)))
+            for bam_file, summary in zip(missing, self._run(function, args, missing)):
+                self.cache.store(bam_file, key, summary)
+                results[bam_file] = summary
+        return [results[bam_file] for bam_file in self.bam_files]
+
+    def _run(self, function, args, bam_files):
+        results = [None] * len(bam_files)
+        if not bam_files:
+            return results
+        with ProcessPoolExecutor(max_workers=self.workers) as executor:
+            futures = {executor.submit(function, bam_file, *args): i for i, bam_file in enumerate(bam_files)}
+            for done, future in enumerate(as_completed(futures), 1):
+                i = futures[future]
+                results[i] = future.result()
+                self.logger.info("[{}/{}] {} done".format(done, len(bam_files), bam_files[i]))
+        return results
+
+    @staticmethod
+    def _key(function, args):
+        return (function.__module__, function.__qualname__) + tuple(repr(arg) for arg in args)
@@ -0,0 +1,244 @@
+import argparse
+import csv
+import logging
+import os
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from bioit_module import CommandParser, build_logger, exception, exit_code
+from bioit_module.logger import PhaseFilter, build_formatter
+
+
+class BatchSample:
+    """
+    One line of the sample sheet: output prefix and sample specific arguments
+    """
+    def __init__(self, prefix, args):
+        self.prefix = prefix
+        self.args = args
+
+
+class BatchResult:
+    def __init__(self, prefix, exit_code):
+        self.prefix = prefix
+        self.exit_code = exit_code
+
+    @property
+    def success(self):
+        return self.exit_code == 0
+
+
+class BatchLauncher:
+    """
+    Run many samples of a BioitLauncher subclass in one process.
+    Shared install config, parameters and pipeline parameters are read and validated once,
+    then each sample's launch() runs on a thread or process pool.
+
+    Batch options are --sample-sheet, --workers, --pool and --batch-log, every other argument
+    is shared by all samples. The sample sheet is a TSV file: output prefix in the first
+    column, sample arguments in the next ones. Empty lines and lines starting with # are ignored.
+    Config arguments (-c, -p, --pipe_params, --reference_dir) are shared: a sample giving one is rejected.
+    """
+    POOLS = {'thread': ThreadPoolExecutor, 'process': ProcessPoolExecutor}
+    # Arguments of the configs read once for all samples
+    SHARED_CONFIG_DESTS = ('config', 'params', 'pipe_params', 'reference_dir')
+
+    def __init__(self, launcher_class, command_parser, argv=None):
+        """
+        :param launcher_class: BioitLauncher subclass run for each sample
+        :param command_parser: CommandParser of the module, used to parse each sample arguments
+        :param argv: list of arguments, sys.argv if None
+        """
+        self.launcher_class = launcher_class
+        self.command_parser = command_parser
+        self.batch_args, self.shared_argv = self._build_parser().parse_known_args(argv)
+        if self.batch_args.debug:
+            self.shared_argv.append('-d')
+        log_level = logging.DEBUG if self.batch_args.debug else logging.INFO
+        self.logger = build_logger(self.batch_args.batch_log, level=log_level)
+        self.samples = self.read_sample_sheet(self.batch_args.sample_sheet)
+
+    def launch(self):
+        """
+        Run every sample and exit with the exit code of the first failed sample
+        """
+        results = self.run()
+        failed = [result for result in results if not result.success]
+        self.logger.info("{} samples done, {} failed".format(len(results), len(failed)))
+        for result in failed:
+            self.logger.error("Sample {} failed with exit code {}".format(result.prefix, result.exit_code))
+        if failed:
+            exit(failed[0].exit_code)
+
+    def run(self):
+        """
+        Return one BatchResult per sample, in the sample sheet order
+        """
+        results = {}
+        parsed = []
+        for index, sample in enumerate(self.samples):
+            try:
+                self.check_sample_args(sample)
+                parsed.append((index, sample, self.parse_sample_args(sample)))
+            except exception.InvalidArgsError as e:
+                self.logger.error("Invalid arguments for sample {}: {}".format(sample.prefix, e))
+                results[index] = BatchResult(sample.prefix, exit_code.ValidationArgsError)
+            except SystemExit:
+                self.logger.error("Invalid arguments for sample {}".format(sample.prefix))
+                results[index] = BatchResult(sample.prefix, exit_code.ValidationArgsError)
+        if parsed:
+            configs = self.read_shared_configs(parsed[0][2])
+            if self.batch_args.pool == 'process':
+                # schematics models can't be pickled: workers rebuild them from native data
+                from bioit_module.config_cache import pack_config
+                configs = tuple(pack_config(config) for config in configs)
+            with self.POOLS[self.batch_args.pool](max_workers=self.batch_args.workers) as executor:
+                futures = [
+                    (index, sample, executor.submit(run_sample, self.launcher_class, index, args, configs))
+                    for index, sample, args in parsed
+                ]
+                for index, sample, future in futures:
+                    try:
+                        results[index] = BatchResult(sample.prefix, future.result())
+                    except Exception:
+                        self.logger.exception("Sample {}".format(sample.prefix))
+                        results[index] = BatchResult(sample.prefix, exit_code.UnknownError)
+        return [results[index] for index in sorted(results)]
+
+    def check_sample_args(self, sample):
+        """
+        Raise InvalidArgsError if the sample gives a config argument: configs are read once for all samples
+        """
+        actions = self.command_parser.parser._option_string_actions
+        for arg in sample.args:
+            for option in self.get_option_strings(arg, actions):
+                if actions[option].dest in self.SHARED_CONFIG_DESTS:
+                    raise exception.InvalidArgsError(
+                        "{} is shared by all samples, give it on the command line".format(option)
+                    )
+
+    @staticmethod
+    def get_option_strings(arg, actions):
+        """
+        Option strings of actions given by an argument, read the way argparse reads them: --option=value,
+        unique prefix of a long option (--par), value attached to a short option (-cFILE) and grouped flags (-dc)
+        """
+        if arg == '--' or not arg.startswith('-'):
+            return []
+        if arg.startswith('--'):
+            option = arg.split('=', 1)[0]
+            if option in actions:
+                return [option]
+            return [known for known in actions if known.startswith(option)]
+        options = []
+        for char in arg[1:]:
+            option = '-' + char
+            if option not in actions:
+                break
+            options.append(option)
+            if actions[option].nargs != 0:
+                # The rest of the argument is the value of the option
+                break
+        return options
+
+    def parse_sample_args(self, sample):
+        return self.command_parser.parse(self.shared_argv + ['-o', sample.prefix] + sample.args)
+
+    def read_shared_configs(self, args):
+        """
+        Read and validate configs once for all samples, exit if they are invalid
+        """
+        self.logger.debug("Read shared configs")
+        return self.launcher_class.read_shared_configs(args, self.logger)
+
+    @staticmethod
+    def read_sample_sheet(filename):
+        samples = []
+        with open(filename, newline='') as sample_sheet:
+            for row in csv.reader(sample_sheet, delimiter='\t'):
+                row = [column.strip() for column in row]
+                if not row or not row[0] or row[0].startswith('#'):
+                    continue
+                samples.append(BatchSample(row[0], [column for column in row[1:] if column]))
+        return samples
+
+    @staticmethod
+    def _build_parser():
+        parser = argparse.ArgumentParser(add_help=False)
+        parser.add_argument(
+            "--sample-sheet",
+            dest="sample_sheet",
+            required=True,
+            help="TSV file: output prefix then sample arguments.",
+        )
+        parser.add_argument(
+            "--workers",
+            dest="workers",
+            default=1,
+            type=CommandParser._is_valid_positive_integer,
+            help="Number of samples run at the same time.",
+        )
+        parser.add_argument(
+            "--pool",
+            dest="pool",
+            default="process",
+            choices=sorted(BatchLauncher.POOLS),
+            help="Run samples in processes or threads.",
+        )
+        parser.add_argument(
+            "--batch-log",
+            dest="batch_log",
+            required=False,
+            help="Batch log file, STDOUT if not defined.",
+        )
+        parser.add_argument("-d", "--debug", dest="debug", default=False, action="store_true")
+        return parser
+
+
+def build_sample_logger(index, args):
+    """
+    Logger of one sample: written to the sample log file (or <prefix>.log) and propagated to the batch logger
+    """
+    logger = logging.getLogger("bioit_module.batch.{}".format(index))
+    logger.setLevel(logging.DEBUG if args.debug else logging.INFO)
+    for handler in list(logger.handlers):
+        logger.removeHandler(handler)
+        handler.close()
+    logfile = args.logfile or args.prefix + ".log"
+    if os.path.dirname(logfile):
+        os.makedirs(os.path.dirname(logfile), exist_ok=True)
+    file_handler = logging.FileHandler(logfile)
+    file_handler.setFormatter(build_formatter(getattr(args, "log_format", "text"), {
+        "module_version": getattr(args, "module_version", None), "prefix": args.prefix,
+    }))
+    file_handler.addFilter(PhaseFilter())
+    logger.addHandler(file_handler)
+    return logger
+
+
+def run_sample(launcher_class, index, args, configs):
+    """
+    Build and launch one sample, return its exit code.
+    Module level function so it can be sent to a process pool.
+    """
+    if configs is not None:
+        from bioit_module.config_cache import unpack_config
+        configs = tuple(unpack_config(config) for config in configs)
+    logger = build_sample_logger(index, args)
+    try:
+        launcher = launcher_class(args=args, configs=configs, logger=logger)
+        launcher.shared_process = True
+        launcher.launch()
+    except SystemExit as e:
+        if e.code is None:
+            return 0
+        if isinstance(e.code, int):
+            return e.code
+        logger.error(e.code)
+        return exit_code.UnknownError
+    except Exception:
+        logger.exception('')
+        return exit_code.UnknownError
+    finally:
+        for handler in list(logger.handlers):
+            logger.removeHandler(handler)
+            handler.close()
+    return 0
@@ -0,0 +1,161 @@
+import os
+import hashlib
+import numpy as np
+from bioit_module.utils import atomic_write, get_cache_dir
+
+
+class BedRegions:
+    """
+    Regions of a BED file as per chromosome NumPy arrays, sorted by start.
+    Coordinates are the BED ones: 0-based, end excluded.
+    Queries are binary searches (np.searchsorted) instead of linear scans.
+    """
+    def __init__(self, chroms, starts, ends):
+        """
+        :param chroms: chromosome of each region, array of bytes
+        :param starts: start of each region
+        :param ends: end of each region
+        """
+        self.starts = {}
+        self.ends = {}
+        self._sorted_ends = {}
+        self._max_lengths = {}
+        chroms = np.asarray(chroms)
+        starts = np.asarray(starts, dtype=np.int64)
+        ends = np.asarray(ends, dtype=np.int64)
+        for chrom in np.unique(chroms):
+            selected = chroms == chrom
+            order = np.argsort(starts[selected], kind='stable')
+            name = chrom.decode() if isinstance(chrom, bytes) else str(chrom)
+            self.starts[name] = starts[selected][order]
+            self.ends[name] = ends[selected][order]
+
+    @classmethod
+    def read(cls, bed_file, cache=True):
+        """
+        Read a BED file, the parsed arrays are cached in <bed>.npy (or in the cache directory if the BED
+        directory is read only) and reused while the BED is unchanged.
+        """
+        bed_file = str(bed_file)
+        cache_files = cls.default_cache_files(bed_file) if cache else []
+        for cache_file in cache_files:
+            if os.path.isfile(cache_file) and os.path.getmtime(cache_file) >= os.path.getmtime(bed_file):
+                try:
+                    regions = np.load(cache_file)
+                except (OSError, ValueError):
+                    continue
+                return cls(regions['chrom'], regions['start'], regions['end'])
+        regions = cls.parse(bed_file)
+        for cache_file in cache_files:
+            try:
+                with atomic_write(cache_file) as output:
+                    np.save(output, regions)
+                break
+            except OSError:
+                continue
+        return cls(regions['chrom'], regions['start'], regions['end'])
+
+    @staticmethod
+    def default_cache_files(bed_file):
+        name = hashlib.sha1(os.path.abspath(bed_file).encode()).hexdigest() + '.npy'
+        return [bed_file + '.npy', os.path.join(get_cache_dir(), name)]
+
+    @staticmethod
+    def parse(bed_file):
+        """
+        Structured array (chrom, start, end) of the regions of a BED file
+        """
+        chroms = []
+        starts = []
+        ends = []
+        with open(bed_file, 'rb') as bed:
+            for line in bed:
+                if not line.strip() or line.startswith((b'#', b'track', b'browser')):
+                    continue
+                fields = line.split(b'\t', 3)
+                chroms.append(fields[0].strip())
+                starts.append(int(fields[1]))
+                ends.append(int(fields[2]))
+        width = max([len(chrom) for chrom in chroms] + [1])
+        regions = np.empty(len(chroms), dtype=[('chrom', 'S{}'.format(width)), ('start', np.int64), ('end', np.int64)])
+        regions['chrom'] = chroms
+        regions['start'] = starts
+        regions['end'] = ends
+        return regions
+
+    def __len__(self):
+        return sum(len(starts) for starts in self.starts.values())
+
+    def get_chroms(self):
+        return list(self.starts)
+
+    def total_length(self):
+        merged = self.merge()
+        return int(sum((merged.ends[chrom] - merged.starts[chrom]).sum() for chrom in merged.starts))
+
+    def merge(self):
+        """
+        New BedRegions where overlapping and book-ended regions are merged, like bedtools merge
+        """
+        chroms = []
+        starts = []
+        ends = []
+        for chrom in self.starts:
+            chrom_starts = self.starts[chrom]
+            chrom_ends = np.maximum.accumulate(self.ends[chrom])
+            # A region starts a new merged region if it starts after every previous region end
+            new_region = np.ones(len(chrom_starts), dtype=bool)
+            new_region[1:] = chrom_starts[1:] > chrom_ends[:-1]
+            first = np.flatnonzero(new_region)
+            last = np.append(first[1:], len(chrom_starts)) - 1
+            chroms.append(np.full(len(first), chrom.encode()))
+            starts.append(chrom_starts[first])
+            ends.append(chrom_ends[last])
+        if not chroms:
+            return BedRegions([], [], [])
+        return BedRegions(np.concatenate(chroms), np.concatenate(starts), np.concatenate(ends))
+
+    def overlap(self, chrom, start, end):
+        """
+        Indexes (in self.starts[chrom] order) of the regions overlapping [start, end)
+        """
+        if chrom not in self.starts:
+            return np.empty(0, dtype=np.int64)
+        starts = self.starts[chrom]
+        # Sorted by start: a region overlapping the query starts after start - longest region
+        low = np.searchsorted(starts, start - self._max_length(chrom), side='right')
+        high = np.searchsorted(starts, end, side='left')
+        candidates = np.arange(low, high)
+        return candidates[self.ends[chrom][low:high] > start]
+
+    def contains(self, chrom, position):
+        """
+        True if a region contains the 0-based position
+        """
+        return bool(self.count_overlaps(chrom, np.array([position]))[0])
+
+    def count_overlaps(self, chrom, positions):
+        """
+        Number of regions containing each 0-based position of an array, in one vectorized pass:
+        regions started at or before the position minus regions ended at or before it
+        """
+        positions = np.asarray(positions, dtype=np.int64)
+        if chrom not in self.starts:
+            return np.zeros(len(positions), dtype=np.int64)
+        started = np.searchsorted(self.starts[chrom], positions, side='right')
+        ended = np.searchsorted(self._sorted_end(chrom), positions, side='right')
+        return started - ended
+
+    def in_regions(self, chrom, positions):
+        return self.count_overlaps(chrom, positions) > 0
+
+    def _sorted_end(self, chrom):
+        if chrom not in self._sorted_ends:
+            self._sorted_ends[chrom] = np.sort(self.ends[chrom])
+        return self._sorted_ends[chrom]
+
+    def _max_length(self, chrom):
+        if chrom not in self._max_lengths:
+            lengths = self.ends[chrom] - self.starts[chrom]
+            self._max_lengths[chrom] = int(lengths.max()) if len(lengths) else 0
+        return self._max_lengths[chrom]
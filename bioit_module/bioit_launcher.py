@@ -1,37 +1,389 @@
 import os
+import sys
 import logging
-from configparser import ConfigParser, NoOptionError
-from bioit_module import build_logger, exit_code,PipelineParameters
-from schematics.exceptions import ValidationError
+import functools
+from contextlib import contextmanager
+from bioit_module import build_logger, exit_code
+from bioit_module.logger import get_call_site, log_phase, log_sampled
+from bioit_module.metrics import LauncherMetrics
+
+
+def _instrumented_launch(launch):
+    """
+    Record the launch() span, guard memory if --max-memory is set and write the metrics file once launch() ends
+    """
+    @functools.wraps(launch)
+    def instrumented_launch(self, *args, **kwargs):
+        if getattr(self, "_launching", False):
+            # super().launch() called from an overridden launch()
+            return launch(self, *args, **kwargs)
+        if getattr(self.args, "dry_run", False):
+            return self.dry_run()
+        self._launching = True
+        code = 0
+        self.start_memory_governor()
+        try:
+            with self.span("launch"):
+                return launch(self, *args, **kwargs)
+        except SystemExit as e:
+            code = 0 if e.code is None else e.code
+            raise
+        except MemoryError:
+            code = exit_code.MemoryLimitError
+            self.logger.exception("Memory limit reached")
+            exit(exit_code.MemoryLimitError)
+        except BaseException:
+            code = exit_code.UnknownError
+            raise
+        finally:
+            self._launching = False
+            self.stop_memory_governor()
+            self.logger.info("launch() ended with exit code {}".format(code), extra={"exit_code": code})
+            self.write_metrics(code)
+    return instrumented_launch
 
 
 class BioitLauncher:
-    def __init__(self, command_parser):
-        self.args = command_parser.parse()
-        self.logger = self._build_logger(self.args.logfile, self.args.debug)
-        self.validate_args()
-        self.output_dir = os.path.sep.join(os.path.split(self.args.prefix)[:-1])
+    # Set cache_configs to False if read_install_config, read_parameters or read_pipeline_parameters
+    # depend on something else than their config file
+    cache_configs = True
+    # ConfigCache used to read configs, the process shared cache if None
+    config_cache = None
+    # Reference assets checked when the pipeline parameters are read (reference_resolver.GTF, FASTA, BED...):
+    # the module fails before launch() if one is missing
+    required_references = ()
+    # If True, the reference assets of the gencode version are checked against the integrity manifest
+    # of the reference directory (size and mtime, see reference_integrity) after the pipeline parameters are read
+    verify_references = False
+    # Set to True when the launcher runs in a process shared with other jobs (BatchLauncher, worker mode):
+    # --max-memory limits and exits the whole process, it is ignored
+    shared_process = False
+    # --dry-run memory estimate: RSS after reading the configs + plan_memory_factor * bytes of the planned inputs
+    plan_memory_factor = 1.0
+
+    def __init__(self, command_parser=None, args=None, configs=None, logger=None):
+        """
+        :param command_parser: CommandParser used to parse the command line
+        :param args: already parsed arguments, the command line isn't parsed if defined
+        :param configs: (install_config, params, pipe_params) already read and validated, see read_shared_configs
+        :param logger: logger to use instead of the root logger built from the arguments
+        """
+        self.metrics = LauncherMetrics()
+        if args is None:
+            with self.span("parse_args"):
+                args = command_parser.parse()
+        self.args = args
+        self.logger = logger if logger is not None else self._build_logger(
+            self.args.logfile, self.args.debug, getattr(self.args, "async_log", False),
+            getattr(self.args, "log_format", "text")
+        )
+        try:
+            self.validate_args()
+            self.output_dir = os.path.sep.join(os.path.split(self.args.prefix)[:-1])
+            if configs is None:
+                self.read_configs()
+            else:
+                self.install_config, self.params, self.pipe_params = configs
+                # The validation hooks can use the arguments: they run for each launcher sharing the configs
+                self.validate_configs()
+        except SystemExit as e:
+            # The module ends before launch(): the metrics of the phases done are written all the same
+            self.write_metrics(0 if e.code is None else e.code)
+            raise
+
+    @classmethod
+    def read_shared_configs(cls, args, logger):
+        """
+        Read and validate the install config, parameters and pipeline parameters once,
+        without building a launcher for a sample. Used to share configs between launchers.
+        The _validate_install_config and _validate_params hooks run when each launcher is built, with its own arguments.
+        """
+        launcher = cls.__new__(cls)
+        launcher.args = args
+        launcher.logger = logger
+        launcher.metrics = LauncherMetrics()
+        launcher.output_dir = os.path.sep.join(os.path.split(args.prefix)[:-1])
+        launcher.read_configs(validate=False)
+        return launcher.get_configs()
+
+    def get_configs(self):
+        return self.install_config, self.params, self.pipe_params
+
+    def read_configs(self, validate=True):
+        """
+        Read the install config, parameters and pipeline parameters, then run the validation hooks if validate is set
+        """
+        # Imported here: --version and --help don't need configparser nor schematics
+        from configparser import NoOptionError
+        from schematics.exceptions import ValidationError
         try:
             self.logger.debug("Read install config")
-            self.install_config = self.read_install_config()
+            with self.span("read_install_config"):
+                self.install_config = self._read_cached_config("config", self.read_install_config)
             self.logger.debug("Read parameters")
-            self.params = self.read_parameters()
-            self.pipe_params = self.read_pipeline_parameters()
+            with self.span("read_parameters"):
+                self.params = self._read_cached_config("params", self.read_parameters)
+            with self.span("read_pipeline_parameters"):
+                self.pipe_params = self._read_cached_config(
+                    "pipe_params", self.read_pipeline_parameters, getattr(self.args, "reference_dir", None)
+                )
+                # Not in the cached reader: files are checked for every launch, even when the config is cached
+                self.check_references(self.pipe_params)
         except NoOptionError as e:
-            self.logger.exception('')
+            self.logger.exception('', extra={"exit_code": exit_code.NoOptionError})
             exit(exit_code.NoOptionError)
         except ValidationError as e:
-            self.logger.exception('')
+            self.logger.exception('', extra={"exit_code": exit_code.ValidationError})
             exit(exit_code.ValidationError)
         except Exception as e:
-            self.logger.exception('')
+            self.logger.exception('', extra={"exit_code": exit_code.UnknownError})
             exit(exit_code.UnknownError)
+        if validate:
+            self.validate_configs()
+
+    def validate_configs(self):
+        """
+        Run the install config and parameters validation hooks
+        """
         self.validate_install_config()
         self.validate_params()
 
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        if "launch" in cls.__dict__:
+            cls.launch = _instrumented_launch(cls.__dict__["launch"])
+
     def launch(self):
         raise NotImplementedError
 
+    def plan(self):
+        """
+        Override this to describe what launch() would do, for --dry-run: a dict with "inputs" (files read)
+        and "outputs" (files written), and optionally "memory" (bytes) and "cpus" replacing the estimates
+        """
+        return {}
+
+    def get_plan(self):
+        """
+        Plan of the job: inputs with their size, reference assets, outputs, estimated memory and CPUs, errors
+        """
+        from bioit_module.metrics import get_peak_rss
+        with self.span("plan"):
+            plan = dict(self.plan() or {})
+        errors = []
+        inputs = [self._plan_file(filename, errors) for filename in plan.get("inputs", ())]
+        input_bytes = sum(item["bytes"] or 0 for item in inputs)
+        references = {}
+        if getattr(self, "pipe_params", None) is not None:
+            reference = self.get_reference()
+            for asset, path in reference.paths.items():
+                references[asset] = [
+                    self._plan_file(filename, []) for filename in (path if isinstance(path, list) else [path])
+                ]
+            errors.extend("{}: {}".format(asset, error) for asset, error in sorted(reference.errors.items()))
+        memory = plan.get("memory") or (get_peak_rss() or 0) + int(self.plan_memory_factor * input_bytes)
+        return {
+            "module": type(self).__name__,
+            "version": getattr(self.args, "module_version", None),
+            "prefix": self.args.prefix,
+            "inputs": inputs,
+            "input_bytes": input_bytes,
+            "references": references,
+            "outputs": [str(filename) for filename in plan.get("outputs", ())],
+            "memory": memory,
+            "max_memory": getattr(self.args, "max_memory", None),
+            "cpus": plan.get("cpus") or getattr(self.args, "threads", 1),
+            "errors": errors,
+        }
+
+    def dry_run(self):
+        """
+        --dry-run: print the JSON plan on stdout instead of launching. Exit with exit_code.ValidationError
+        if an input or a reference asset is missing.
+        """
+        import json
+        plan = self.get_plan()
+        print(json.dumps(plan, indent=2))
+        if plan["errors"]:
+            self.logger.error("Dry run: {}".format("; ".join(plan["errors"])))
+            exit(exit_code.ValidationError)
+        return plan
+
+    @staticmethod
+    def _plan_file(filename, errors):
+        filename = str(filename)
+        try:
+            size = os.stat(filename).st_size
+        except OSError:
+            size = None
+            errors.append("{} not found".format(filename))
+        return {"path": filename, "bytes": size}
+
+    @contextmanager
+    def span(self, name):
+        """
+        Context manager recording wall time, CPU time, peak RSS and I/O bytes of a named phase.
+        Use it in launch() to add sub-spans: with self.span("align"): ...
+        Records logged in the span have its name as phase.
+        """
+        with self.metrics.span(name) as span, log_phase(span.name):
+            yield span
+
+    def parallel_map(self, function, items, chunksize=None, workers=None, star=False):
+        """
+        [function(item) for item in items] on -t/--threads worker processes, see parallel.parallel_map.
+        Worker logs are written by the launcher logger. If a task fails, the other tasks are cancelled and the
+        launcher exits with the exit_code of the failure (exception types, MemoryError, signal of a killed worker).
+        """
+        from bioit_module.parallel import get_exit_code, parallel_map
+        if workers is None:
+            workers = getattr(self.args, "threads", 1)
+        try:
+            return parallel_map(function, items, workers, chunksize, self.logger, star)
+        except Exception as e:
+            self.logger.exception("Parallel task failed")
+            exit(get_exit_code(e))
+
+    def get_tool_runner(self):
+        """
+        ToolRunner of the tools of the install config, running at most -t/--threads tools at a time
+        """
+        if getattr(self, "_tool_runner", None) is None:
+            from bioit_module.tool_runner import ToolRunner
+            self._tool_runner = ToolRunner(
+                getattr(self, "install_config", None), self.logger, getattr(self.args, "threads", 1)
+            )
+        return self._tool_runner
+
+    def run_tool(self, tool, args=(), **kwargs):
+        """
+        Run a tool of the install config (self.run_tool("samtools", ["index", bam])), see ToolRunner.run.
+        If the tool fails, the launcher exits with exit_code.SigSegv, SigKillOOM or SigTerm if it was killed
+        by these signals, UnknownError otherwise.
+        """
+        from bioit_module.tool_runner import ToolError
+        try:
+            return self.get_tool_runner().run(tool, args, **kwargs)
+        except ToolError as e:
+            self.logger.error(str(e))
+            exit(e.exit_code)
+
+    def log_every_n(self, n, level, msg, *args, **kwargs):
+        """
+        Log at most once every n calls of the same call site, for debug output in launch() loops
+        """
+        log_sampled(self.logger, level, msg, *args, every_n=n, key=get_call_site(), **kwargs)
+
+    def log_every(self, seconds, level, msg, *args, **kwargs):
+        """
+        Log at most once every `seconds` seconds from the same call site
+        """
+        log_sampled(self.logger, level, msg, *args, seconds=seconds, key=get_call_site(), **kwargs)
+
+    def start_memory_governor(self):
+        """
+        Sample memory during launch() if --max-memory is set, in a one-shot process only
+        """
+        self.memory_governor = None
+        max_memory = getattr(self.args, "max_memory", None)
+        if max_memory and self.shared_process:
+            self.logger.warning("--max-memory is ignored: the process runs other jobs")
+        elif max_memory:
+            from bioit_module.memory_governor import MemoryGovernor
+            self.memory_governor = MemoryGovernor(
+                max_memory, on_limit=self._memory_limit_reached, logger=self.logger
+            ).start()
+
+    def stop_memory_governor(self):
+        governor = getattr(self, "memory_governor", None)
+        if governor is not None:
+            governor.stop()
+            self.logger.info("Peak RSS {} bytes, limit {} bytes".format(governor.peak_rss, governor.limit))
+
+    def memory_pressure(self):
+        """
+        True if memory usage is close to --max-memory: poll it in launch() to switch to chunked processing
+        """
+        governor = getattr(self, "memory_governor", None)
+        return governor is not None and governor.under_pressure()
+
+    def _memory_limit_reached(self, governor):
+        """
+        Called by the memory governor thread: exit now, before the kernel OOM killer
+        """
+        from bioit_module.logger import stop_logger
+        self.write_metrics(exit_code.MemoryLimitError)
+        stop_logger()
+        os._exit(exit_code.MemoryLimitError)
+
+    def get_checkpoint(self):
+        """
+        Completed steps manifest of this prefix: <prefix>.checkpoints.json, emptied if --restart is set
+        """
+        if getattr(self, "_checkpoint", None) is None:
+            from bioit_module.checkpoint import Checkpoint
+            self._checkpoint = Checkpoint(self.args.prefix + ".checkpoints.json")
+            if getattr(self.args, "restart", False):
+                self._checkpoint.reset()
+        return self._checkpoint
+
+    def run_step(self, name, function, inputs=(), outputs=(), params=None, content=False):
+        """
+        Run function() unless the step already completed with the same inputs and params and its outputs are unchanged.
+        Use it in launch() so a rerun after a kill (SigKillOOM, SigTerm...) restarts at the first incomplete step.
+        :param name: step name, unique in the launcher
+        :param inputs: files read by the step
+        :param outputs: files written by the step, usually named from --out-prefix
+        :param params: JSON serializable parameters of the step
+        :param content: if True, files are fingerprinted by content (sha1) instead of size and mtime
+        :return: True if the step ran, False if it was skipped
+        """
+        checkpoint = self.get_checkpoint()
+        fingerprint = checkpoint.fingerprint(inputs, params, content)
+        if checkpoint.is_done(name, fingerprint, outputs, content):
+            self.logger.info("Step {} already done, skipped".format(name))
+            return False
+        self.logger.debug("Run step {}".format(name))
+        with self.span(name):
+            function()
+        missing = [str(output) for output in outputs if not os.path.exists(str(output))]
+        if missing:
+            raise Exception("Step {} didn't write {}".format(name, ", ".join(missing)))
+        checkpoint.mark_done(name, fingerprint, outputs, content)
+        return True
+
+    def open_output(self, suffix, columns, formats=("csv",), compress=False, buffer_rows=10000):
+        """
+        OutputWriter streaming rows to <prefix><suffix>.csv/.tsv/.jsonl, renamed into place once complete
+        """
+        from bioit_module.output_writer import OutputWriter
+        return OutputWriter(self.args.prefix + suffix, columns, formats, compress, buffer_rows)
+
+    def get_metrics_file(self):
+        return self.args.prefix + ".metrics.json"
+
+    def write_metrics(self, code=0):
+        """
+        Write the phases metrics next to --out-prefix if --metrics is set
+        """
+        if not getattr(self.args, "metrics", False):
+            return
+        try:
+            self.metrics.write(
+                self.get_metrics_file(),
+                module=type(self).__name__,
+                prefix=self.args.prefix,
+                exit_code=code,
+            )
+        except Exception:
+            self.logger.exception("Can't write metrics file")
+
+    def get_config_cache(self):
+        from bioit_module.config_cache import get_config_cache
+        if self.config_cache is not None:
+            return self.config_cache
+        return get_config_cache()
+
     def read_install_config(self):
         """
         Override this to read and validate the install config file
@@ -47,6 +399,7 @@ class BioitLauncher:
     def read_pipeline_parameters(self):
         if not hasattr(self.args, "pipe_params"):
             return None
+        from bioit_module.pipeline_parameters import PipelineParameters
         config = self._read_config_file(self.args.pipe_params)
         parameters = PipelineParameters()
         parameters.reference_dir = self.args.reference_dir
@@ -54,47 +407,99 @@ class BioitLauncher:
         parameters.validate()
         return parameters
 
+    def check_references(self, parameters):
+        """
+        Raise a ValidationError if a required_references asset of the pipeline parameters gencode version is missing,
+        or if verify_references is set and an asset changed since the integrity index was updated.
+        Only this version is resolved, again for each launcher: a file removed since the last job is reported.
+        """
+        if parameters is None:
+            return
+        if self.required_references:
+            from bioit_module.reference_resolver import ReferenceResolver
+            ReferenceResolver.get(parameters.reference_dir).resolve(
+                parameters.gencode_version, self.required_references, refresh=True
+            )
+        if self.verify_references:
+            self.verify_reference_integrity(parameters)
+
+    def verify_reference_integrity(self, parameters):
+        """
+        Raise a ValidationError if an asset of the gencode version changed since the integrity index was updated
+        """
+        from schematics.exceptions import ValidationError
+        from bioit_module.reference_integrity import IntegrityIndex
+        index = IntegrityIndex(parameters.reference_dir)
+        problems = index.verify(index.get_assets([parameters.gencode_version]))
+        if problems:
+            raise ValidationError("Reference assets don't match the integrity index: {}".format(
+                "; ".join("{}: {}".format(filename, problem) for filename, problem in sorted(problems.items()))
+            ))
+
+    def get_reference(self):
+        """
+        ResolvedReference of the pipeline parameters: every reference path of the gencode version, resolved once
+        per process
+        """
+        from bioit_module.reference_resolver import ReferenceResolver
+        return ReferenceResolver.get(self.pipe_params.reference_dir).resolve(self.pipe_params.gencode_version, [])
+
     def validate_args(self):
         """
         Additionnal args validation
         """
         self.logger.debug("Validate args")
-        try:
-            self._validate_args()
-        except Exception as e:
-            self.logger.exception('')
-            exit(exit_code.ValidationArgsError)
+        with self.span("validate_args"):
+            try:
+                self._validate_args()
+            except Exception as e:
+                self.logger.exception('', extra={"exit_code": exit_code.ValidationArgsError})
+                exit(exit_code.ValidationArgsError)
 
     def validate_install_config(self):
         """
         Additionnal install config file validation
         """
         self.logger.debug("Validate install config")
-        try:
-            self._validate_install_config()
-        except Exception as e:
-            self.logger.exception('')
-            exit(exit_code.ValidationInstallConfigError)
+        with self.span("validate_install_config"):
+            try:
+                self._validate_install_config()
+            except Exception as e:
+                self.logger.exception('', extra={"exit_code": exit_code.ValidationInstallConfigError})
+                exit(exit_code.ValidationInstallConfigError)
 
     def validate_params(self):
         """
         Additionnal parameters file validation
         """
         self.logger.debug("Validate params")
-        try:
-            self._validate_params()
-        except Exception as e:
-            self.logger.exception('')
-            exit(exit_code.ValidationParamsError)
+        with self.span("validate_params"):
+            try:
+                self._validate_params()
+            except Exception as e:
+                self.logger.exception('', extra={"exit_code": exit_code.ValidationParamsError})
+                exit(exit_code.ValidationParamsError)
 
-    def _build_logger(self, logfile, debug=False):
+    def _build_logger(self, logfile, debug=False, asynchronous=False, log_format="text"):
         """
         Build default logger
         """
         log_level = logging.INFO
         if debug:
             log_level = logging.DEBUG
-        return build_logger(logfile, level=log_level)
+        return build_logger(
+            logfile, level=log_level, asynchronous=asynchronous, log_format=log_format, fields=self.get_log_fields()
+        )
+
+    def get_log_fields(self):
+        """
+        Constant fields of the JSON log records
+        """
+        return {
+            "module": type(self).__name__,
+            "module_version": getattr(self.args, "module_version", None),
+            "prefix": self.args.prefix,
+        }
 
     def _validate_args(self):
         """
@@ -114,10 +519,46 @@ class BioitLauncher:
         """
         pass
 
+    def _read_cached_config(self, arg_name, reader, *key_parts):
+        """
+        Call a read_* method, or return its cached result if the config file given by args.<arg_name> didn't change.
+        The path checks of a cached config (ExistingFileType...) run again: its files may have been removed since.
+        """
+        if not self.cache_configs:
+            return reader()
+        from bioit_module.config_type import check_paths
+        cache = self.get_config_cache()
+        filename = getattr(self.args, arg_name, None)
+        key_parts = self._get_cache_key_parts() + (reader.__name__,) + key_parts
+        found, value = cache.lookup(filename, *key_parts)
+        if found:
+            check_paths(value)
+            return value
+        value = reader()
+        cache.store(filename, value, *key_parts)
+        return value
+
+    @classmethod
+    def _get_cache_key_parts(cls):
+        """
+        Config cache key of the launcher class: path and mtime of its source file, so two scripts defining launchers
+        with the same name (both in __main__) don't share entries, and an edited script reads its configs again
+        """
+        source_file = getattr(sys.modules.get(cls.__module__), "__file__", None)
+        if source_file is None:
+            return cls.__module__, cls.__qualname__
+        source_file = os.path.abspath(source_file)
+        try:
+            mtime = os.stat(source_file).st_mtime_ns
+        except OSError:
+            mtime = None
+        return source_file, mtime, cls.__qualname__
+
     def _read_config_file(self, filename):
         """
         Read a config file
         """
+        from configparser import ConfigParser
         config_parser = ConfigParser()
         config_parser.read(filename)
         return config_parser
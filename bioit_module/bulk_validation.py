@@ -0,0 +1,210 @@
+import functools
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from configparser import ConfigParser, Error as ConfigParserError
+from pathlib import Path
+from schematics.exceptions import DataError, FieldError
+from schematics.undefined import Undefined
+from schematics.validate import get_validation_context
+
+# Error key of the problems of the file itself (missing, invalid INI)
+FILE_ERROR = '__file__'
+
+# Building a ConfigParser costs more than reading a small file: one parser per thread, cleared between files
+_parsers = threading.local()
+
+
+class FieldValidator:
+    """
+    Validation of one field of a Model, extracted once from the Model class:
+    INI option names, required flag, default and the field conversion and validators
+    """
+    def __init__(self, model_class, field_name, field):
+        self.name = field_name
+        self.serialized_name = field.serialized_name or field_name
+        # ConfigParser lower-cases option names
+        self.option_names = [key.lower() for key in field.get_input_keys()]
+        self.required = field.required
+        self.field = field
+        self.model_validator = model_class._schema.validators.get(field_name)
+
+    def get_raw_value(self, options):
+        for option_name in self.option_names:
+            if option_name in options:
+                return options[option_name]
+        return Undefined
+
+
+@functools.lru_cache(maxsize=None)
+def compile_validators(model_class):
+    """
+    FieldValidators of a Model class, built once per process
+    """
+    return [FieldValidator(model_class, field_name, field) for field_name, field in model_class._schema.fields.items()]
+
+
+def read_options(filename, section=None):
+    """
+    Options of an INI file section, or of every section merged if section is None
+    """
+    config = getattr(_parsers, 'config', None)
+    if config is None:
+        config = _parsers.config = ConfigParser()
+    config.clear()
+    config.defaults().clear()
+    if not config.read(filename):
+        raise OSError("File doesn't exist or can't be read")
+    if section is not None:
+        return dict(config.items(section))
+    options = dict(config.defaults())
+    for section_name in config.sections():
+        options.update(config.items(section_name))
+    return options
+
+
+def validate_config_file(model_class, filename, section=None):
+    """
+    Validate the options of an INI file with the fields of a Model class.
+    Return a FileValidation with the native values and the errors of every field, model level errors included.
+    """
+    try:
+        options = read_options(filename, section)
+    except (OSError, ConfigParserError) as e:
+        return FileValidation(filename, {}, {FILE_ERROR: [str(e)]})
+    try:
+        return _validate_options(model_class, filename, options)
+    except Exception as e:
+        # A failing validator must not stop the validation of the other files
+        return FileValidation(filename, {}, {FILE_ERROR: ["{}: {}".format(type(e).__name__, e)]})
+
+
+def _validate_options(model_class, filename, options):
+    context = get_validation_context()
+    data = {}
+    errors = {}
+    validators = compile_validators(model_class)
+    for validator in validators:
+        value = validator.get_raw_value(options)
+        if value is Undefined:
+            if validator.required:
+                errors[validator.serialized_name] = [validator.field.messages['required']]
+            else:
+                data[validator.name] = validator.field.default
+            continue
+        try:
+            data[validator.name] = validator.field.validate(value, context)
+        except FieldError as e:
+            errors[validator.serialized_name] = e.to_primitive()
+    # Model level validate_<field>(self, data, value) methods of the valid fields, like Model.validate:
+    # they get a Model instance built from the converted values (invalid fields are None)
+    model_validators = [
+        validator for validator in validators
+        if validator.model_validator is not None and validator.serialized_name not in errors
+        and data.get(validator.name) is not None
+    ]
+    if not model_validators:
+        return FileValidation(filename, data, errors)
+    model_data = {validator.name: data.get(validator.name) for validator in validators}
+    model = model_class(trusted_data=model_data, lazy=True)
+    field_errors = bool(errors)
+    for validator in model_validators:
+        try:
+            validator.model_validator(model, model_data, data[validator.name], context)
+        except (FieldError, DataError) as e:
+            errors[validator.serialized_name] = e.to_primitive()
+        except Exception as e:
+            # A validator comparing with an invalid (None) field fails because of that field, already reported
+            if not field_errors:
+                errors[validator.serialized_name] = ["{}: {}".format(type(e).__name__, e)]
+    return FileValidation(filename, data, errors)
+
+
+class FileValidation:
+    def __init__(self, filename, data, errors):
+        self.filename = filename
+        self.data = data
+        self.errors = errors
+
+    @property
+    def valid(self):
+        return not self.errors
+
+
+class ValidationReport:
+    def __init__(self, results):
+        self.results = results
+
+    @property
+    def valid(self):
+        return all(result.valid for result in self.results)
+
+    @property
+    def failures(self):
+        return [result for result in self.results if not result.valid]
+
+    def to_primitive(self):
+        return {
+            'files': len(self.results),
+            'failures': {result.filename: result.errors for result in self.failures},
+        }
+
+    def format(self):
+        """
+        One line per invalid field: <file>: <field>: <messages>
+        """
+        lines = []
+        for result in self.failures:
+            for field_name, messages in result.errors.items():
+                lines.append("{}: {}: {}".format(result.filename, field_name, messages))
+        return "\n".join(lines)
+
+
+class BulkValidator:
+    """
+    Validate many INI files (per-sample parameters, install configs...) with a schematics Model, in one pass.
+    Field validators are extracted once from the Model class instead of converting each file with a Model,
+    files are validated on a process (or thread) pool and every failure is returned in one ValidationReport.
+    Options are matched to fields by field name, serialized_name or deserialize_from, case insensitively like
+    ConfigParser.get.
+    """
+    POOLS = {'thread': ThreadPoolExecutor, 'process': ProcessPoolExecutor}
+
+    def __init__(self, model_class, section=None, workers=None, pool='process'):
+        """
+        :param model_class: schematics Model class, defined at module level for the process pool
+        :param section: INI section of the options, every section merged if None
+        :param workers: number of workers, os.cpu_count() if None
+        :param pool: 'process' or 'thread'
+        """
+        self.model_class = model_class
+        self.section = section
+        self.workers = workers
+        self.pool = pool
+
+    @staticmethod
+    def list_files(files, pattern='*.ini'):
+        """
+        Sorted INI files of a directory, or the given list of files
+        """
+        if isinstance(files, (str, Path)) and Path(files).is_dir():
+            return sorted(str(path) for path in Path(files).glob(pattern))
+        if isinstance(files, (str, Path)):
+            return [str(files)]
+        return [str(filename) for filename in files]
+
+    def validate(self, files, pattern='*.ini'):
+        """
+        :param files: directory (files matching pattern) or list of INI files
+        :return: ValidationReport, results in the order of the files
+        """
+        filenames = self.list_files(files, pattern)
+        if not filenames:
+            return ValidationReport([])
+        validate = functools.partial(validate_config_file, self.model_class, section=self.section)
+        workers = self.workers or os.cpu_count() or 1
+        # Files are sent to worker processes by chunks, a file validation is too short to be sent alone
+        chunksize = max(1, len(filenames) // (workers * 4))
+        with self.POOLS[self.pool](max_workers=workers) as executor:
+            results = list(executor.map(validate, filenames, chunksize=chunksize))
+        return ValidationReport(results)
@@ -0,0 +1,78 @@
+import os
+import json
+import hashlib
+import threading
+from bioit_module.utils import atomic_write
+
+
+def file_fingerprint(filename, content=False):
+    """
+    Fingerprint of a file: size and mtime, or sha1 of the content if content is True. None if missing.
+    """
+    try:
+        stat = os.stat(filename)
+    except OSError:
+        return None
+    if not content:
+        return {'size': stat.st_size, 'mtime': stat.st_mtime_ns}
+    digest = hashlib.sha1()
+    with open(filename, 'rb') as input_file:
+        for block in iter(lambda: input_file.read(1024 * 1024), b''):
+            digest.update(block)
+    return {'size': stat.st_size, 'sha1': digest.hexdigest()}
+
+
+class Checkpoint:
+    """
+    Manifest of the completed steps of a launch, saved after each step.
+    A step is complete if its inputs and params fingerprint didn't change and its outputs are still
+    the files it wrote.
+    """
+    def __init__(self, manifest_file):
+        self.manifest_file = manifest_file
+        self._lock = threading.Lock()
+        self.steps = self._load()
+
+    def _load(self):
+        try:
+            with open(self.manifest_file) as manifest:
+                steps = json.load(manifest)
+        except (OSError, ValueError):
+            return {}
+        return steps if isinstance(steps, dict) else {}
+
+    @staticmethod
+    def fingerprint(inputs, params=None, content=False):
+        return {
+            'inputs': {str(path): file_fingerprint(str(path), content) for path in inputs},
+            'params': json.loads(json.dumps(params, sort_keys=True, default=str)),
+        }
+
+    def is_done(self, name, fingerprint, outputs, content=False):
+        step = self.steps.get(name)
+        if step is None or step.get('fingerprint') != fingerprint:
+            return False
+        recorded = step.get('outputs', {})
+        if set(recorded) != set(str(path) for path in outputs):
+            return False
+        return all(
+            fingerprint is not None and file_fingerprint(path, content) == fingerprint
+            for path, fingerprint in recorded.items()
+        )
+
+    def mark_done(self, name, fingerprint, outputs, content=False):
+        with self._lock:
+            self.steps[name] = {
+                'fingerprint': fingerprint,
+                'outputs': {str(path): file_fingerprint(str(path), content) for path in outputs},
+            }
+            self.save()
+
+    def reset(self):
+        with self._lock:
+            self.steps = {}
+            self.save()
+
+    def save(self):
+        with atomic_write(self.manifest_file, 'w') as manifest:
+            json.dump(self.steps, manifest, indent=2)
@@ -3,19 +3,32 @@ import re
 import os
 from pathlib import Path
 
+FILENAME_REGEX = re.compile(r"[^\w\s/\.@_\-+~$*=]")
+INTEGER_REGEX = re.compile(r"^\d+$")
+
 
 class CommandParser:
-    def __init__(self, version, default_install_config=None, need_parameters=True, need_pipeline_parameters=False):
+    # Number of threads checking paths existence in deferred_checks mode
+    check_workers = 32
+
+    def __init__(self, version, default_install_config=None, need_parameters=True, need_pipeline_parameters=False,
+                 deferred_checks=False):
         """
         :param version: script version
         :param default_install_config: if None, the -c argument isn't required
         :param need_parameters: if True, the -p argument is required
         :param need_pipeline_parameters: if True, the --pipe-params and --reference_dir argument are required.
+        :param deferred_checks: if True, files and directories existence is checked after parsing, concurrently,
+        and every invalid path is reported in one error
         """
+        self.deferred_checks = deferred_checks
         self.parser = argparse.ArgumentParser()
         self.parser.add_argument("-v", "--version", action="version", version=version)
+        self.parser.set_defaults(module_version=version)
         self.set_default_option()
         self.set_custom_option()
+        self.set_runtime_option()
+        self.set_threads_option()
         if default_install_config:
             self.set_install_config_option(default_install_config)
         if need_parameters:
@@ -53,6 +66,79 @@ class CommandParser:
             help="Set log level to debug.",
         )
 
+    def set_runtime_option(self):
+        """
+        Options of the launcher runtime (logs, metrics, checkpoints, memory, dry run).
+        Added after the custom options: an option already defined by the module is left to it.
+        """
+        self._add_free_option(
+            "--async-log",
+            dest="async_log",
+            default=False,
+            action="store_true",
+            help="Write logs from a background thread, logging calls don't wait for disk writes.",
+        )
+        self._add_free_option(
+            "--log-format",
+            dest="log_format",
+            default="text",
+            choices=["text", "json"],
+            help="Log format: text, or json for one JSON object per line (log shippers).",
+        )
+        self._add_free_option(
+            "--metrics",
+            dest="metrics",
+            default=False,
+            action="store_true",
+            help="Write time and resource usage of each phase in <prefix>.metrics.json.",
+        )
+        self._add_free_option(
+            "--restart",
+            dest="restart",
+            default=False,
+            action="store_true",
+            help="Run every step again, ignoring the steps completed by a previous run.",
+        )
+        self._add_free_option(
+            "--max-memory",
+            dest="max_memory",
+            required=False,
+            help="Memory limit (ex: 500M, 8G): exit with a memory limit error before being killed by the system.",
+            type=self._is_valid_memory
+        )
+        self._add_free_option(
+            "--dry-run",
+            dest="dry_run",
+            default=False,
+            action="store_true",
+            help="Validate arguments and configs, print the JSON plan of the job (inputs, outputs, memory, CPUs) "
+                 "without running it.",
+        )
+
+    def set_threads_option(self):
+        """
+        -t/--threads: number of worker processes of BioitLauncher.parallel_map.
+        Added after the custom options: -t is left to modules already using it.
+        """
+        self._add_free_option(
+            "-t",
+            "--threads",
+            dest="threads",
+            default=1,
+            help="Number of worker processes.",
+            type=self._is_valid_positive_integer
+        )
+
+    def _add_free_option(self, *option_strings, **kwargs):
+        """
+        Add an option with its option strings not used yet, skip it if its last (long) option string is used
+        """
+        free_option_strings = [
+            option for option in option_strings if option not in self.parser._option_string_actions
+        ]
+        if option_strings[-1] in free_option_strings:
+            self.parser.add_argument(*free_option_strings, **kwargs)
+
     def set_custom_option(self):
         """"
         Override this to add new argument
@@ -97,16 +183,74 @@ class CommandParser:
             type=self._is_valid_dir
         )
 
-    def parse(self):
-        return self.parser.parse_args()
+    def parse(self, args=None):
+        """
+        :param args: list of arguments, sys.argv if None
+        """
+        if not self.deferred_checks:
+            return self.parser.parse_args(args)
+        deferred_actions = self._defer_path_checks()
+        try:
+            namespace = self.parser.parse_args(args)
+        finally:
+            for action, path_type in deferred_actions:
+                action.type = path_type
+        self._check_paths(namespace, deferred_actions)
+        return namespace
+
+    def _defer_path_checks(self):
+        """
+        Replace the path types of the arguments by types checking only the name, return (action, original type)
+        """
+        deferred_actions = []
+        for action in self.parser._actions:
+            path_type = action.type
+            if path_type in (CommandParser._is_valid_file, CommandParser._is_valid_dir):
+                action.type = None
+            elif getattr(path_type, "extensions", None) is not None:
+                action.type = CommandParser._has_extension(path_type.extensions)
+            else:
+                continue
+            deferred_actions.append((action, path_type))
+        return deferred_actions
+
+    def _check_paths(self, namespace, deferred_actions):
+        """
+        Check every path parsed by a deferred action on a thread pool, exit with all errors at once
+        """
+        from concurrent.futures import ThreadPoolExecutor
+        checks = []
+        for action, path_type in deferred_actions:
+            values = getattr(namespace, action.dest, None)
+            # argparse doesn't apply type to non string defaults
+            if values is None or (values is action.default and not isinstance(values, str)):
+                continue
+            for value in values if isinstance(values, list) else [values]:
+                is_dir = path_type is CommandParser._is_valid_dir
+                if (value, is_dir) not in checks:
+                    checks.append((value, is_dir))
+        if not checks:
+            return
+        with ThreadPoolExecutor(max_workers=min(self.check_workers, len(checks))) as executor:
+            results = list(executor.map(lambda check: self._path_error(*check), checks))
+        errors = [error for error in results if error]
+        if errors:
+            self.parser.error("\n".join(errors))
+
+    @staticmethod
+    def _path_error(path, is_dir):
+        try:
+            (CommandParser._is_valid_dir if is_dir else CommandParser._is_valid_file)(path)
+        except argparse.ArgumentTypeError as e:
+            return str(e)
+        return None
 
     @staticmethod
     def _is_valid_filename(filename):
         """
         argparse type: check if a filename has valid character
         """
-        reg = re.compile(r"[^\w\s/\.@_\-+~$*=]")
-        if re.search(reg, filename):
+        if FILENAME_REGEX.search(filename):
             raise argparse.ArgumentTypeError("Invalid filename '{}' contains illegal characters.".format(filename))
         return filename
 
@@ -121,12 +265,36 @@ class CommandParser:
 
     @staticmethod
     def _is_valid_integer(num):
-        if not re.match(r"^\d+$", num):
+        if not INTEGER_REGEX.match(num):
             raise argparse.ArgumentTypeError(
                 "Invalid number '{}' contains illegal characters.".format(num)
             )
         return int(num)
 
+    @staticmethod
+    def _is_valid_positive_integer(num):
+        """
+        argparse type: integer of at least 1 (thread or worker count)
+        """
+        value = CommandParser._is_valid_integer(num)
+        if value < 1:
+            raise argparse.ArgumentTypeError("Invalid number '{}', must be at least 1.".format(num))
+        return value
+
+    @staticmethod
+    def _is_valid_memory(size):
+        """
+        argparse type: memory size (ex: 500M, 8G), converted to bytes
+        """
+        from bioit_module.memory_governor import parse_memory
+        try:
+            value = parse_memory(size)
+        except (ValueError, KeyError, OverflowError):
+            value = 0
+        if value <= 0:
+            raise argparse.ArgumentTypeError("Invalid memory size '{}'.".format(size))
+        return value
+
     @staticmethod
     def _is_valid_dir(directory):
         if not Path(directory).is_dir():
@@ -137,9 +305,19 @@ class CommandParser:
     def _is_valid_extension(extensions):
         def is_valid_extension(f):
             CommandParser._is_valid_file(f)
+            return CommandParser._has_extension(extensions)(f)
+        is_valid_extension.extensions = extensions
+        return is_valid_extension
+
+    @staticmethod
+    def _has_extension(extensions):
+        """
+        argparse type: extension check of _is_valid_extension, without the existence check
+        """
+        def has_extension(f):
             for extension in extensions:
                 if f.endswith(extension):
                     return f
             raise argparse.ArgumentTypeError("{} need to end with {}".format(f, extensions))
-        return is_valid_extension
+        return has_extension
 
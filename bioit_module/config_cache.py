@@ -0,0 +1,191 @@
+import os
+import hashlib
+import importlib
+import pickle
+import tempfile
+import threading
+from collections import OrderedDict
+
+
+class ConfigCache:
+    """
+    Cache of parsed and validated config files.
+    An entry is keyed by the file path, mtime and size, so a modified file is read again.
+    Entries are kept in an in-process LRU and, if cache_dir is defined, pickled in cache_dir
+    so the next invocations on the same node skip parsing and validation.
+    cache_dir must only be writable by the user running the modules.
+    """
+    def __init__(self, maxsize=128, cache_dir=None):
+        self.maxsize = maxsize
+        self.cache_dir = cache_dir
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, filename, loader, *key_parts):
+        """
+        Return the cached value of a file, call loader() to build it if missing
+        :param filename: config file the value is built from
+        :param loader: function building the value
+        :param key_parts: additional key parts (reader name, other arguments used by loader...)
+        """
+        found, value = self.lookup(filename, *key_parts)
+        if found:
+            return value
+        value = loader()
+        self.store(filename, value, *key_parts)
+        return value
+
+    def lookup(self, filename, *key_parts):
+        """
+        Return (True, value) if a value of this file is cached, (False, None) else
+        """
+        key = self._build_key(filename, key_parts)
+        if key is None:
+            return False, None
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                return True, self._entries[key]
+        found, value = self._load(key)
+        if found:
+            self._remember(key, value)
+        return found, value
+
+    def store(self, filename, value, *key_parts):
+        key = self._build_key(filename, key_parts)
+        if key is None:
+            return
+        self._dump(key, value)
+        self._remember(key, value)
+
+    def _remember(self, key, value):
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, filename=None):
+        """
+        Remove the entries of a file, or every entries if filename is None.
+        Return the number of entries removed from memory and from disk.
+        """
+        path = None if filename is None else os.path.abspath(filename)
+        with self._lock:
+            keys = [key for key in self._entries if path is None or key[0] == path]
+            for key in keys:
+                del self._entries[key]
+        removed = len(keys)
+        if self.cache_dir and os.path.isdir(self.cache_dir):
+            for name in os.listdir(self.cache_dir):
+                if not name.endswith('.pickle'):
+                    continue
+                if path is None or (self._load_key(name) or (None,))[0] == path:
+                    self._remove(os.path.join(self.cache_dir, name))
+                    removed += 1
+        return removed
+
+    @staticmethod
+    def _build_key(filename, key_parts):
+        if filename is None:
+            return None
+        try:
+            stat = os.stat(filename)
+        except OSError:
+            return None
+        return (os.path.abspath(filename), stat.st_mtime_ns, stat.st_size) + tuple(str(part) for part in key_parts)
+
+    def _cache_file(self, key):
+        return os.path.join(self.cache_dir, hashlib.sha1(repr(key).encode()).hexdigest() + '.pickle')
+
+    def _load(self, key):
+        if not self.cache_dir:
+            return False, None
+        try:
+            with open(self._cache_file(key), 'rb') as cache_file:
+                cached_key, value = pickle.load(cache_file)
+            if cached_key != key:
+                return False, None
+            return True, unpack_config(value)
+        except Exception:
+            return False, None
+
+    def _load_key(self, name):
+        try:
+            with open(os.path.join(self.cache_dir, name), 'rb') as cache_file:
+                return pickle.load(cache_file)[0]
+        except Exception:
+            return None
+
+    def _dump(self, key, value):
+        """
+        Atomic write of a cache file, a value that can't be pickled is only kept in memory
+        """
+        if not self.cache_dir:
+            return
+        tmp_file = None
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            fd, tmp_file = tempfile.mkstemp(dir=self.cache_dir, suffix='.tmp')
+            with os.fdopen(fd, 'wb') as cache_file:
+                pickle.dump((key, pack_config(value)), cache_file)
+            os.replace(tmp_file, self._cache_file(key))
+        except Exception:
+            self._remove(tmp_file)
+
+    @staticmethod
+    def _remove(filename):
+        if filename is None:
+            return
+        try:
+            os.remove(filename)
+        except OSError:
+            pass
+
+
+class _PackedModel:
+    """
+    schematics models can't be pickled: keep their class and native data
+    """
+    def __init__(self, model):
+        self.module = type(model).__module__
+        self.name = type(model).__qualname__
+        self.data = model.to_native()
+
+    def unpack(self):
+        model_class = importlib.import_module(self.module)
+        for name in self.name.split('.'):
+            model_class = getattr(model_class, name)
+        return model_class(self.data)
+
+
+def pack_config(value):
+    """
+    Picklable form of a config: a schematics model is replaced by its class and native data
+    """
+    from schematics.models import Model
+    if isinstance(value, Model):
+        return _PackedModel(value)
+    return value
+
+
+def unpack_config(value):
+    """
+    Config packed by pack_config
+    """
+    if isinstance(value, _PackedModel):
+        return value.unpack()
+    return value
+
+
+_config_cache = None
+
+
+def get_config_cache():
+    """
+    Cache shared by the process, stored on disk in $BIOIT_CONFIG_CACHE_DIR if defined
+    """
+    global _config_cache
+    if _config_cache is None:
+        _config_cache = ConfigCache(cache_dir=os.environ.get('BIOIT_CONFIG_CACHE_DIR'))
+    return _config_cache
@@ -1,6 +1,7 @@
-import os
-from schematics.types import BaseType
+from schematics.models import Model
+from schematics.types import BaseType, ListType
 from schematics.exceptions import ValidationError
+from bioit_module.path_cache import get_path_cache
 
 
 class ExistingFileType(BaseType):
@@ -9,5 +10,54 @@ class ExistingFileType(BaseType):
     Validate if file exist
     """
     def validate_isfile(self, filename):
-        if not os.path.isfile(filename):
-            raise ValidationError("File doesn't exist")
\ No newline at end of file
+        if not get_path_cache().is_file(filename):
+            raise ValidationError("File doesn't exist")
+
+
+class ExistingDirType(BaseType):
+    """
+    Schematics type.
+    Validate if directory exist
+    """
+    def validate_isdir(self, directory):
+        if not get_path_cache().is_dir(directory):
+            raise ValidationError("Directory doesn't exist")
+
+
+class ExecutableFileType(ExistingFileType):
+    """
+    Schematics type.
+    Validate if file exist and is executable (tool binaries of the install config)
+    """
+    def validate_isexecutable(self, filename):
+        cache = get_path_cache()
+        if cache.is_file(filename) and not cache.is_executable(filename):
+            raise ValidationError("File isn't executable")
+
+
+def check_paths(value):
+    """
+    Run the path checks of a schematics model again (ExistingFileType, ExistingDirType, ExecutableFileType fields,
+    in lists and nested models too): a config read from the config cache was validated when it was cached,
+    its files may have been removed or changed since. Raise ValidationError on the first invalid path.
+    """
+    if isinstance(value, Model):
+        for name, field in value._fields.items():
+            if value[name] is not None:
+                _check_field_paths(name, field, value[name])
+    elif isinstance(value, (list, tuple)):
+        for item in value:
+            check_paths(item)
+
+
+def _check_field_paths(name, field, value):
+    if isinstance(field, ListType):
+        for item in value:
+            _check_field_paths(name, field.field, item)
+    elif isinstance(field, (ExistingFileType, ExistingDirType)):
+        try:
+            field.validate(value)
+        except ValidationError as e:
+            raise ValidationError("{} ({}): {}".format(name, value, "; ".join(str(message) for message in e.messages)))
+    else:
+        check_paths(value)
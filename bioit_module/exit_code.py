@@ -4,6 +4,7 @@ NoOptionError = 4
 ValidationError = 5
 ValidationInstallConfigError = 6
 ValidationParamsError = 7
+MemoryLimitError = 8
 SigKillOOM = 137
 SigSegv = 139
 SigTerm = 143
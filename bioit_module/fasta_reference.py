@@ -0,0 +1,174 @@
+import os
+import mmap
+import hashlib
+from bioit_module.utils import atomic_write, get_cache_dir
+
+
+class FaidxEntry:
+    """
+    One line of a .fai file
+    """
+    def __init__(self, name, length, offset, line_bases, line_width):
+        self.name = name
+        self.length = length
+        self.offset = offset
+        self.line_bases = line_bases
+        self.line_width = line_width
+
+    def file_offset(self, position):
+        """
+        Offset in the fasta file of a 0-based position of the sequence
+        """
+        return self.offset + (position // self.line_bases) * self.line_width + position % self.line_bases
+
+
+class FastaReference:
+    """
+    Random access to an uncompressed fasta file through its faidx (.fai) index and mmap.
+    The file is mapped read only: the pages are shared by every process reading the same
+    reference on a node and only the fetched regions are read.
+    Coordinates are 0-based, end excluded, like samtools/pysam fetch.
+    """
+    def __init__(self, fasta_file, fai_file=None):
+        self.fasta_file = str(fasta_file)
+        self.fai_file = str(fai_file) if fai_file else self.find_or_build_fai(self.fasta_file)
+        self.entries = self.read_fai(self.fai_file)
+        with open(self.fasta_file, 'rb') as fasta:
+            self._mmap = mmap.mmap(fasta.fileno(), 0, access=mmap.ACCESS_READ)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def close(self):
+        self._mmap.close()
+
+    @property
+    def references(self):
+        return list(self.entries)
+
+    def get_length(self, chrom):
+        return self._get_entry(chrom).length
+
+    def fetch(self, chrom, start=0, end=None):
+        """
+        Sequence of chrom between start and end as a str
+        """
+        return bytes(self.fetch_raw(chrom, start, end)).decode('ascii')
+
+    def fetch_raw(self, chrom, start=0, end=None):
+        """
+        Sequence of chrom between start and end: a zero-copy memoryview of the mapped file if the region is
+        on one fasta line, bytes without the line breaks otherwise
+        """
+        entry = self._get_entry(chrom)
+        start, end = self._clip(entry, start, end)
+        if start == end:
+            return b''
+        first = entry.file_offset(start)
+        last = entry.file_offset(end - 1) + 1
+        if last - first == end - start:
+            return memoryview(self._mmap)[first:last]
+        sequence = bytearray()
+        position = start
+        while position < end:
+            line_end = min(end, (position // entry.line_bases + 1) * entry.line_bases)
+            offset = entry.file_offset(position)
+            sequence += self._mmap[offset:offset + line_end - position]
+            position = line_end
+        return bytes(sequence)
+
+    def fetch_many(self, intervals):
+        """
+        Fetch many (chrom, start, end) intervals at once, in the order of the file to read pages sequentially.
+        Sequences are returned in the order of intervals.
+        """
+        intervals = list(intervals)
+        order = sorted(
+            range(len(intervals)),
+            key=lambda i: self._get_entry(intervals[i][0]).file_offset(max(0, intervals[i][1]))
+        )
+        sequences = [None] * len(intervals)
+        for i in order:
+            sequences[i] = self.fetch(*intervals[i])
+        return sequences
+
+    def _get_entry(self, chrom):
+        if chrom not in self.entries:
+            raise KeyError("{} not found in {}".format(chrom, self.fai_file))
+        return self.entries[chrom]
+
+    @staticmethod
+    def _clip(entry, start, end):
+        end = entry.length if end is None else min(end, entry.length)
+        start = max(0, start)
+        if start > end:
+            raise ValueError("Invalid interval {}:{}-{}".format(entry.name, start, end))
+        return start, end
+
+    @staticmethod
+    def read_fai(fai_file):
+        entries = {}
+        with open(fai_file) as fai:
+            for line in fai:
+                fields = line.rstrip('\n').split('\t')
+                if len(fields) < 5:
+                    continue
+                entries[fields[0]] = FaidxEntry(fields[0], *[int(field) for field in fields[1:5]])
+        return entries
+
+    @classmethod
+    def find_or_build_fai(cls, fasta_file):
+        """
+        Return <fasta>.fai if up to date, else a .fai in the cache directory, build it there if needed
+        """
+        cached_fai = os.path.join(
+            get_cache_dir(), hashlib.sha1(os.path.abspath(fasta_file).encode()).hexdigest() + '.fai'
+        )
+        candidates = [fasta_file + '.fai', cached_fai]
+        for candidate in candidates:
+            if os.path.isfile(candidate) and os.path.getmtime(candidate) >= os.path.getmtime(fasta_file):
+                return candidate
+        error = None
+        for candidate in candidates:
+            try:
+                cls.build_fai(fasta_file, candidate)
+                return candidate
+            except OSError as e:
+                error = e
+        raise error
+
+    @staticmethod
+    def build_fai(fasta_file, fai_file):
+        """
+        Build a samtools faidx compatible index
+        """
+        entries = []
+        entry = None
+        offset = 0
+        last_line = False
+        with open(fasta_file, 'rb') as fasta:
+            for line in fasta:
+                offset += len(line)
+                if line.startswith(b'>'):
+                    entry = [line[1:].split()[0].decode(), 0, offset, None, None]
+                    entries.append(entry)
+                    last_line = False
+                    continue
+                bases = len(line.rstrip(b'\r\n'))
+                if entry is None or bases == 0:
+                    continue
+                if entry[3] is None:
+                    entry[3], entry[4] = bases, len(line)
+                elif last_line or bases > entry[3]:
+                    # Only the last line of a sequence can be shorter
+                    raise Exception("Different line length in sequence {} of {}".format(entry[0], fasta_file))
+                last_line = bases < entry[3]
+                entry[1] += bases
+        with atomic_write(fai_file, 'w') as fai:
+            for name, length, sequence_offset, line_bases, line_width in entries:
+                fai.write("{}\t{}\t{}\t{}\t{}\n".format(
+                    name, length, sequence_offset, line_bases or 0, line_width or 0
+                ))
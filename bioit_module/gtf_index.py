@@ -0,0 +1,354 @@
+import os
+import re
+import json
+import mmap
+import struct
+import hashlib
+from array import array
+from bisect import bisect_left
+from bioit_module.utils import atomic_write, get_cache_dir
+
+
+class GtfFeature:
+    """
+    gene or transcript of a GTF file, 1-based closed coordinates like the GTF
+    """
+    def __init__(self, index, record):
+        self._index = index
+        self.record = record
+        self.id = index._string('ids', record)
+        self.name = index._string('names', record)
+        self.feature = GtfIndex.FEATURES[index._column('feature')[record]]
+        self.chrom = index._string('chroms', index._column('chrom')[record])
+        self.start = index._column('start')[record]
+        self.end = index._column('end')[record]
+        self.strand = GtfIndex.STRANDS[index._column('strand')[record]]
+        parent = index._column('parent')[record]
+        self.parent = None if parent < 0 else parent
+        self.offset = index._column('block_start')[record]
+        self.length = index._column('block_end')[record] - self.offset
+
+    def get_gene(self):
+        if self.parent is None:
+            return self
+        return GtfFeature(self._index, self.parent)
+
+    def read_lines(self):
+        """
+        GTF lines of this feature: the gene or transcript line and the lines of its children (exon, CDS...)
+        """
+        return self._index.read_lines(self.offset, self.length)
+
+    def __repr__(self):
+        return "GtfFeature({} {} {}:{}-{}{})".format(self.feature, self.id, self.chrom, self.start, self.end, self.strand)
+
+
+class GtfIndex:
+    """
+    Compact on-disk index of the genes and transcripts of a GTF file.
+    The index is built once in one streaming pass over the GTF, then memory-mapped: columns are
+    typed arrays read directly from the mapped file, nothing is loaded in memory.
+    The GTF is expected grouped like the gencode files: each gene line followed by its transcripts,
+    each transcript line followed by its exons/CDS/UTR...
+    """
+    MAGIC = b"BIOITGTF1\n"
+    FEATURES = ['gene', 'transcript']
+    STRANDS = ['+', '-', '.']
+    ATTRIBUTE_REGEX = re.compile(r'(gene_id|transcript_id|gene_name|transcript_name) "([^"]*)"')
+    COLUMNS = {
+        'chrom': 'I', 'start': 'I', 'end': 'I', 'strand': 'B', 'feature': 'B', 'parent': 'i',
+        'block_start': 'Q', 'block_end': 'Q',
+    }
+
+    def __init__(self, index_file, gtf_file):
+        self.index_file = str(index_file)
+        self.gtf_file = str(gtf_file)
+        with open(self.index_file, 'rb') as index:
+            self._mmap = mmap.mmap(index.fileno(), 0, access=mmap.ACCESS_READ)
+        header_size = struct.unpack_from('<Q', self._mmap, len(self.MAGIC))[0]
+        header_start = len(self.MAGIC) + 8
+        self.header = json.loads(self._mmap[header_start:header_start + header_size].decode())
+        self._data_start = header_start + header_size
+        self._view = memoryview(self._mmap)
+        self._columns = {}
+        self._strings = {}
+        self._gtf = None
+
+    @classmethod
+    def open(cls, gtf_file, index_file=None):
+        """
+        Open the index of a GTF file, build it if missing or if the GTF changed.
+        Default index file is <gtf>.bioidx, or a file in ~/.cache/bioit_module if the GTF directory is read only.
+        """
+        gtf_file = str(gtf_file)
+        candidates = [index_file] if index_file else cls.default_index_files(gtf_file)
+        for candidate in candidates:
+            if cls.is_up_to_date(candidate, gtf_file):
+                return cls(candidate, gtf_file)
+        error = None
+        for candidate in candidates:
+            try:
+                cls.build(gtf_file, candidate)
+                return cls(candidate, gtf_file)
+            except OSError as e:
+                error = e
+        raise error
+
+    @staticmethod
+    def default_index_files(gtf_file):
+        name = hashlib.sha1(os.path.abspath(gtf_file).encode()).hexdigest() + '.bioidx'
+        return [gtf_file + '.bioidx', os.path.join(get_cache_dir(), name)]
+
+    @classmethod
+    def is_up_to_date(cls, index_file, gtf_file):
+        try:
+            with open(index_file, 'rb') as index:
+                if index.read(len(cls.MAGIC)) != cls.MAGIC:
+                    return False
+                header_size = struct.unpack('<Q', index.read(8))[0]
+                header = json.loads(index.read(header_size).decode())
+            stat = os.stat(gtf_file)
+        except (OSError, ValueError, struct.error):
+            return False
+        return header.get('gtf_size') == stat.st_size and header.get('gtf_mtime') == stat.st_mtime_ns
+
+    @classmethod
+    def build(cls, gtf_file, index_file):
+        """
+        Build the index in one streaming pass, only genes and transcripts are kept in memory
+        """
+        stat = os.stat(gtf_file)
+        chroms = {}
+        columns = {name: array(typecode) for name, typecode in cls.COLUMNS.items()}
+        ids = []
+        names = []
+        open_blocks = {}
+        offset = 0
+        with open(gtf_file, 'rb') as gtf:
+            for line in gtf:
+                line_offset = offset
+                offset += len(line)
+                if line.startswith(b'#'):
+                    continue
+                fields = line.rstrip(b'\n').split(b'\t', 8)
+                if len(fields) < 9 or fields[2] not in (b'gene', b'transcript'):
+                    continue
+                feature = cls.FEATURES.index(fields[2].decode())
+                # A gene line ends the previous gene and transcript blocks, a transcript line the previous transcript
+                for closed in range(feature, 2):
+                    if closed in open_blocks:
+                        columns['block_end'][open_blocks.pop(closed)] = line_offset
+                attributes = dict(cls.ATTRIBUTE_REGEX.findall(fields[8].decode()))
+                chrom = fields[0].decode()
+                record = len(ids)
+                columns['chrom'].append(chroms.setdefault(chrom, len(chroms)))
+                columns['start'].append(int(fields[3]))
+                columns['end'].append(int(fields[4]))
+                columns['strand'].append(cls.STRANDS.index(fields[6].decode()) if fields[6] in (b'+', b'-') else 2)
+                columns['feature'].append(feature)
+                columns['parent'].append(open_blocks.get(0, -1) if feature == 1 else -1)
+                columns['block_start'].append(line_offset)
+                columns['block_end'].append(0)
+                if feature == 0:
+                    ids.append(attributes.get('gene_id', ''))
+                    names.append(attributes.get('gene_name', ''))
+                else:
+                    ids.append(attributes.get('transcript_id', ''))
+                    names.append(attributes.get('transcript_name', ''))
+                open_blocks[feature] = record
+        for record in open_blocks.values():
+            columns['block_end'][record] = offset
+        cls._write(index_file, stat, chroms, columns, ids, names)
+
+    @classmethod
+    def _write(cls, index_file, stat, chroms, columns, ids, names):
+        # Records sorted by chromosome then start, so overlap queries are binary searches
+        order = sorted(range(len(ids)), key=lambda record: (columns['chrom'][record], columns['start'][record]))
+        new_position = array('i', [0] * len(order))
+        for position, record in enumerate(order):
+            new_position[record] = position
+        sorted_columns = {}
+        for name, column in columns.items():
+            sorted_columns[name] = array(column.typecode, (column[record] for record in order))
+        sorted_columns['parent'] = array('i', (
+            -1 if parent < 0 else new_position[parent] for parent in sorted_columns['parent']
+        ))
+        ids = [ids[record] for record in order]
+        names = [names[record] for record in order]
+
+        chrom_names = sorted(chroms, key=chroms.get)
+        chrom_first = array('I', [0] * len(chrom_names))
+        chrom_count = array('I', [0] * len(chrom_names))
+        chrom_max_length = array('I', [0] * len(chrom_names))
+        for position in range(len(order)):
+            chrom = sorted_columns['chrom'][position]
+            if chrom_count[chrom] == 0:
+                chrom_first[chrom] = position
+            chrom_count[chrom] += 1
+            length = sorted_columns['end'][position] - sorted_columns['start'][position]
+            chrom_max_length[chrom] = max(chrom_max_length[chrom], length)
+
+        # Lookup keys: ids, ids without version and names
+        keys = {}
+        for position, (feature_id, name) in enumerate(zip(ids, names)):
+            for key in {feature_id, feature_id.split('.')[0], name}:
+                if key:
+                    keys.setdefault(key, []).append(position)
+        sorted_keys = sorted(keys)
+        key_first = array('I')
+        key_records = array('I')
+        for key in sorted_keys:
+            key_first.append(len(key_records))
+            key_records.extend(keys[key])
+        key_first.append(len(key_records))
+
+        sections = dict(sorted_columns)
+        for name, strings in [('ids', ids), ('names', names), ('chroms', chrom_names), ('keys', sorted_keys)]:
+            sections[name + '_offsets'], sections[name + '_data'] = cls._string_table(strings)
+        sections['chrom_first'] = chrom_first
+        sections['chrom_count'] = chrom_count
+        sections['chrom_max_length'] = chrom_max_length
+        sections['key_first'] = key_first
+        sections['key_records'] = key_records
+
+        header = {
+            'gtf_size': stat.st_size,
+            'gtf_mtime': stat.st_mtime_ns,
+            'records': len(ids),
+            'chroms': chrom_names,
+            'sections': {},
+        }
+        # Section offsets are relative to the end of the header, 8 bytes aligned
+        data = bytearray()
+        for name, section in sections.items():
+            data.extend(b'\0' * (-len(data) % 8))
+            raw = section if isinstance(section, bytes) else section.tobytes()
+            typecode = 'B' if isinstance(section, bytes) else section.typecode
+            header['sections'][name] = [len(data), typecode, len(raw)]
+            data.extend(raw)
+        header_bytes = json.dumps(header).encode()
+        header_bytes += b' ' * (-(len(cls.MAGIC) + 8 + len(header_bytes)) % 8)
+
+        with atomic_write(index_file) as index:
+            index.write(cls.MAGIC)
+            index.write(struct.pack('<Q', len(header_bytes)))
+            index.write(header_bytes)
+            index.write(data)
+
+    @staticmethod
+    def _string_table(strings):
+        offsets = array('Q', [0])
+        data = bytearray()
+        for string in strings:
+            data.extend(string.encode())
+            offsets.append(len(data))
+        return offsets, bytes(data)
+
+    def __len__(self):
+        return self.header['records']
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def close(self):
+        # Views must be released before the mmap can be closed
+        for column in self._columns.values():
+            column.release()
+        for offsets, data in self._strings.values():
+            offsets.release()
+            data.release()
+        self._columns = {}
+        self._strings = {}
+        self._view.release()
+        self._mmap.close()
+        if self._gtf is not None:
+            self._gtf.close()
+            self._gtf = None
+
+    def get_chroms(self):
+        return list(self.header['chroms'])
+
+    def lookup(self, key):
+        """
+        Features whose id (with or without version) or name is key
+        """
+        offsets, data = self._string_section('keys')
+        low, high = 0, len(offsets) - 1
+        encoded = key.encode()
+        while low < high:
+            middle = (low + high) // 2
+            if bytes(data[offsets[middle]:offsets[middle + 1]]) < encoded:
+                low = middle + 1
+            else:
+                high = middle
+        if low == len(offsets) - 1 or bytes(data[offsets[low]:offsets[low + 1]]) != encoded:
+            return []
+        key_first = self._column('key_first')
+        key_records = self._column('key_records')
+        return [GtfFeature(self, key_records[i]) for i in range(key_first[low], key_first[low + 1])]
+
+    def overlap(self, chrom, start, end, feature=None):
+        """
+        Features overlapping [start, end] (1-based, closed)
+        :param feature: 'gene' or 'transcript' to keep only one kind of features
+        """
+        if chrom not in self.header['chroms']:
+            return []
+        chrom_id = self.header['chroms'].index(chrom)
+        first = self._column('chrom_first')[chrom_id]
+        last = first + self._column('chrom_count')[chrom_id]
+        starts = self._column('start')
+        ends = self._column('end')
+        # Records are sorted by start: a feature overlapping the query starts after start - longest feature
+        low = bisect_left(starts, start - self._column('chrom_max_length')[chrom_id], first, last)
+        high = bisect_left(starts, end + 1, low, last)
+        features = self._column('feature')
+        feature_id = None if feature is None else self.FEATURES.index(feature)
+        return [
+            GtfFeature(self, record) for record in range(low, high)
+            if ends[record] >= start and (feature_id is None or features[record] == feature_id)
+        ]
+
+    def iter_chrom(self, chrom, feature=None):
+        """
+        Stream the features of a chromosome, sorted by start
+        """
+        if chrom not in self.header['chroms']:
+            return
+        chrom_id = self.header['chroms'].index(chrom)
+        first = self._column('chrom_first')[chrom_id]
+        features = self._column('feature')
+        feature_id = None if feature is None else self.FEATURES.index(feature)
+        for record in range(first, first + self._column('chrom_count')[chrom_id]):
+            if feature_id is None or features[record] == feature_id:
+                yield GtfFeature(self, record)
+
+    def read_lines(self, offset, length):
+        if self._gtf is None:
+            self._gtf = open(self.gtf_file, 'rb')
+        self._gtf.seek(offset)
+        return self._gtf.read(length).decode().splitlines()
+
+    def _section(self, name):
+        """
+        Zero-copy typed view of a section of the mapped index
+        """
+        offset, typecode, size = self.header['sections'][name]
+        return self._view[self._data_start + offset:self._data_start + offset + size].cast(typecode)
+
+    def _column(self, name):
+        if name not in self._columns:
+            self._columns[name] = self._section(name)
+        return self._columns[name]
+
+    def _string_section(self, name):
+        if name not in self._strings:
+            self._strings[name] = (self._section(name + '_offsets'), self._section(name + '_data'))
+        return self._strings[name]
+
+    def _string(self, name, position):
+        offsets, data = self._string_section(name)
+        return bytes(data[offsets[position]:offsets[position + 1]]).decode()
@@ -1,25 +1,317 @@
+import atexit
+import contextvars
+import json
 import logging
+import queue
+import sys
+import threading
+import time
+from contextlib import contextmanager
 
+# Overflow policies of the asynchronous logging queue
+BLOCK = "block"
+DROP = "drop"
 
-def build_logger(filename=None, level="INFO"):
+# Log formats
+TEXT = "text"
+JSON = "json"
+
+_listener = None
+
+# Launcher phase (span name) of the current thread, added to the records by PhaseFilter (contextvars: Python 3.7+)
+_phase = contextvars.ContextVar("bioit_phase", default=None)
+
+
+def build_formatter(log_format=TEXT, fields=None):
+    """
+    :param log_format: TEXT for humans, JSON for one JSON object per line
+    :param fields: constant fields of the JSON records (module, module_version, prefix...)
+    """
+    if log_format == JSON:
+        return JsonFormatter(fields)
+    return logging.Formatter(
+        "%(asctime)s [%(levelname)-5.5s]  %(message)s", datefmt="%Y-%m-%d %H:%M:%S"
+    )
+
+
+def build_logger(filename=None, level="INFO", asynchronous=False, queue_size=10000, overflow=BLOCK,
+                 log_format=TEXT, fields=None):
+    """
+    Configure the root logger: file (if filename) and console output.
+    :param asynchronous: if True, records are put in a queue and written by a background thread
+    :param queue_size: maximum number of records waiting in the queue
+    :param overflow: what to do when the queue is full: BLOCK the caller until there is room or DROP the record
+    :param log_format: TEXT or JSON, see build_formatter
+    :param fields: constant fields of the JSON records
+    """
     root_logger = logging.getLogger()
 
     if root_logger.handlers:
         return root_logger
 
-    log_formatter = logging.Formatter(
-        "%(asctime)s [%(levelname)-5.5s]  %(message)s", datefmt="%Y-%m-%d %H:%M:%S"
-    )
+    log_formatter = build_formatter(log_format, fields)
 
     root_logger.setLevel(level)
 
+    handlers = []
     if filename:
-        file_handler = logging.FileHandler(filename)
+        file_handler = BatchFlushFileHandler(filename) if asynchronous else logging.FileHandler(filename)
         file_handler.setFormatter(log_formatter)
-        root_logger.addHandler(file_handler)
+        handlers.append(file_handler)
 
-    console_handler = logging.StreamHandler()
+    console_handler = BatchFlushStreamHandler() if asynchronous else logging.StreamHandler()
     console_handler.setFormatter(log_formatter)
-    root_logger.addHandler(console_handler)
+    handlers.append(console_handler)
+
+    if asynchronous:
+        global _listener
+        _listener = AsyncLogListener(handlers, queue_size)
+        # The phase is read in the logging thread, before the record is queued
+        queue_handler = _listener.build_queue_handler(overflow)
+        queue_handler.addFilter(PhaseFilter())
+        root_logger.addHandler(queue_handler)
+        _listener.start()
+    else:
+        for handler in handlers:
+            handler.addFilter(PhaseFilter())
+            root_logger.addHandler(handler)
 
     return root_logger
+
+
+def flush_logger():
+    """
+    Wait until every queued record is written. No-op with synchronous logging.
+    """
+    if _listener is not None:
+        _listener.flush()
+
+
+def stop_logger():
+    """
+    Write the queued records and stop the asynchronous logging thread.
+    Registered at exit, so exit(exit_code.*) doesn't lose records.
+    """
+    global _listener
+    if _listener is not None:
+        logging.getLogger().removeHandler(_listener.queue_handler)
+        _listener.stop()
+        _listener = None
+
+
+atexit.register(stop_logger)
+
+
+@contextmanager
+def log_phase(phase):
+    """
+    Records logged by the current thread in this block have this phase
+    """
+    token = _phase.set(phase)
+    try:
+        yield
+    finally:
+        _phase.reset(token)
+
+
+class PhaseFilter(logging.Filter):
+    """
+    Add the current phase to the records, unless given with extra={"phase": ...}
+    """
+    def filter(self, record):
+        if not hasattr(record, "phase"):
+            record.phase = _phase.get()
+        return True
+
+
+class JsonFormatter(logging.Formatter):
+    """
+    One JSON object per record, for log shippers: time, level, logger, message, the constant fields
+    (module, module_version, prefix...), phase, and exit_code or suppressed if the record has them
+    """
+    RECORD_FIELDS = ["phase", "exit_code", "suppressed"]
+
+    def __init__(self, fields=None):
+        super().__init__()
+        self.fields = {key: value for key, value in (fields or {}).items() if value is not None}
+
+    def format(self, record):
+        data = {
+            "time": self.formatTime(record, "%Y-%m-%dT%H:%M:%S") + ".{:03d}".format(int(record.msecs)),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        data.update(self.fields)
+        for field in self.RECORD_FIELDS:
+            value = getattr(record, field, None)
+            if value is not None:
+                data[field] = value
+        if record.exc_info:
+            data["exception"] = self.formatException(record.exc_info)
+        return json.dumps(data, default=str)
+
+
+class LogSampler:
+    """
+    Decide, per call site, if a repeated log call is written: at most one record every n calls
+    and/or every `seconds` seconds. The other calls are counted and the count is added to the next record.
+    """
+    def __init__(self):
+        self._sites = {}
+        self._lock = threading.Lock()
+
+    def should_log(self, key, every_n=None, seconds=None):
+        """
+        :return: (True, calls suppressed since the last record) or (False, None)
+        """
+        now = time.monotonic()
+        with self._lock:
+            site = self._sites.get(key)
+            if site is None:
+                # [calls since the last record, time of the last record]
+                self._sites[key] = [0, now]
+                return True, 0
+            site[0] += 1
+            if (every_n is None or site[0] >= every_n) and (seconds is None or now - site[1] >= seconds):
+                suppressed = site[0] - 1
+                site[0] = 0
+                site[1] = now
+                return True, suppressed
+            return False, None
+
+    def reset(self):
+        with self._lock:
+            self._sites.clear()
+
+
+_sampler = LogSampler()
+
+
+def get_call_site(depth=1):
+    """
+    (file, line) of the caller of the function calling get_call_site, depth frames up
+    """
+    frame = sys._getframe(depth + 1)
+    return frame.f_code.co_filename, frame.f_lineno
+
+
+def log_sampled(logger, level, msg, *args, every_n=None, seconds=None, key=None, **kwargs):
+    """
+    Log like logger.log, at most once every every_n calls and/or every `seconds` seconds of the same call site.
+    Use it for debug output in hot loops: suppressed calls cost a counter increment, and nothing
+    if the level is disabled. The record says how many calls were suppressed before it.
+    :param key: call site key, the (file, line) of the caller if None
+    """
+    if not logger.isEnabledFor(level):
+        return
+    if key is None:
+        key = get_call_site()
+    log, suppressed = _sampler.should_log(key, every_n, seconds)
+    if not log:
+        return
+    if suppressed:
+        msg = "{} ({} similar messages suppressed)".format(msg, suppressed)
+    kwargs["extra"] = dict(kwargs.get("extra") or {}, suppressed=suppressed)
+    logger.log(level, msg, *args, **kwargs)
+
+
+class _BatchFlushMixin:
+    """
+    Handler flushed once per batch of records by AsyncLogListener instead of once per record
+    """
+    def flush(self):
+        pass
+
+    def flush_batch(self):
+        super().flush()
+
+
+class BatchFlushStreamHandler(_BatchFlushMixin, logging.StreamHandler):
+    pass
+
+
+class BatchFlushFileHandler(_BatchFlushMixin, logging.FileHandler):
+    def close(self):
+        self.flush_batch()
+        super().close()
+
+
+class AsyncLogListener:
+    """
+    Background thread writing the records of a bounded queue to handlers.
+    Records are handled by batches of at most batch_size, handlers are flushed after each batch.
+    """
+    def __init__(self, handlers, queue_size=10000, batch_size=500):
+        self.handlers = handlers
+        self.queue = queue.Queue(maxsize=queue_size)
+        self.batch_size = batch_size
+        self.dropped = 0
+        self.queue_handler = None
+        self._stop_record = object()
+        self._thread = None
+
+    def build_queue_handler(self, overflow=BLOCK):
+        from logging.handlers import QueueHandler
+        listener = self
+
+        class AsyncQueueHandler(QueueHandler):
+            def enqueue(self, record):
+                if overflow == DROP:
+                    listener.put_nowait(record)
+                else:
+                    listener.queue.put(record)
+
+        self.queue_handler = AsyncQueueHandler(self.queue)
+        return self.queue_handler
+
+    def put_nowait(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name="bioit-log-listener", daemon=True)
+        self._thread.start()
+
+    def flush(self):
+        self.queue.join()
+
+    def stop(self):
+        if self._thread is None:
+            return
+        self.queue.put(self._stop_record)
+        self._thread.join()
+        self._thread = None
+        if self.dropped:
+            record = logging.LogRecord(
+                "bioit_module", logging.WARNING, __file__, 0,
+                "{} log records dropped, logging queue was full".format(self.dropped), None, None
+            )
+            self._handle([record])
+        for handler in self.handlers:
+            handler.close()
+
+    def _run(self):
+        while True:
+            batch = [self.queue.get()]
+            while len(batch) < self.batch_size and batch[-1] is not self._stop_record:
+                try:
+                    batch.append(self.queue.get_nowait())
+                except queue.Empty:
+                    break
+            stop = batch[-1] is self._stop_record
+            self._handle([record for record in batch if record is not self._stop_record])
+            for _ in batch:
+                self.queue.task_done()
+            if stop:
+                return
+
+    def _handle(self, records):
+        for record in records:
+            for handler in self.handlers:
+                if record.levelno >= handler.level:
+                    handler.handle(record)
+        for handler in self.handlers:
+            handler.flush_batch()
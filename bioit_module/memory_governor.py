@@ -0,0 +1,132 @@
+import os
+import logging
+import threading
+
+try:
+    import resource
+except ImportError:  # Not available on Windows
+    resource = None
+
+MEMORY_UNITS = {'': 1, 'K': 1024, 'M': 1024 ** 2, 'G': 1024 ** 3, 'T': 1024 ** 4}
+
+
+def parse_memory(size):
+    """
+    Size in bytes of a memory string: 500M, 8G, 8GB, 1024...
+    """
+    value = size.strip().upper().rstrip('B')
+    unit = value[-1] if value and value[-1] in MEMORY_UNITS else ''
+    number = value[:-1] if unit else value
+    return int(float(number) * MEMORY_UNITS[unit])
+
+
+def get_current_rss():
+    """
+    Current resident set size of the process in bytes, None if unknown
+    """
+    try:
+        with open('/proc/self/statm') as statm:
+            return int(statm.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, IndexError):
+        pass
+    from bioit_module.metrics import get_peak_rss
+    return get_peak_rss()
+
+
+def get_data_segment_size():
+    """
+    Current data segment size (VmData) of the process in bytes, None if unknown
+    """
+    try:
+        with open('/proc/self/status') as status:
+            for line in status:
+                if line.startswith('VmData:'):
+                    return int(line.split()[1]) * 1024
+    except (OSError, ValueError, IndexError):
+        pass
+    return None
+
+
+class MemoryGovernor:
+    """
+    Sample the RSS of the process in a background thread during launch().
+    Above pressure_ratio * limit, under_pressure() is True so the module can switch to chunked processing.
+    Above soft_ratio * limit, on_limit is called (the launcher exits with exit_code.MemoryLimitError) before
+    the kernel OOM killer sends SIGKILL.
+    As a backstop, the data segment rlimit is set to the current data segment size plus limit: an allocation
+    over it raises MemoryError instead of growing. File mmaps (fasta, indexes) are not counted by this rlimit.
+    """
+    def __init__(self, limit, soft_ratio=0.95, pressure_ratio=0.8, interval=0.2, on_limit=None, logger=None):
+        self.limit = limit
+        self.soft_limit = int(limit * soft_ratio)
+        self.pressure_limit = int(limit * pressure_ratio)
+        self.interval = interval
+        self.on_limit = on_limit
+        self.logger = logger or logging.getLogger(__name__)
+        self.peak_rss = 0
+        self.current_rss = 0
+        self._stop = threading.Event()
+        self._thread = None
+        self._previous_rlimit = None
+
+    def start(self):
+        self.set_rlimit()
+        self.sample()
+        self._thread = threading.Thread(target=self._run, name="bioit-memory-governor", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None and self._thread is not threading.current_thread():
+            self._thread.join()
+        self._thread = None
+        self.restore_rlimit()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *args):
+        self.stop()
+
+    def under_pressure(self):
+        return self.current_rss >= self.pressure_limit
+
+    def sample(self):
+        rss = get_current_rss()
+        if rss is None:
+            return None
+        self.current_rss = rss
+        self.peak_rss = max(self.peak_rss, rss)
+        return rss
+
+    def set_rlimit(self):
+        if resource is None or not hasattr(resource, 'RLIMIT_DATA'):
+            return
+        try:
+            self._previous_rlimit = resource.getrlimit(resource.RLIMIT_DATA)
+            hard = self._previous_rlimit[1]
+            # Data segment is virtual memory, already larger than the RSS: limit its growth only
+            soft = (get_data_segment_size() or 0) + self.limit
+            if hard != resource.RLIM_INFINITY:
+                soft = min(soft, hard)
+            resource.setrlimit(resource.RLIMIT_DATA, (soft, hard))
+        except (ValueError, OSError):
+            self._previous_rlimit = None
+            self.logger.warning("Can't set the data segment limit to {} bytes".format(self.limit))
+
+    def restore_rlimit(self):
+        if self._previous_rlimit is not None:
+            resource.setrlimit(resource.RLIMIT_DATA, self._previous_rlimit)
+            self._previous_rlimit = None
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            rss = self.sample()
+            if rss is not None and rss >= self.soft_limit:
+                self.logger.error("Memory limit reached: RSS {} bytes, limit {} bytes, peak {} bytes".format(
+                    rss, self.limit, self.peak_rss
+                ))
+                if self.on_limit is not None:
+                    self.on_limit(self)
+                return
@@ -0,0 +1,116 @@
+import json
+import os
+import sys
+import time
+from contextlib import contextmanager
+
+try:
+    import resource
+except ImportError:  # Not available on Windows
+    resource = None
+
+
+def get_peak_rss():
+    """
+    Peak resident set size of the process in bytes, None if unknown
+    """
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in bytes on macOS, in kilobytes elsewhere
+    return peak if sys.platform == 'darwin' else peak * 1024
+
+
+def get_io_bytes():
+    """
+    (read, written) bytes of the process, from /proc/self/io if available, else from block counts
+    """
+    try:
+        with open('/proc/self/io') as io_file:
+            counters = dict(line.split(': ') for line in io_file.read().splitlines())
+        return int(counters['rchar']), int(counters['wchar'])
+    except (OSError, KeyError, ValueError):
+        pass
+    if resource is None:
+        return None, None
+    usage = resource.getrusage(resource.RUSAGE_SELF)
+    return usage.ru_inblock * 512, usage.ru_oublock * 512
+
+
+class Span:
+    def __init__(self, name):
+        self.name = name
+        self.wall_time = None
+        self.cpu_time = None
+        self.peak_rss = None
+        self.read_bytes = None
+        self.write_bytes = None
+        self.status = None
+
+    def to_dict(self):
+        return {
+            'name': self.name,
+            'wall_time': self.wall_time,
+            'cpu_time': self.cpu_time,
+            'peak_rss': self.peak_rss,
+            'read_bytes': self.read_bytes,
+            'write_bytes': self.write_bytes,
+            'status': self.status,
+        }
+
+
+class LauncherMetrics:
+    """
+    Wall time, CPU time, peak RSS and I/O bytes of the named phases of a launcher.
+    Nested spans are named parent/child.
+    """
+    def __init__(self):
+        self.spans = []
+        self._stack = []
+        self.start_time = time.time()
+
+    @contextmanager
+    def span(self, name):
+        full_name = '/'.join(self._stack + [name])
+        span = Span(full_name)
+        self._stack.append(name)
+        wall_start = time.perf_counter()
+        cpu_start = time.process_time()
+        read_start, write_start = get_io_bytes()
+        span.status = 'ok'
+        try:
+            yield span
+        except SystemExit as e:
+            span.status = 'exit {}'.format(e.code)
+            raise
+        except BaseException:
+            span.status = 'error'
+            raise
+        finally:
+            span.wall_time = time.perf_counter() - wall_start
+            span.cpu_time = time.process_time() - cpu_start
+            span.peak_rss = get_peak_rss()
+            read_end, write_end = get_io_bytes()
+            if read_start is not None and read_end is not None:
+                span.read_bytes = read_end - read_start
+                span.write_bytes = write_end - write_start
+            self._stack.pop()
+            self.spans.append(span)
+
+    def to_dict(self):
+        return {
+            'start_time': self.start_time,
+            'pid': os.getpid(),
+            'peak_rss': get_peak_rss(),
+            'spans': [span.to_dict() for span in self.spans],
+        }
+
+    def write(self, filename, **extra):
+        """
+        Write metrics as JSON, extra keys are added at the top level
+        """
+        from bioit_module.utils import atomic_write
+        data = self.to_dict()
+        data.update(extra)
+        with atomic_write(filename, 'w') as metrics_file:
+            json.dump(data, metrics_file, indent=2)
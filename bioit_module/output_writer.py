@@ -0,0 +1,230 @@
+import csv
+import io
+import json
+import os
+import queue
+import struct
+import tempfile
+import threading
+import zlib
+from bioit_module.utils import set_default_mode
+
+CSV = "csv"
+JSONL = "jsonl"
+TSV = "tsv"
+
+
+class BgzfWriter:
+    """
+    Binary file-like object writing BGZF (blocked gzip, as bgzip): a valid gzip file readable by gzip.open,
+    made of independent blocks of at most 64KB so it can be indexed by tabix/samtools.
+    """
+    BLOCK_SIZE = 65280
+    EOF_BLOCK = bytes.fromhex("1f8b08040000000000ff0600424302001b0003000000000000000000")
+
+    def __init__(self, raw, level=6):
+        """
+        :param raw: binary file object the blocks are written to
+        """
+        self.raw = raw
+        self.level = level
+        self._buffer = bytearray()
+
+    def write(self, data):
+        self._buffer += data
+        while len(self._buffer) >= self.BLOCK_SIZE:
+            self._write_block(bytes(self._buffer[:self.BLOCK_SIZE]))
+            del self._buffer[:self.BLOCK_SIZE]
+        return len(data)
+
+    def flush(self):
+        self.raw.flush()
+
+    def close(self):
+        if self._buffer:
+            self._write_block(bytes(self._buffer))
+            self._buffer = bytearray()
+        self.raw.write(self.EOF_BLOCK)
+        self.raw.flush()
+
+    def _write_block(self, data):
+        compressor = zlib.compressobj(self.level, zlib.DEFLATED, -15)
+        compressed = compressor.compress(data) + compressor.flush()
+        # Header with the BC extra field holding the block size - 1
+        header = struct.pack("<4BI2BH2B2H", 0x1f, 0x8b, 8, 4, 0, 0, 0xff, 6, 66, 67, 2, len(compressed) + 25)
+        self.raw.write(header)
+        self.raw.write(compressed)
+        self.raw.write(struct.pack("<2I", zlib.crc32(data) & 0xffffffff, len(data)))
+
+
+class _Sink:
+    """
+    One output file of an OutputWriter: row batches are serialized and written by its own thread
+    in a temporary file, renamed on commit
+    """
+    def __init__(self, filename, output_format, columns, compress, max_pending=2):
+        self.filename = filename
+        self.output_format = output_format
+        self.columns = columns
+        self.compress = compress
+        self.error = None
+        directory = os.path.dirname(os.path.abspath(filename))
+        os.makedirs(directory, exist_ok=True)
+        fd, self.tmp_file = tempfile.mkstemp(dir=directory, prefix=os.path.basename(filename) + '.', suffix='.tmp')
+        # mkstemp creates 0600 files: outputs get the mode open() would give them
+        set_default_mode(fd)
+        self._raw = os.fdopen(fd, 'wb')
+        self._output = BgzfWriter(self._raw) if compress else self._raw
+        self._queue = queue.Queue(maxsize=max_pending)
+        self._thread = threading.Thread(target=self._run, name="bioit-output-{}".format(output_format), daemon=True)
+        self._thread.start()
+
+    def put(self, rows):
+        self._queue.put(rows)
+
+    def finish(self):
+        """
+        Wait until every batch is written, close the temporary file. Return the error of the writing thread.
+        """
+        self._queue.put(None)
+        self._thread.join()
+        try:
+            if self.compress:
+                self._output.close()
+            self._raw.close()
+        except OSError as e:
+            self.error = self.error or e
+        return self.error
+
+    def commit(self):
+        os.replace(self.tmp_file, self.filename)
+
+    def abort(self):
+        if not self._raw.closed:
+            self._raw.close()
+        if os.path.exists(self.tmp_file):
+            os.remove(self.tmp_file)
+
+    def _run(self):
+        header = self.output_format in (CSV, TSV)
+        while True:
+            rows = self._queue.get()
+            if rows is None:
+                return
+            if self.error is not None:
+                # Keep reading batches: the producer must not block on a full queue
+                continue
+            try:
+                text = io.StringIO()
+                if self.output_format == JSONL:
+                    for row in rows:
+                        text.write(json.dumps(row, default=str) + "\n")
+                else:
+                    writer = csv.DictWriter(
+                        text, self.columns, delimiter="\t" if self.output_format == TSV else ",",
+                        extrasaction="ignore", lineterminator="\n"
+                    )
+                    if header:
+                        writer.writeheader()
+                    writer.writerows(rows)
+                header = False
+                self._output.write(text.getvalue().encode())
+            except Exception as e:
+                self.error = e
+
+
+class OutputWriter:
+    """
+    Stream result rows (dicts) to <prefix>.csv, <prefix>.tsv and/or <prefix>.jsonl instead of keeping the whole
+    table in memory. Rows are buffered by buffer_rows and each format is written by its own thread from the same
+    rows. Files are written in temporary files renamed when the writer is closed without error: a crash never
+    leaves a partially written output. With compress=True, files are BGZF compressed (.gz added to the names).
+
+        with OutputWriter(prefix + "_alphalist", ["gene", "depth"], formats=("csv", "jsonl")) as output:
+            for row in rows:
+                output.write_row(row)
+    """
+    EXTENSIONS = {CSV: ".csv", TSV: ".tsv", JSONL: ".jsonl"}
+
+    def __init__(self, prefix, columns, formats=(CSV,), compress=False, buffer_rows=10000):
+        """
+        :param prefix: output files path without extension
+        :param columns: CSV/TSV columns, in order. Other keys of the rows are only written in JSON lines.
+        :param formats: list of CSV, TSV, JSONL
+        :param buffer_rows: rows buffered before being sent to the writing threads
+        """
+        unknown = [output_format for output_format in formats if output_format not in self.EXTENSIONS]
+        if unknown:
+            raise ValueError("Unknown output formats: {}".format(", ".join(unknown)))
+        self.columns = list(columns)
+        self.buffer_rows = buffer_rows
+        self.row_count = 0
+        self.filenames = [prefix + self.EXTENSIONS[output_format] + (".gz" if compress else "") for output_format in formats]
+        self._buffer = []
+        self._sinks = []
+        self._closed = False
+        try:
+            for output_format, filename in zip(formats, self.filenames):
+                self._sinks.append(_Sink(filename, output_format, self.columns, compress))
+        except BaseException:
+            self.abort()
+            raise
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if exc_type is None:
+            self.close()
+        else:
+            self.abort()
+
+    def write_row(self, row):
+        self._buffer.append(row)
+        self.row_count += 1
+        if len(self._buffer) >= self.buffer_rows:
+            self._send()
+
+    def write_rows(self, rows):
+        for row in rows:
+            self.write_row(row)
+
+    def close(self):
+        """
+        Write the buffered rows and rename the files. If a file couldn't be written, no file is renamed.
+        """
+        if self._closed:
+            return
+        try:
+            self._send()
+        except BaseException:
+            self.abort()
+            raise
+        self._closed = True
+        errors = [error for error in [sink.finish() for sink in self._sinks] if error is not None]
+        if errors:
+            for sink in self._sinks:
+                sink.abort()
+            raise errors[0]
+        for sink in self._sinks:
+            sink.commit()
+
+    def abort(self):
+        """
+        Stop writing and remove the temporary files
+        """
+        if self._closed:
+            return
+        self._closed = True
+        for sink in self._sinks:
+            sink.finish()
+            sink.abort()
+
+    def _send(self):
+        if not self._buffer:
+            return
+        for sink in self._sinks:
+            if sink.error is not None:
+                raise sink.error
+            sink.put(self._buffer)
+        self._buffer = []
@@ -0,0 +1,135 @@
+import logging
+import multiprocessing
+import signal
+from concurrent.futures import FIRST_EXCEPTION, ProcessPoolExecutor, wait
+from concurrent.futures.process import BrokenProcessPool
+from logging.handlers import QueueHandler, QueueListener
+from bioit_module import exception, exit_code
+from bioit_module import logger as bioit_logger
+
+EXCEPTION_EXIT_CODES = [
+    (exception.InvalidArgsError, exit_code.ValidationArgsError),
+    (exception.InvalidInstallConfigError, exit_code.ValidationInstallConfigError),
+    (exception.InvalidParametersError, exit_code.ValidationParamsError),
+    (MemoryError, exit_code.MemoryLimitError),
+]
+
+
+class WorkerKilledError(Exception):
+    """
+    A worker process was killed by a signal (OOM killer, SIGTERM, segfault...)
+    """
+    def __init__(self, signal_number):
+        self.signal_number = signal_number
+        self.exit_code = 128 + signal_number if signal_number else exit_code.SigKillOOM
+        name = signal.Signals(signal_number).name if signal_number else "unknown signal"
+        super().__init__("A worker process was killed ({})".format(name))
+
+
+def get_exit_code(error):
+    """
+    exit_code of an exception raised by a task
+    """
+    if getattr(error, "exit_code", None) is not None:
+        return error.exit_code
+    for exception_class, code in EXCEPTION_EXIT_CODES:
+        if isinstance(error, exception_class):
+            return code
+    return exit_code.UnknownError
+
+
+def _init_worker(log_queue, level, phase):
+    """
+    Worker process initializer: root logger records are sent to the parent process
+    """
+    # Handlers and the asynchronous listener are inherited from the parent with fork, they are not usable here
+    bioit_logger._listener = None
+    root_logger = logging.getLogger()
+    root_logger.handlers = []
+    queue_handler = QueueHandler(log_queue)
+    queue_handler.addFilter(bioit_logger.PhaseFilter())
+    root_logger.addHandler(queue_handler)
+    root_logger.setLevel(level)
+    bioit_logger._phase.set(phase)
+
+
+def _run_chunk(function, chunk):
+    return [function(*item) for item in chunk]
+
+
+class _ForwardHandler(logging.Handler):
+    """
+    Give the records of the workers to a logger of the parent process, which writes them with its handlers
+    """
+    def __init__(self, target_logger):
+        super().__init__()
+        self.target_logger = target_logger
+
+    def emit(self, record):
+        self.target_logger.handle(record)
+
+
+def parallel_map(function, items, workers=1, chunksize=None, logger=None, star=False):
+    """
+    Return [function(item) for item in items] computed on a pool of worker processes, in the order of items.
+    Items are sent to the workers by chunks of chunksize, len(items) / (4 * workers) if None.
+    Records logged in the workers are written by the handlers of logger (root logger if None).
+    On the first failing task, the remaining tasks are cancelled, the workers are stopped and the exception
+    is raised again: a worker killed by a signal raises WorkerKilledError.
+    With workers=1, tasks run in the current process.
+    :param function: module level function (sent to the workers)
+    :param star: if True, each item is a tuple of arguments: function(*item)
+    """
+    items = [tuple(item) if star else (item,) for item in items]
+    if workers <= 1 or len(items) <= 1:
+        return _run_chunk(function, items)
+    logger = logger or logging.getLogger()
+    if chunksize is None:
+        chunksize = max(1, len(items) // (4 * workers))
+    chunks = [items[start:start + chunksize] for start in range(0, len(items), chunksize)]
+
+    context = multiprocessing.get_context()
+    log_queue = context.Queue()
+    listener = QueueListener(log_queue, _ForwardHandler(logger))
+    listener.start()
+    executor = ProcessPoolExecutor(
+        max_workers=min(workers, len(chunks)), mp_context=context, initializer=_init_worker,
+        initargs=(log_queue, logger.getEffectiveLevel(), bioit_logger._phase.get()),
+    )
+    try:
+        futures = [executor.submit(_run_chunk, function, chunk) for chunk in chunks]
+        # Kept to find the signal of a killed worker and to stop the workers on failure
+        processes = list(getattr(executor, "_processes", {}).values())
+        done, not_done = wait(futures, return_when=FIRST_EXCEPTION)
+        failed = [future for future in futures if future.done() and not future.cancelled() and future.exception()]
+        if failed:
+            for future in not_done:
+                future.cancel()
+            error = failed[0].exception()
+            if isinstance(error, BrokenProcessPool):
+                raise WorkerKilledError(_get_kill_signal(processes)) from error
+            # Running tasks can't be cancelled: their workers are stopped
+            for process in processes:
+                if process.is_alive():
+                    process.terminate()
+            raise error
+        return [result for future in futures for result in future.result()]
+    finally:
+        executor.shutdown(wait=True)
+        listener.stop()
+        log_queue.close()
+
+
+def _get_kill_signal(processes):
+    """
+    Signal which killed a worker, the other workers are terminated (SIGTERM) by the broken pool
+    """
+    signals = []
+    for process in processes:
+        process.join(timeout=1)
+        if process.exitcode is not None and process.exitcode < 0:
+            signals.append(-process.exitcode)
+    for signal_number in signals:
+        if signal_number != signal.SIGTERM:
+            return signal_number
+    return signals[0] if signals else None
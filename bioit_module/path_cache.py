@@ -0,0 +1,122 @@
+import os
+import threading
+import time
+
+_path_cache = None
+_path_cache_lock = threading.Lock()
+
+
+class PathCache:
+    """
+    Short lived cache of file system metadata for path checks.
+    The first check of a path lists its whole directory with one scandir: the next checks of files of the same
+    directory (tool binaries of an install config...) don't touch the file system until the ttl expires.
+    """
+    def __init__(self, ttl=2.0):
+        """
+        :param ttl: seconds a directory listing is trusted
+        """
+        self.ttl = ttl
+        self._directories = {}
+        self._lock = threading.Lock()
+
+    def is_file(self, path):
+        entry = self._get_entry(path)
+        return entry is not None and entry.is_file()
+
+    def is_dir(self, path):
+        entry = self._get_entry(path)
+        return entry is not None and entry.is_dir()
+
+    def is_executable(self, path):
+        entry = self._get_entry(path)
+        return entry is not None and entry.is_file() and entry.is_executable()
+
+    def invalidate(self, path=None):
+        """
+        Forget the listing of the directory of path, or every listing if path is None
+        """
+        with self._lock:
+            if path is None:
+                self._directories.clear()
+            else:
+                self._directories.pop(os.path.dirname(os.path.abspath(str(path))), None)
+
+    def _get_entry(self, path):
+        path = os.path.abspath(str(path))
+        directory, name = os.path.split(path)
+        if not name:
+            # File system root
+            return _PathEntry(path)
+        now = time.monotonic()
+        with self._lock:
+            listing = self._directories.get(directory)
+        if listing is None or listing[0] < now:
+            listing = (now + self.ttl, self._scan(directory))
+            with self._lock:
+                self._directories[directory] = listing
+        entries = listing[1]
+        if entries is None:
+            # Directory not listable (execute only): check the path itself
+            return _PathEntry(path) if os.path.lexists(path) else None
+        return entries.get(name)
+
+    @staticmethod
+    def _scan(directory):
+        """
+        {name: _PathEntry} of a directory, empty if it doesn't exist, None if it can't be listed
+        """
+        try:
+            with os.scandir(directory) as entries:
+                return {entry.name: _PathEntry(entry.path, entry) for entry in entries}
+        except (FileNotFoundError, NotADirectoryError):
+            return {}
+        except OSError:
+            return None
+
+
+class _PathEntry:
+    """
+    File type of a directory entry, from the scandir entry when there is one.
+    Results are computed on first use and kept: most entries of a directory are never checked.
+    """
+    def __init__(self, path, dir_entry=None):
+        self.path = path
+        self._dir_entry = dir_entry
+        self._is_file = None
+        self._is_dir = None
+        self._is_executable = None
+
+    def is_file(self):
+        if self._is_file is None:
+            self._is_file = self._check(lambda entry: entry.is_file(), os.path.isfile)
+        return self._is_file
+
+    def is_dir(self):
+        if self._is_dir is None:
+            self._is_dir = self._check(lambda entry: entry.is_dir(), os.path.isdir)
+        return self._is_dir
+
+    def is_executable(self):
+        if self._is_executable is None:
+            self._is_executable = os.access(self.path, os.X_OK)
+        return self._is_executable
+
+    def _check(self, entry_check, path_check):
+        if self._dir_entry is None:
+            return path_check(self.path)
+        try:
+            return entry_check(self._dir_entry)
+        except OSError:
+            return False
+
+
+def get_path_cache():
+    """
+    PathCache shared by the whole process, used by the config types
+    """
+    global _path_cache
+    with _path_cache_lock:
+        if _path_cache is None:
+            _path_cache = PathCache()
+        return _path_cache
@@ -1,32 +1,64 @@
 from schematics.models import Model
 from schematics.types import BooleanType, StringType
-from pathlib import Path
+from bioit_module.reference_catalog import ReferenceCatalog
 
 
 class PipelineParameters(Model):
     reference_dir = StringType(required=True)
     gencode_version = StringType(required=True)
 
+    def get_reference_catalog(self):
+        return ReferenceCatalog.get(self.reference_dir)
+
     def get_gtf_file(self):
-        return Path(self.reference_dir, 'gtf', "gencode.v{}.annotation.gtf".format(self.gencode_version))
+        return self.get_reference_catalog().get_gtf_file(self.gencode_version)
 
     def get_bed_ref(self):
-        bed_files = [path for path in Path(self.reference_dir).iterdir() if path.suffix in ['.bed']]
+        bed_files = self.get_reference_catalog().get_bed_files()
         if len(bed_files) != 1:
             raise Exception("0 or too many bed found in reference directory ({})".format(self.reference_dir))
         return bed_files[0]
 
+    def get_bed_regions(self):
+        """
+        Regions of the bed as NumPy arrays, see BedRegions. Needs the numpy extra.
+        """
+        from bioit_module.bed_regions import BedRegions
+        return BedRegions.read(self.get_bed_ref())
+
     def get_UHRR_bam(self):
-        bam_files = [str(path) for path in Path(self.reference_dir, 'UHRR_v{}'.format(self.gencode_version)).iterdir() if path.suffix in ['.bam']]
+        catalog = self.get_reference_catalog()
+        bam_files = catalog.get_UHRR_bams(self.gencode_version)
         if len(bam_files) == 0:
-            raise Exception("0 bam found in reference directory ({})".format(Path(self.reference_dir, 'UHRR_v{}'.format(self.gencode_version))))
+            raise Exception("0 bam found in reference directory ({})".format(catalog.get_UHRR_dir(self.gencode_version)))
         return bam_files
 
+    def get_UHRR_bam_set(self, workers=None):
+        """
+        UHRR BAMs processed in parallel with cached summaries, see BamSet
+        """
+        from bioit_module.bam_set import BamSet
+        return BamSet(self.get_UHRR_bam(), workers=workers)
+
     def get_gtf_collapse_file(self):
-        return Path(self.reference_dir, 'gtf', "gencode.v{}.collapsed.gtf".format(self.gencode_version))
+        return self.get_reference_catalog().get_gtf_collapse_file(self.gencode_version)
+
+    def get_gtf_index(self, collapsed=False):
+        """
+        Memory-mapped gene/transcript index of the gtf file, built on first use
+        """
+        from bioit_module.gtf_index import GtfIndex
+        return GtfIndex.open(self.get_gtf_collapse_file() if collapsed else self.get_gtf_file())
 
     def get_fasta_ref(self):
-        fasta_files = [path for path in Path(self.reference_dir).iterdir() if path.suffix in ['.fa', '.fasta']]
+        fasta_files = self.get_reference_catalog().get_fasta_files()
         if len(fasta_files) != 1:
             raise Exception("0 or too many fasta found in reference directory ({})".format(self.reference_dir))
-        return fasta_files[0]
\ No newline at end of file
+        return fasta_files[0]
+
+    def get_fasta_reference(self):
+        """
+        Memory-mapped random access to the fasta, see FastaReference
+        """
+        from bioit_module.fasta_reference import FastaReference
+        return FastaReference(self.get_fasta_ref())
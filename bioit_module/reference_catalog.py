@@ -0,0 +1,207 @@
+import os
+import re
+import json
+import threading
+from pathlib import Path
+from bioit_module.utils import atomic_write
+
+
+class ReferenceCatalog:
+    """
+    Index of the files of a reference directory.
+    Each directory is listed once and the result is kept by file role (fasta, bed, gtf,
+    collapsed gtf, UHRR bam) and gencode version. The index is persisted in a sidecar
+    manifest inside the reference directory, with names relative to the listed directories,
+    and an entry is reused as long as the modification time of the listed directory is unchanged.
+    """
+    # The manifest is in its own directory: replacing it doesn't change the reference directory mtime
+    MANIFEST_DIR = ".bioit_reference_catalog"
+    MANIFEST_NAME = "manifest.json"
+    FASTA_SUFFIXES = ['.fa', '.fasta']
+    BED_SUFFIXES = ['.bed']
+    BAM_SUFFIXES = ['.bam']
+    GTF_DIR = 'gtf'
+    UHRR_DIR = 'UHRR_v{}'
+    GTF_NAME = "gencode.v{}.annotation.gtf"
+    GTF_COLLAPSE_NAME = "gencode.v{}.collapsed.gtf"
+    GTF_NAME_REGEX = re.compile(r"^gencode\.v(.+)\.(annotation|collapsed)\.gtf$")
+
+    _catalogs = {}
+    _catalogs_lock = threading.Lock()
+
+    def __init__(self, reference_dir):
+        self.reference_dir = str(reference_dir)
+        self.manifest_file = Path(self.reference_dir, self.MANIFEST_DIR, self.MANIFEST_NAME)
+        self._lock = threading.RLock()
+        self._index = self._load_manifest()
+
+    @classmethod
+    def get(cls, reference_dir):
+        """
+        Return the catalog shared by the whole process for this reference directory
+        """
+        key = str(reference_dir)
+        with cls._catalogs_lock:
+            if key not in cls._catalogs:
+                cls._catalogs[key] = cls(key)
+            return cls._catalogs[key]
+
+    @classmethod
+    def clear(cls):
+        """
+        Forget every catalog loaded in this process
+        """
+        with cls._catalogs_lock:
+            cls._catalogs.clear()
+
+    def get_fasta_files(self):
+        return [Path(path) for path in self._root_entry()['fasta']]
+
+    def get_bed_files(self):
+        return [Path(path) for path in self._root_entry()['bed']]
+
+    def get_UHRR_bams(self, gencode_version):
+        return list(self._uhrr_entry(gencode_version)['bam'])
+
+    def get_UHRR_dir(self, gencode_version):
+        return Path(self.reference_dir, self.UHRR_DIR.format(gencode_version))
+
+    def get_gtf_file(self, gencode_version):
+        return self._gtf_path(gencode_version, 'gtf', self.GTF_NAME)
+
+    def get_gtf_collapse_file(self, gencode_version):
+        return self._gtf_path(gencode_version, 'collapsed_gtf', self.GTF_COLLAPSE_NAME)
+
+    def get_gencode_versions(self):
+        """
+        gencode versions of the gtf files of the gtf directory, numeric versions first in numeric order
+        """
+        versions = self._gtf_entry()['versions']
+        return sorted(versions, key=lambda version: (not version.isdigit(), int(version) if version.isdigit() else 0, version))
+
+    def refresh(self):
+        """
+        Drop the index, the next lookup lists the directories again
+        """
+        with self._lock:
+            self._index = {}
+
+    def _root_entry(self):
+        def scan(paths):
+            return {
+                'fasta': [str(path) for path in paths if path.suffix in self.FASTA_SUFFIXES],
+                'bed': [str(path) for path in paths if path.suffix in self.BED_SUFFIXES],
+            }
+        return self._entry('root', Path(self.reference_dir), scan)
+
+    def _uhrr_entry(self, gencode_version):
+        def scan(paths):
+            return {'bam': [str(path) for path in paths if path.suffix in self.BAM_SUFFIXES]}
+        return self._entry(
+            'UHRR_v{}'.format(gencode_version), self.get_UHRR_dir(gencode_version), scan
+        )
+
+    def _gtf_entry(self):
+        def scan(paths):
+            versions = {}
+            for path in paths:
+                match = self.GTF_NAME_REGEX.match(path.name)
+                if match:
+                    role = 'gtf' if match.group(2) == 'annotation' else 'collapsed_gtf'
+                    versions.setdefault(match.group(1), {})[role] = str(path)
+            return {'versions': versions}
+        try:
+            return self._entry('gtf', Path(self.reference_dir, self.GTF_DIR), scan)
+        except OSError:
+            return {'versions': {}}
+
+    def _gtf_path(self, gencode_version, role, name_template):
+        """
+        gtf files are expected at a fixed place, return this place if the index doesn't know them
+        """
+        path = self._gtf_entry()['versions'].get(str(gencode_version), {}).get(role)
+        if path is None:
+            return Path(self.reference_dir, self.GTF_DIR, name_template.format(gencode_version))
+        return Path(path)
+
+    def _entry(self, key, directory, scan):
+        """
+        Return the index entry of a directory, listing it only if its mtime changed
+        """
+        mtime = self._mtime(directory)
+        with self._lock:
+            entry = self._index.get(key)
+            if entry is not None and mtime is not None and entry.get('mtime') == mtime:
+                return entry
+            previous = entry
+            entry = scan([path for path in directory.iterdir() if path.name != self.MANIFEST_DIR])
+            if mtime is None:
+                # Directory can't be stat: nothing to validate a cached entry against
+                return entry
+            entry['mtime'] = mtime
+            self._index[key] = entry
+            if entry != previous:
+                self._save_manifest()
+            return entry
+
+    @staticmethod
+    def _mtime(directory):
+        try:
+            return os.stat(str(directory)).st_mtime_ns
+        except OSError:
+            return None
+
+    def _get_directory(self, key):
+        """
+        Directory listed by an index entry
+        """
+        if key == 'root':
+            return Path(self.reference_dir)
+        if key == 'gtf':
+            return Path(self.reference_dir, self.GTF_DIR)
+        return Path(self.reference_dir, key)
+
+    @classmethod
+    def _map_paths(cls, entry, function):
+        """
+        Apply function to every path of an entry
+        """
+        if isinstance(entry, dict):
+            return {key: value if key == 'mtime' else cls._map_paths(value, function) for key, value in entry.items()}
+        if isinstance(entry, list):
+            return [cls._map_paths(value, function) for value in entry]
+        return function(entry)
+
+    def _load_manifest(self):
+        """
+        Index of the manifest, names made paths in the reference directory as spelled by this process
+        """
+        try:
+            with open(str(self.manifest_file)) as manifest:
+                index = json.load(manifest)
+            if not isinstance(index, dict):
+                return {}
+            return {
+                key: self._map_paths(entry, lambda name, directory=self._get_directory(key): str(Path(directory, name)))
+                for key, entry in index.items()
+            }
+        except (OSError, ValueError, TypeError, AttributeError):
+            return {}
+
+    def _save_manifest(self):
+        """
+        Replace the manifest atomically: launchers started together never read a partial manifest.
+        Creating the manifest directory changes the reference directory mtime once, replacing the
+        manifest afterwards doesn't. A read only reference directory is not an error.
+        """
+        index = {}
+        for key, entry in self._index.items():
+            directory = self._get_directory(key)
+            index[key] = self._map_paths(
+                entry, lambda path, directory=directory: Path(path).name if Path(path).parent == directory else path
+            )
+        try:
+            with atomic_write(str(self.manifest_file), 'w') as manifest:
+                json.dump(index, manifest)
+        except OSError:
+            pass
@@ -0,0 +1,189 @@
+import argparse
+import hashlib
+import json
+import os
+import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from bioit_module.utils import atomic_write, get_cache_dir
+
+# Read size of hash_file: large reads, hashlib releases the GIL while hashing them
+BLOCK_SIZE = 16 * 1024 * 1024
+
+
+def hash_file(filename, algorithm="sha256", block_size=BLOCK_SIZE):
+    """
+    Hex digest of a file, read in a reused buffer of block_size bytes
+    """
+    digest = hashlib.new(algorithm)
+    buffer = bytearray(block_size)
+    view = memoryview(buffer)
+    with open(filename, "rb", buffering=0) as input_file:
+        while True:
+            size = input_file.readinto(buffer)
+            if not size:
+                break
+            digest.update(view[:size])
+    return digest.hexdigest()
+
+
+class IntegrityIndex:
+    """
+    Digests of the reference assets (fasta, gtf, bed, UHRR BAMs) kept in a manifest inside the reference directory,
+    or in the cache directory if it is read only. Each digest is stored with the size and mtime of the file:
+    update() only hashes new or changed files, verify() compares size and mtime without reading the files
+    (full=True hashes them again).
+    """
+    # The manifest is in its own directory: replacing it doesn't change the reference directory mtime
+    MANIFEST_DIR = ".bioit_reference_integrity"
+    MANIFEST_NAME = "manifest.json"
+
+    def __init__(self, reference_dir, algorithm="sha256", workers=4):
+        self.reference_dir = os.path.abspath(str(reference_dir))
+        self.algorithm = algorithm
+        self.workers = workers
+        self._lock = threading.Lock()
+        self.files = self._load_manifest()
+
+    def get_manifest_files(self):
+        name = hashlib.sha1(self.reference_dir.encode()).hexdigest() + ".integrity.json"
+        return [
+            os.path.join(self.reference_dir, self.MANIFEST_DIR, self.MANIFEST_NAME), os.path.join(get_cache_dir(), name)
+        ]
+
+    def get_assets(self, gencode_versions=None):
+        """
+        Asset files of the gencode versions. If None, assets of every version of the reference directory and every
+        indexed file, so verify() reports the indexed files removed since.
+        """
+        from bioit_module.reference_resolver import ReferenceResolver
+        resolver = ReferenceResolver.get(self.reference_dir)
+        versions = resolver.get_versions() if gencode_versions is None else gencode_versions
+        assets = []
+        for version in versions:
+            for path in resolver.resolve(version, []).paths.values():
+                for filename in path if isinstance(path, list) else [path]:
+                    filename = os.path.abspath(str(filename))
+                    if filename not in assets and (os.path.isfile(filename) or self._key(filename) in self.files):
+                        assets.append(filename)
+        if gencode_versions is None:
+            for key in sorted(self.files):
+                filename = os.path.join(self.reference_dir, key)
+                if filename not in assets:
+                    assets.append(filename)
+        return assets
+
+    def update(self, files=None):
+        """
+        Hash the files (the assets of every version if None) which are new or changed since the last update,
+        in parallel, and save the manifest. Return the hashed files.
+        """
+        files = self._absolute(self.get_assets() if files is None else files)
+        changed = [filename for filename in files if self._check(filename) not in (None, "missing")]
+        if changed:
+            with ThreadPoolExecutor(max_workers=self.workers) as executor:
+                for filename, entry in zip(changed, executor.map(self._hash_entry, changed)):
+                    with self._lock:
+                        self.files[self._key(filename)] = entry
+            self._save_manifest()
+        return changed
+
+    def verify(self, files=None, full=False):
+        """
+        {file: problem} of the files (the assets of every version if None) not matching the manifest, empty if
+        everything matches. By default the size and mtime are compared, with full=True the content is hashed.
+        """
+        files = self._absolute(self.get_assets() if files is None else files)
+        problems = {}
+        for filename in files:
+            problem = self._check(filename)
+            if problem is not None:
+                problems[filename] = problem
+        if full:
+            checked = [filename for filename in files if filename not in problems]
+            with ThreadPoolExecutor(max_workers=self.workers) as executor:
+                digests = executor.map(lambda filename: hash_file(filename, self.algorithm), checked)
+                for filename, digest in zip(checked, digests):
+                    if digest != self.files[self._key(filename)]["digest"]:
+                        problems[filename] = "content changed"
+        return problems
+
+    def _check(self, filename):
+        """
+        Why the manifest entry of a file doesn't match the file, None if it matches
+        """
+        entry = self.files.get(self._key(filename))
+        try:
+            stat = os.stat(filename)
+        except OSError:
+            return "missing"
+        if entry is None or entry.get("algorithm") != self.algorithm:
+            return "not indexed"
+        if entry["size"] != stat.st_size or entry["mtime"] != stat.st_mtime_ns:
+            return "size or mtime changed"
+        return None
+
+    def _hash_entry(self, filename):
+        stat = os.stat(filename)
+        digest = hash_file(filename, self.algorithm)
+        return {"size": stat.st_size, "mtime": stat.st_mtime_ns, "algorithm": self.algorithm, "digest": digest}
+
+    def _key(self, filename):
+        """
+        Manifest key of a file: path relative to the reference directory, so the directory can be moved
+        """
+        relative = os.path.relpath(filename, self.reference_dir)
+        return filename if relative.startswith(os.pardir) else relative
+
+    @staticmethod
+    def _absolute(files):
+        return [os.path.abspath(str(filename)) for filename in files]
+
+    def _load_manifest(self):
+        """
+        Newest readable manifest: the reference directory one can be left behind once it became read only
+        """
+        manifests = []
+        for manifest_file in self.get_manifest_files():
+            try:
+                with open(manifest_file) as manifest:
+                    mtime = os.fstat(manifest.fileno()).st_mtime_ns
+                    files = json.load(manifest)
+            except (OSError, ValueError):
+                continue
+            if isinstance(files, dict):
+                manifests.append((mtime, files))
+        return max(manifests, key=lambda manifest: manifest[0])[1] if manifests else {}
+
+    def _save_manifest(self):
+        with self._lock:
+            data = dict(self.files)
+        for manifest_file in self.get_manifest_files():
+            try:
+                with atomic_write(manifest_file, "w") as manifest:
+                    json.dump(data, manifest, indent=1, sort_keys=True)
+                return
+            except OSError:
+                continue
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Index or verify the digests of the assets of a reference directory.")
+    parser.add_argument("reference_dir", help="Reference directory.")
+    parser.add_argument("--verify", action="store_true", help="Verify instead of updating the index.")
+    parser.add_argument("--full", action="store_true", help="With --verify, hash the files again.")
+    parser.add_argument("--workers", type=int, default=4, help="Number of files hashed at the same time.")
+    args = parser.parse_args(argv)
+    index = IntegrityIndex(args.reference_dir, workers=args.workers)
+    if not args.verify:
+        for filename in index.update():
+            print("hashed {}".format(filename))
+        return 0
+    problems = index.verify(full=args.full)
+    for filename, problem in sorted(problems.items()):
+        print("{}: {}".format(filename, problem), file=sys.stderr)
+    return 1 if problems else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,172 @@
+import threading
+from schematics.exceptions import ValidationError
+from bioit_module.path_cache import PathCache
+from bioit_module.pipeline_parameters import PipelineParameters
+from bioit_module.reference_catalog import ReferenceCatalog
+
+# Assets of a gencode version, checked by ResolvedReference
+GTF = "gtf"
+GTF_COLLAPSE = "gtf_collapse"
+FASTA = "fasta"
+BED = "bed"
+UHRR = "UHRR"
+ASSETS = [GTF, GTF_COLLAPSE, FASTA, BED, UHRR]
+
+
+class ResolvedReference:
+    """
+    Every reference path of a gencode version, resolved once, with the problems of each asset
+    """
+    def __init__(self, parameters):
+        self.parameters = parameters
+        self.gencode_version = parameters.gencode_version
+        self.reference_dir = parameters.reference_dir
+        self.paths = {}
+        self.errors = {}
+        paths = PathCache()
+        self._resolve(GTF, parameters.get_gtf_file, paths.is_file)
+        self._resolve(GTF_COLLAPSE, parameters.get_gtf_collapse_file, paths.is_file)
+        self._resolve(FASTA, parameters.get_fasta_ref, paths.is_file)
+        self._resolve(BED, parameters.get_bed_ref, paths.is_file)
+        self._resolve(UHRR, parameters.get_UHRR_bam, lambda bams: all(paths.is_file(bam) for bam in bams))
+
+    def _resolve(self, asset, getter, exists):
+        try:
+            path = getter()
+        except Exception as e:
+            self.errors[asset] = str(e)
+            return
+        self.paths[asset] = path
+        if not exists(path):
+            self.errors[asset] = "{} not found".format(path)
+
+    @property
+    def valid(self):
+        return not self.errors
+
+    def check(self, assets=None):
+        """
+        Raise a ValidationError listing the problems of the assets (every asset if None)
+        """
+        errors = [
+            "{}: {}".format(asset, self.errors[asset]) for asset in (ASSETS if assets is None else assets)
+            if asset in self.errors
+        ]
+        if errors:
+            raise ValidationError("Reference gencode v{} in {} is incomplete: {}".format(
+                self.gencode_version, self.reference_dir, "; ".join(errors)
+            ))
+        return self
+
+    def get_gtf_file(self):
+        return self.check([GTF]).paths[GTF]
+
+    def get_gtf_collapse_file(self):
+        return self.check([GTF_COLLAPSE]).paths[GTF_COLLAPSE]
+
+    def get_fasta_ref(self):
+        return self.check([FASTA]).paths[FASTA]
+
+    def get_bed_ref(self):
+        return self.check([BED]).paths[BED]
+
+    def get_UHRR_bam(self):
+        return self.check([UHRR]).paths[UHRR]
+
+
+class ReferenceResolver:
+    """
+    Warm table of the ResolvedReference of the gencode versions of a reference directory.
+    resolve() resolves and checks only the version asked for. load() resolves every version found in the gtf
+    directory, for long running processes (workers) and reference directory checks: a job asking for a version
+    then gets its paths without touching the file system. Lookups are thread safe.
+    """
+    _resolvers = {}
+    _resolvers_lock = threading.Lock()
+
+    def __init__(self, reference_dir, versions=None):
+        """
+        :param versions: gencode versions to load, every version of the gtf directory if None
+        """
+        self.reference_dir = str(reference_dir)
+        self._versions = versions
+        self._references = {}
+        self._loaded = False
+        self._lock = threading.Lock()
+
+    @classmethod
+    def get(cls, reference_dir):
+        """
+        Return the resolver shared by the whole process for this reference directory
+        """
+        key = str(reference_dir)
+        with cls._resolvers_lock:
+            if key not in cls._resolvers:
+                cls._resolvers[key] = cls(key)
+            return cls._resolvers[key]
+
+    @classmethod
+    def clear(cls):
+        with cls._resolvers_lock:
+            cls._resolvers.clear()
+
+    def load(self):
+        """
+        Resolve every version, done once: later calls return the same table
+        """
+        with self._lock:
+            if not self._loaded:
+                for version in self._get_versions():
+                    if version not in self._references:
+                        self._references[version] = self._resolve(version)
+                self._loaded = True
+            return self._references
+
+    def reload(self):
+        """
+        Forget the table and the directory listings, resolve again
+        """
+        with self._lock:
+            self._references = {}
+            self._loaded = False
+        ReferenceCatalog.get(self.reference_dir).refresh()
+        return self.load()
+
+    def get_versions(self):
+        return list(self.load())
+
+    def resolve(self, gencode_version, assets=None, refresh=False):
+        """
+        ResolvedReference of a version, checked for the assets (every asset if None).
+        A version outside of the table is resolved alone and added on first use, the other versions
+        are not resolved. With refresh=True, the version is resolved again (files checked for a new job).
+        """
+        version = str(gencode_version)
+        with self._lock:
+            reference = None if refresh else self._references.get(version)
+        if reference is None:
+            reference = self._resolve(version)
+            with self._lock:
+                if refresh:
+                    self._references[version] = reference
+                else:
+                    reference = self._references.setdefault(version, reference)
+        return reference.check(assets)
+
+    def get_invalid(self):
+        """
+        {version: {asset: error}} of the versions with missing assets
+        """
+        return {version: reference.errors for version, reference in self.load().items() if not reference.valid}
+
+    def _get_versions(self):
+        if self._versions is not None:
+            return [str(version) for version in self._versions]
+        return ReferenceCatalog.get(self.reference_dir).get_gencode_versions()
+
+    def _resolve(self, version):
+        parameters = PipelineParameters()
+        parameters.reference_dir = self.reference_dir
+        parameters.gencode_version = version
+        parameters.validate()
+        return ResolvedReference(parameters)
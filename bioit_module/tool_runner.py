@@ -0,0 +1,242 @@
+import collections
+import logging
+import os
+import signal
+import subprocess
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from bioit_module import exit_code
+
+# exit_code of a tool killed by a signal, 128 + signal for the others
+SIGNAL_EXIT_CODES = {
+    signal.SIGSEGV: exit_code.SigSegv,
+    signal.SIGKILL: exit_code.SigKillOOM,
+    signal.SIGTERM: exit_code.SigTerm,
+}
+
+
+def get_signal_exit_code(signal_number):
+    return SIGNAL_EXIT_CODES.get(signal_number, 128 + signal_number)
+
+
+class ToolError(Exception):
+    """
+    An external tool failed: non zero return code or killed by a signal (returncode is -signal)
+    """
+    def __init__(self, result):
+        self.result = result
+        if result.returncode < 0:
+            self.signal_number = -result.returncode
+            self.exit_code = get_signal_exit_code(self.signal_number)
+            status = "was killed by {}".format(signal.Signals(self.signal_number).name)
+        else:
+            self.signal_number = None
+            self.exit_code = exit_code.UnknownError
+            status = "exited with code {}".format(result.returncode)
+        message = "{} {}".format(" ".join(result.command), status)
+        if result.stderr_tail:
+            message += ", stderr:\n" + "\n".join(result.stderr_tail)
+        super().__init__(message)
+
+
+class ToolResult:
+    """
+    Return code, wall time, CPU time (user + system of the child) and last stderr lines of a tool call
+    """
+    def __init__(self, tool, command):
+        self.tool = tool
+        self.command = command
+        self.returncode = None
+        self.wall_time = None
+        self.cpu_time = None
+        self.peak_rss = None
+        self.stderr_tail = []
+
+    @property
+    def ok(self):
+        return self.returncode == 0
+
+    def to_dict(self):
+        return {
+            "tool": self.tool,
+            "command": self.command,
+            "returncode": self.returncode,
+            "wall_time": self.wall_time,
+            "cpu_time": self.cpu_time,
+            "peak_rss": self.peak_rss,
+        }
+
+
+class ToolRunner:
+    """
+    Run the external tools of the install config (samtools...). Outputs are streamed: stdout and stderr lines go
+    to a file, a callback or the logger, they are never kept whole in memory. At most max_concurrent tools run at
+    the same time, each call is timed (wall and CPU time from the child rusage) and logged. A failing tool raises
+    ToolError, with the exit_code of its signal if it was killed (SigSegv, SigKillOOM, SigTerm).
+
+        runner = ToolRunner(install_config, logger, max_concurrent=4)
+        runner.run("samtools", ["index", bam])
+        with runner.stream("samtools", ["view", bam, "chr1"]) as lines:
+            for line in lines:
+                ...
+    """
+    def __init__(self, install_config=None, logger=None, max_concurrent=1, stderr_tail=20):
+        """
+        :param install_config: object whose attributes are tool paths, a tool not found in it is run from PATH
+        :param stderr_tail: number of last stderr lines kept for the error message
+        """
+        self.install_config = install_config
+        self.logger = logger or logging.getLogger()
+        self.max_concurrent = max(1, max_concurrent)
+        self.stderr_tail = stderr_tail
+        self._slots = threading.BoundedSemaphore(self.max_concurrent)
+
+    def get_tool_path(self, tool):
+        path = getattr(self.install_config, tool, None) if self.install_config is not None else None
+        return str(path) if path else tool
+
+    def run(self, tool, args=(), stdout=None, stderr=None, stdin=None, cwd=None, env=None, check=True):
+        """
+        Run a tool and wait for it.
+        :param tool: install config attribute or executable name
+        :param stdout: None to log the lines at debug level, a file name to write them to, a callable called with
+            each line (bytes) or subprocess.DEVNULL. stderr is handled the same way.
+        :param stdin: file name or file object read by the tool
+        :param check: raise ToolError if the tool fails
+        :return: ToolResult
+        """
+        with self._start(tool, args, subprocess.PIPE, stderr, stdin, cwd, env) as (process, result):
+            self._consume(process.stdout, stdout, tool, "stdout")
+        if check and not result.ok:
+            raise ToolError(result)
+        return result
+
+    @contextmanager
+    def stream(self, tool, args=(), stderr=None, stdin=None, cwd=None, env=None, check=True):
+        """
+        Context manager yielding an iterator on the stdout lines (bytes) of the tool, read while the tool runs.
+        On exit, the tool is waited for (terminated if the lines weren't all read) and checked.
+        """
+        terminated = False
+        read = []
+
+        def lines(pipe):
+            yield from pipe
+            read.append(True)
+        with self._start(tool, args, subprocess.PIPE, stderr, stdin, cwd, env) as (process, result):
+            try:
+                yield lines(process.stdout)
+            finally:
+                if not read and process.poll() is None:
+                    # Lines left unread: the tool could block on a full pipe
+                    process.terminate()
+                    terminated = True
+        if check and not result.ok and not (terminated and result.returncode == -signal.SIGTERM):
+            raise ToolError(result)
+
+    def run_many(self, calls, check=True):
+        """
+        Run several tools, max_concurrent at a time. Return their ToolResult in the order of calls.
+        :param calls: list of (tool, args) or (tool, args, run keyword arguments)
+        """
+        calls = [tuple(call) + ({},) * (3 - len(call)) for call in calls]
+        with ThreadPoolExecutor(max_workers=self.max_concurrent) as executor:
+            futures = [executor.submit(self.run, tool, args, check=False, **kwargs) for tool, args, kwargs in calls]
+            results = [future.result() for future in futures]
+        if check:
+            for result in results:
+                if not result.ok:
+                    raise ToolError(result)
+        return results
+
+    @contextmanager
+    def _start(self, tool, args, stdout, stderr, stdin, cwd, env):
+        """
+        Start a tool in a slot, stream its stderr, then wait for it and time it
+        """
+        command = [self.get_tool_path(tool)] + [str(arg) for arg in args]
+        result = ToolResult(tool, command)
+        with self._slots, self._open(stdin, "rb") as stdin_file:
+            self.logger.debug("Run {}".format(" ".join(command)))
+            start = time.perf_counter()
+            process = subprocess.Popen(
+                command, stdin=stdin if stdin_file is None else stdin_file, stdout=stdout, stderr=subprocess.PIPE,
+                cwd=cwd, env=env,
+            )
+            tail = collections.deque(maxlen=self.stderr_tail)
+            stderr_thread = threading.Thread(
+                target=self._consume, args=(process.stderr, stderr, tool, "stderr", tail),
+                name="bioit-tool-stderr", daemon=True,
+            )
+            stderr_thread.start()
+            try:
+                yield process, result
+            except BaseException:
+                process.kill()
+                raise
+            finally:
+                if process.stdout is not None:
+                    process.stdout.close()
+                stderr_thread.join()
+                self._wait(process, result)
+                result.wall_time = time.perf_counter() - start
+                result.stderr_tail = [line.decode(errors="replace") for line in tail]
+        self.logger.info(
+            "{} ended with return code {} in {:.2f}s wall time, {:.2f}s CPU time".format(
+                tool, result.returncode, result.wall_time, result.cpu_time or 0.0
+            ),
+            extra={"tool": result.to_dict()},
+        )
+
+    def _consume(self, pipe, target, tool, name, tail=None):
+        """
+        Read a pipe line by line until it is closed, sending the lines to target
+        """
+        try:
+            with self._open(target, "wb") as output:
+                for line in pipe:
+                    if tail is not None:
+                        tail.append(line.rstrip(b"\n"))
+                    if callable(target):
+                        target(line)
+                    elif output is not None:
+                        output.write(line)
+                    elif target is None:
+                        self.logger.debug("[%s %s] %s", tool, name, line.rstrip(b"\n").decode(errors="replace"))
+        finally:
+            pipe.close()
+
+    @staticmethod
+    @contextmanager
+    def _open(target, mode):
+        """
+        File object of a file name, target itself if it is already a file object, None otherwise
+        """
+        if isinstance(target, (str, os.PathLike)):
+            with open(str(target), mode) as target_file:
+                yield target_file
+        elif hasattr(target, "write" if "w" in mode else "read"):
+            yield target
+        else:
+            yield None
+
+    @staticmethod
+    def _wait(process, result):
+        """
+        Reap the process with wait4 to get its own rusage: CPU time of this child only, even with concurrent tools
+        """
+        if hasattr(os, "wait4"):
+            try:
+                _, status, usage = os.wait4(process.pid, 0)
+            except ChildProcessError:
+                # Already reaped by Popen
+                pass
+            else:
+                process.returncode = -os.WTERMSIG(status) if os.WIFSIGNALED(status) else os.WEXITSTATUS(status)
+                result.cpu_time = usage.ru_utime + usage.ru_stime
+                # ru_maxrss is in bytes on macOS, in kilobytes elsewhere
+                result.peak_rss = usage.ru_maxrss if sys.platform == "darwin" else usage.ru_maxrss * 1024
+        result.returncode = process.wait()
@@ -0,0 +1,54 @@
+import os
+import tempfile
+from contextlib import contextmanager
+
+
+def get_cache_dir():
+    """
+    Directory of the files derived from reference files when the reference directory is read only:
+    $BIOIT_CACHE_DIR, ~/.cache/bioit_module by default
+    """
+    return os.environ.get('BIOIT_CACHE_DIR', os.path.join(os.path.expanduser('~'), '.cache', 'bioit_module'))
+
+
+def get_umask():
+    """
+    File mode creation mask of the process, read without changing it when /proc is available
+    """
+    try:
+        with open('/proc/self/status') as status:
+            for line in status:
+                if line.startswith('Umask:'):
+                    return int(line.split()[1], 8)
+    except (OSError, ValueError, IndexError):
+        pass
+    umask = os.umask(0o022)
+    os.umask(umask)
+    return umask
+
+
+def set_default_mode(fd):
+    """
+    Give a file made by tempfile.mkstemp (mode 0600) the mode of a file made by open(): 0666 minus the umask
+    """
+    os.fchmod(fd, 0o666 & ~get_umask())
+
+
+@contextmanager
+def atomic_write(filename, mode='wb'):
+    """
+    Write in a temporary file of the same directory, renamed to filename only if everything was written
+    """
+    directory = os.path.dirname(os.path.abspath(filename))
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp_file = tempfile.mkstemp(dir=directory, suffix='.tmp')
+    try:
+        # Shared reference directories: other users must be able to read the file
+        set_default_mode(fd)
+        with os.fdopen(fd, mode) as output:
+            yield output
+        os.replace(tmp_file, filename)
+    except BaseException:
+        if os.path.exists(tmp_file):
+            os.remove(tmp_file)
+        raise
@@ -0,0 +1,159 @@
+import argparse
+import json
+import logging
+import os
+import queue
+import socketserver
+import sys
+import threading
+import time
+from contextlib import redirect_stdout
+from bioit_module import CommandParser, build_logger, exit_code
+from bioit_module.batch_launcher import run_sample
+
+
+class LauncherWorker:
+    """
+    Long-running worker running jobs of a BioitLauncher subclass without restarting Python.
+    Install config, parameters and pipeline parameters stay in the process config cache, reference
+    directories in the ReferenceCatalog, so a job only pays for its own arguments and launch().
+
+    Jobs are JSON lines {"id": ..., "argv": [...]} read from stdin (default) or from a Unix socket (--socket).
+    Each job gets a JSON line answer {"id": ..., "exit_code": ..., "wall_time": ...} with the usual exit_code values.
+    {"command": "shutdown"} stops the worker.
+    Worker options are --socket, --workers and --worker-log, every other argument is shared by all jobs.
+    """
+    def __init__(self, launcher_class, command_parser, argv=None):
+        """
+        :param launcher_class: BioitLauncher subclass run for each job
+        :param command_parser: CommandParser of the module, used to parse each job arguments
+        :param argv: list of arguments, sys.argv if None
+        """
+        self.launcher_class = launcher_class
+        self.command_parser = command_parser
+        self.worker_args, self.shared_argv = self._build_parser().parse_known_args(argv)
+        log_level = logging.DEBUG if self.worker_args.debug else logging.INFO
+        if self.worker_args.debug:
+            self.shared_argv.append('-d')
+        self.logger = build_logger(self.worker_args.worker_log, level=log_level)
+        self._job_count = 0
+        self._lock = threading.Lock()
+        # Jobs run in numbered slots: the slot number names the job logger, so loggers are reused
+        self._slots = queue.Queue()
+        for slot in range(self.worker_args.workers):
+            self._slots.put(slot)
+        self._server = None
+
+    def serve(self):
+        if self.worker_args.socket:
+            self.serve_socket(self.worker_args.socket)
+        else:
+            self.serve_stream(sys.stdin, sys.stdout)
+
+    def serve_stream(self, input_stream, output_stream):
+        """
+        Run the jobs of input_stream one after the other, the output of launch() is sent to stderr
+        """
+        for line in input_stream:
+            if not line.strip():
+                continue
+            with redirect_stdout(sys.stderr):
+                response = self.handle_request(line)
+            if response is None:
+                break
+            output_stream.write(json.dumps(response) + "\n")
+            output_stream.flush()
+
+    def serve_socket(self, socket_path):
+        worker = self
+
+        class JobHandler(socketserver.StreamRequestHandler):
+            def handle(self):
+                for line in self.rfile:
+                    if not line.strip():
+                        continue
+                    response = worker.handle_request(line.decode())
+                    if response is None:
+                        threading.Thread(target=worker._server.shutdown).start()
+                        return
+                    self.wfile.write((json.dumps(response) + "\n").encode())
+                    self.wfile.flush()
+
+        class JobServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+            daemon_threads = True
+
+        self._server = JobServer(socket_path, JobHandler)
+        self.logger.info("Worker listening on {}".format(socket_path))
+        try:
+            self._server.serve_forever()
+        finally:
+            self._server.server_close()
+            if os.path.exists(socket_path):
+                os.remove(socket_path)
+
+    def handle_request(self, line):
+        """
+        Run the job of a JSON line, return its answer, None for a shutdown request
+        """
+        try:
+            request = json.loads(line)
+        except ValueError:
+            return {"id": None, "exit_code": exit_code.ValidationArgsError, "error": "Invalid JSON request"}
+        if not isinstance(request, dict):
+            return {"id": None, "exit_code": exit_code.ValidationArgsError, "error": "Request must be a JSON object"}
+        if request.get("command") == "shutdown":
+            return None
+        argv = request.get("argv", [])
+        if not isinstance(argv, list) or not all(isinstance(arg, str) for arg in argv):
+            return {
+                "id": request.get("id"), "exit_code": exit_code.ValidationArgsError,
+                "error": "argv must be a list of strings",
+            }
+        start = time.perf_counter()
+        slot = self._slots.get()
+        try:
+            code = self.run_job(argv, slot)
+        except Exception:
+            self.logger.exception("Job {} failed".format(request.get("id")))
+            code = exit_code.UnknownError
+        finally:
+            self._slots.put(slot)
+        return {"id": request.get("id"), "exit_code": code, "wall_time": time.perf_counter() - start}
+
+    def run_job(self, argv, slot=0):
+        with self._lock:
+            self._job_count += 1
+            job_index = self._job_count
+        try:
+            args = self.command_parser.parse(self.shared_argv + list(argv))
+        except SystemExit:
+            self.logger.error("Invalid arguments for job {}: {}".format(job_index, argv))
+            return exit_code.ValidationArgsError
+        code = run_sample(self.launcher_class, "worker.{}".format(slot), args, None)
+        self.logger.info("Job {} ({}) ended with exit code {}".format(job_index, args.prefix, code))
+        return code
+
+    @staticmethod
+    def _build_parser():
+        parser = argparse.ArgumentParser(add_help=False)
+        parser.add_argument(
+            "--socket",
+            dest="socket",
+            required=False,
+            help="Unix socket to listen to, jobs are read from stdin if not defined.",
+        )
+        parser.add_argument(
+            "--workers",
+            dest="workers",
+            default=1,
+            type=CommandParser._is_valid_positive_integer,
+            help="Number of jobs run at the same time (socket mode).",
+        )
+        parser.add_argument(
+            "--worker-log",
+            dest="worker_log",
+            required=False,
+            help="Worker log file, STDERR if not defined.",
+        )
+        parser.add_argument("-d", "--debug", dest="debug", default=False, action="store_true")
+        return parser
@@ -42,16 +42,19 @@ setup(name='bioit_module',
 
         # Specify the Python versions you support here. In particular, ensure
         # that you indicate whether you support Python 2, Python 3 or both.
-        'Programming Language :: Python :: 3', 'Programming Language :: Python :: 3.2',
-        'Programming Language :: Python :: 3.3', 'Programming Language :: Python :: 3.4',
+        'Programming Language :: Python :: 3', 'Programming Language :: Python :: 3.7',
+        'Programming Language :: Python :: 3.8', 'Programming Language :: Python :: 3.9',
     ],
 
+    # Module level __getattr__ (lazy public names) and contextvars (log phases) need Python 3.7
+    python_requires='>=3.7',
+
     # What does your project relate to?
     keywords='bioit module',
 
     # You can just specify the packages manually here if your project is
     # simple. Or you can use find_packages().
-    packages=find_packages(exclude=['contrib', 'docs', 'tests*']),
+    packages=find_packages(exclude=['contrib', 'docs', 'tests*', 'benchmarks*']),
 
     # List run-time dependencies here.  These will be installed by pip when
     # your project is installed. For an analysis of "install_requires" vs pip's
@@ -63,7 +66,7 @@ setup(name='bioit_module',
     # dependencies). You can install these using the following syntax,
     # for example:
     # $ pip install -e .[dev,test]
-    extras_require={},
+    extras_require={'numpy': ['numpy']},
 
     # If there are data files included in your packages that need to be
     # installed, specify them here.  If using Python 2.6 or less, then these
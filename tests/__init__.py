@@ -0,0 +1,12 @@
+import os
+from pathlib import Path
+
+
+def get_subprocess_env():
+    """
+    Environment of the module scripts run by the tests: bioit_module of this tree first on PYTHONPATH
+    """
+    python_path = [str(Path(__file__).parent.parent)]
+    if os.environ.get("PYTHONPATH"):
+        python_path.append(os.environ["PYTHONPATH"])
+    return dict(os.environ, PYTHONPATH=os.pathsep.join(python_path))
@@ -0,0 +1,61 @@
+from bioit_module.bam_set import BamSet
+from pathlib import Path
+import os
+import pytest
+
+
+def file_size(bam_file, factor=1):
+    return os.path.getsize(bam_file) * factor
+
+
+def failing(bam_file):
+    raise AssertionError("summary computed again")
+
+
+@pytest.fixture
+def bam_files(tmp_path):
+    bam_files = []
+    for i, name in enumerate(['a.bam', 'b.bam', 'c.bam']):
+        bam_file = Path(tmp_path, name)
+        bam_file.write_bytes(b'x' * (i + 1))
+        Path(tmp_path, name + '.bai').touch()
+        bam_files.append(str(bam_file))
+    return bam_files
+
+
+class TestBamSet:
+    def test_check_indexes(self, bam_files):
+        BamSet(bam_files).check_indexes()
+        os.remove(bam_files[1] + '.bai')
+        Path(bam_files[1][:-4] + '.bai').touch()
+        BamSet(bam_files).check_indexes()
+        os.remove(bam_files[1][:-4] + '.bai')
+        with pytest.raises(Exception) as e:
+            BamSet(bam_files).map(file_size)
+        assert 'b.bam' in str(e.value)
+
+    def test_map_order(self, bam_files, tmp_path):
+        bam_set = BamSet(bam_files, workers=2, cache_dir=str(Path(tmp_path, 'cache')))
+        assert bam_set.map(file_size, 10) == [10, 20, 30]
+
+    def test_summarize_cached(self, bam_files, tmp_path):
+        cache_dir = str(Path(tmp_path, 'cache'))
+        assert BamSet(bam_files, workers=2, cache_dir=cache_dir).summarize(file_size) == [1, 2, 3]
+        assert BamSet(bam_files, cache_dir=cache_dir).summarize(file_size, 2) == [2, 4, 6]
+        bam_set = BamSet(bam_files, cache_dir=cache_dir)
+        bam_set._run = lambda function, args, bam_files: [failing(bam_file) for bam_file in bam_files]
+        assert bam_set.summarize(file_size) == [1, 2, 3]
+
+    def test_summarize_modified_bam(self, bam_files, tmp_path):
+        cache_dir = str(Path(tmp_path, 'cache'))
+        BamSet(bam_files, cache_dir=cache_dir).summarize(file_size)
+        Path(bam_files[0]).write_bytes(b'x' * 5)
+        assert BamSet(bam_files, cache_dir=cache_dir).summarize(file_size) == [5, 2, 3]
+
+    def test_summary_cache_files(self, bam_files, tmp_path):
+        cache_dir = Path(tmp_path, 'cache')
+        BamSet(bam_files, cache_dir=str(cache_dir)).summarize(file_size)
+        cache_files = sorted(cache_dir.iterdir())
+        assert len(cache_files) == 3 and all(path.name.endswith('.summary.pickle') for path in cache_files)
+        cache_files[0].write_bytes(b'corrupted')
+        assert BamSet(bam_files, cache_dir=str(cache_dir)).summarize(file_size) == [1, 2, 3]
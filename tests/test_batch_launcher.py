@@ -0,0 +1,125 @@
+from bioit_module import BioitLauncher, CommandParser, exit_code
+from bioit_module.batch_launcher import BatchLauncher
+from pathlib import Path
+from schematics.models import Model
+from schematics.types import IntType
+import pytest
+
+
+class SampleCommandParser(CommandParser):
+    def set_custom_option(self):
+        self.parser.add_argument("--value", dest="value", required=True, type=self._is_valid_integer)
+
+
+class SampleLauncher(BioitLauncher):
+    read_count = 0
+
+    def read_parameters(self):
+        SampleLauncher.read_count += 1
+        config = self._read_config_file(self.args.params)
+        return config.get("ANALYSIS", "factor")
+
+    def launch(self):
+        if self.args.value == 0:
+            exit(exit_code.ValidationParamsError)
+        self.logger.info("value {}".format(self.args.value))
+        Path(self.args.prefix + ".txt").write_text(str(self.args.value * int(self.params)))
+
+
+class FactorParameters(Model):
+    factor = IntType(required=True)
+
+
+class ModelSampleLauncher(SampleLauncher):
+    def read_parameters(self):
+        parameters = FactorParameters()
+        parameters.factor = self._read_config_file(self.args.params).get("ANALYSIS", "factor")
+        parameters.validate()
+        return parameters
+
+    def launch(self):
+        Path(self.args.prefix + ".txt").write_text(str(self.args.value * self.params.factor))
+
+
+class CheckedSampleLauncher(SampleLauncher):
+    def _validate_params(self):
+        if self.args.value * int(self.params) > 10:
+            raise ValueError("factor too high for this value")
+
+
+@pytest.fixture
+def batch(tmp_path):
+    params = Path(tmp_path, 'params.ini')
+    params.write_text("[ANALYSIS]\nfactor = 3\n")
+    sample_sheet = Path(tmp_path, 'samples.tsv')
+    sample_sheet.write_text(
+        "# prefix\targs\n"
+        "{0}/out/s1\t--value\t1\n"
+        "{0}/out/s2\t--value\t0\n"
+        "{0}/out/s3\t--value\tx\n"
+        "\n"
+        "{0}/out/s4\t--value=4\n".format(tmp_path)
+    )
+    return ['--sample-sheet', str(sample_sheet), '-p', str(params)]
+
+
+class TestBatchLauncher:
+    @pytest.mark.parametrize("pool", ["thread", "process"])
+    def test_run(self, batch, tmp_path, pool):
+        SampleLauncher.read_count = 0
+        launcher = BatchLauncher(SampleLauncher, SampleCommandParser("1.0"), batch + ['--pool', pool, '--workers', '2'])
+        results = launcher.run()
+        assert [result.exit_code for result in results] == [
+            0, exit_code.ValidationParamsError, exit_code.ValidationArgsError, 0
+        ]
+        assert [Path(result.prefix).name for result in results] == ['s1', 's2', 's3', 's4']
+        assert Path(tmp_path, 'out', 's1.txt').read_text() == '3'
+        assert Path(tmp_path, 'out', 's4.txt').read_text() == '12'
+        assert 'value 4' in Path(tmp_path, 'out', 's4.log').read_text()
+        assert 'value 1' not in Path(tmp_path, 'out', 's4.log').read_text()
+        assert SampleLauncher.read_count == 1
+
+    @pytest.mark.parametrize("pool", ["thread", "process"])
+    def test_model_configs(self, batch, tmp_path, pool):
+        launcher = BatchLauncher(
+            ModelSampleLauncher, SampleCommandParser("1.0"), batch + ['--pool', pool, '--workers', '2']
+        )
+        assert [result.exit_code for result in launcher.run()][0] == 0
+        assert Path(tmp_path, 'out', 's4.txt').read_text() == '12'
+
+    def test_sample_config_args_rejected(self, batch, tmp_path):
+        sample_sheet = Path(tmp_path, 'own_params.tsv')
+        sample_sheet.write_text(
+            "{0}/out/s1\t--value\t1\t-p\t{0}/params.ini\n"
+            "{0}/out/s2\t--value\t2\t--params={0}/params.ini\n"
+            "{0}/out/s3\t--value\t3\t-p{0}/params.ini\n"
+            "{0}/out/s4\t--value\t4\t--par\t{0}/params.ini\n"
+            "{0}/out/s5\t--value\t5\t-dp\t{0}/params.ini\n"
+            "{0}/out/s6\t--value\t6\t-d\n".format(tmp_path)
+        )
+        argv = ['--sample-sheet', str(sample_sheet)] + batch[2:] + ['--pool', 'thread']
+        results = BatchLauncher(SampleLauncher, SampleCommandParser("1.0"), argv).run()
+        assert [result.exit_code for result in results] == [exit_code.ValidationArgsError] * 5 + [0]
+
+    def test_validation_hooks_per_sample(self, batch, tmp_path):
+        launcher = BatchLauncher(CheckedSampleLauncher, SampleCommandParser("1.0"), batch + ['--pool', 'thread'])
+        assert [result.exit_code for result in launcher.run()] == [
+            0, exit_code.ValidationParamsError, exit_code.ValidationArgsError, exit_code.ValidationParamsError
+        ]
+        assert Path(tmp_path, 'out', 's1.txt').read_text() == '3'
+
+    def test_workers_at_least_one(self, batch):
+        with pytest.raises(SystemExit):
+            BatchLauncher(SampleLauncher, SampleCommandParser("1.0"), batch + ['--workers', '0'])
+
+    def test_launch_exit_code(self, batch):
+        launcher = BatchLauncher(SampleLauncher, SampleCommandParser("1.0"), batch + ['--pool', 'thread'])
+        with pytest.raises(SystemExit) as e:
+            launcher.launch()
+        assert e.value.code == exit_code.ValidationParamsError
+
+    def test_read_sample_sheet(self, tmp_path):
+        sample_sheet = Path(tmp_path, 'samples.tsv')
+        sample_sheet.write_text("#comment\nout/a\t-x\t1\t\nout/b\n")
+        samples = BatchLauncher.read_sample_sheet(str(sample_sheet))
+        assert [(sample.prefix, sample.args) for sample in samples] == [('out/a', ['-x', '1']), ('out/b', [])]
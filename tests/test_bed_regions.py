@@ -0,0 +1,67 @@
+from pathlib import Path
+import os
+import pytest
+
+np = pytest.importorskip("numpy")
+from bioit_module.bed_regions import BedRegions
+
+BED = (
+    "track name=panel\n"
+    "chr1\t100\t200\tA\n"
+    "chr1\t150\t250\tB\n"
+    "chr1\t250\t300\tC\n"
+    "chr1\t10\t20\tD\n"
+    "chr2\t1000\t1100\tE\n"
+)
+
+
+@pytest.fixture
+def bed_file(tmp_path):
+    bed_file = Path(tmp_path, 'panel.bed')
+    bed_file.write_text(BED)
+    return bed_file
+
+
+class TestBedRegions:
+    def test_read(self, bed_file):
+        regions = BedRegions.read(bed_file)
+        assert len(regions) == 5
+        assert regions.get_chroms() == ['chr1', 'chr2']
+        assert regions.starts['chr1'].tolist() == [10, 100, 150, 250]
+        assert regions.ends['chr1'].tolist() == [20, 200, 250, 300]
+
+    def test_npy_cache(self, bed_file, monkeypatch):
+        BedRegions.read(bed_file)
+        assert Path(str(bed_file) + '.npy').is_file()
+
+        def fail_parse(bed_file):
+            raise AssertionError("BED parsed again")
+        monkeypatch.setattr(BedRegions, 'parse', fail_parse)
+        assert BedRegions.read(bed_file).ends['chr2'].tolist() == [1100]
+
+    def test_npy_cache_invalidated(self, bed_file):
+        BedRegions.read(bed_file)
+        bed_file.write_text(BED + "chr3\t1\t2\n")
+        stat = os.stat(str(bed_file))
+        os.utime(str(bed_file), ns=(stat.st_atime_ns, stat.st_mtime_ns + 10 ** 9))
+        assert BedRegions.read(bed_file).get_chroms() == ['chr1', 'chr2', 'chr3']
+
+    def test_merge(self, bed_file):
+        merged = BedRegions.read(bed_file).merge()
+        assert merged.starts['chr1'].tolist() == [10, 100]
+        assert merged.ends['chr1'].tolist() == [20, 300]
+        assert BedRegions.read(bed_file).total_length() == 10 + 200 + 100
+
+    def test_overlap(self, bed_file):
+        regions = BedRegions.read(bed_file)
+        assert regions.overlap('chr1', 190, 260).tolist() == [1, 2, 3]
+        assert regions.overlap('chr1', 20, 100).tolist() == []
+        assert regions.overlap('chrX', 0, 100).tolist() == []
+
+    def test_count_overlaps(self, bed_file):
+        regions = BedRegions.read(bed_file)
+        positions = np.array([5, 10, 19, 20, 160, 249, 250, 299, 300])
+        assert regions.count_overlaps('chr1', positions).tolist() == [0, 1, 1, 0, 2, 1, 1, 1, 0]
+        assert regions.in_regions('chr2', [1000, 1100]).tolist() == [True, False]
+        assert regions.contains('chr1', 160)
+        assert not regions.contains('chrX', 160)
@@ -0,0 +1,27 @@
+from benchmarks.run import BENCHMARKS, compare, main, run_benchmarks
+from pathlib import Path
+import json
+
+
+class TestBenchmarks:
+    def test_run_benchmarks(self, tmp_path):
+        results = run_benchmarks(tmp_path, scale=0.01, repeat=1)
+        assert results['bioit_module_version']
+        assert set(results['benchmarks']) == set(BENCHMARKS)
+        for result in results['benchmarks'].values():
+            assert 'skipped' in result or result['median'] >= 0
+
+    def test_compare(self):
+        previous = {'benchmarks': {'a': {'median': 1.0}, 'b': {'median': 1.0}, 'c': {'skipped': 'numpy'}}}
+        current = {'benchmarks': {'a': {'median': 1.1}, 'b': {'median': 2.0}, 'c': {'median': 1.0}, 'd': {'median': 1.0}}}
+        assert compare(previous, current) == [('b', 1.0, 2.0, 2.0)]
+        assert compare(previous, current, threshold=3) == []
+
+    def test_main_regression_exit_code(self, tmp_path):
+        output = Path(tmp_path, 'results.json')
+        previous = Path(tmp_path, 'previous.json')
+        previous.write_text(json.dumps({'bioit_module_version': '0', 'benchmarks': {'launcher.read_config_file': {'median': 1e-9}}}))
+        argv = ['--scale', '0.01', '--repeat', '1', '--work-dir', str(Path(tmp_path, 'work')), '-o', str(output)]
+        assert main(argv + ['launcher.read_config_file']) == 0
+        assert list(json.loads(output.read_text())['benchmarks']) == ['launcher.read_config_file']
+        assert main(argv + ['--compare', str(previous), 'launcher.read_config_file']) == 1
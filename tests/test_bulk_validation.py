@@ -0,0 +1,80 @@
+from bioit_module.bulk_validation import BulkValidator, FILE_ERROR, validate_config_file
+from schematics.exceptions import ValidationError
+from schematics.models import Model
+from schematics.types import FloatType, IntType, StringType
+from pathlib import Path
+import pytest
+
+
+class SampleParameters(Model):
+    mincov = IntType(required=True, min_value=0)
+    minfreq = FloatType(required=True, min_value=0, max_value=100)
+    minStrandFreq = FloatType(required=True, min_value=0, max_value=100)
+    caller = StringType(default="mutect", choices=["mutect", "vardict"])
+
+    def validate_minStrandFreq(self, data, value):
+        if value < data['minfreq']:
+            raise ValidationError("minStrandFreq is smaller than minfreq")
+
+
+class CoverageParameters(Model):
+    mincov = IntType(required=True)
+    maxcov = IntType(required=True)
+    caller = StringType(default="mutect", choices=["mutect", "vardict"])
+
+    def validate_maxcov(self, data, value):
+        if value < self.mincov:
+            raise ValidationError("maxcov is smaller than mincov")
+
+
+@pytest.fixture
+def parameter_dir(tmp_path):
+    parameters = {
+        's1.ini': "[ANALYSIS]\nmincov = 10\nminfreq = 5\nminStrandFreq = 6\n",
+        's2.ini': "[ANALYSIS]\nmincov = -1\nminfreq = x\nminStrandFreq = 6\ncaller = gatk\n",
+        's3.ini': "[ANALYSIS]\nmincov = 10\nminfreq = 5\nminStrandFreq = 1\n",
+        's4.ini': "[ANALYSIS]\nmincov = 10\n",
+        's5.ini': "not an ini file\n",
+        'notes.txt': "",
+    }
+    for name, content in parameters.items():
+        Path(tmp_path, name).write_text(content)
+    return tmp_path
+
+
+class TestBulkValidation:
+    def test_valid_file(self, parameter_dir):
+        result = validate_config_file(SampleParameters, str(Path(parameter_dir, 's1.ini')), section='ANALYSIS')
+        assert result.valid
+        assert result.data == {'mincov': 10, 'minfreq': 5.0, 'minStrandFreq': 6.0, 'caller': 'mutect'}
+
+    @pytest.mark.parametrize("pool", ["thread", "process"])
+    def test_validate_directory(self, parameter_dir, pool):
+        report = BulkValidator(SampleParameters, section='ANALYSIS', workers=2, pool=pool).validate(parameter_dir)
+        assert [Path(result.filename).name for result in report.results] == ['s1.ini', 's2.ini', 's3.ini', 's4.ini', 's5.ini']
+        assert not report.valid
+        failures = {Path(filename).name: errors for filename, errors in report.to_primitive()['failures'].items()}
+        assert sorted(failures) == ['s2.ini', 's3.ini', 's4.ini', 's5.ini']
+        assert sorted(failures['s2.ini']) == ['caller', 'mincov', 'minfreq']
+        assert failures['s3.ini'] == {'minStrandFreq': ['minStrandFreq is smaller than minfreq']}
+        assert sorted(failures['s4.ini']) == ['minStrandFreq', 'minfreq']
+        assert list(failures['s5.ini']) == [FILE_ERROR]
+        assert len(report.format().splitlines()) == 7
+
+    def test_validate_files_without_section(self, parameter_dir, tmp_path):
+        missing = str(Path(tmp_path, 'missing.ini'))
+        report = BulkValidator(SampleParameters, pool='thread').validate([Path(parameter_dir, 's1.ini'), missing])
+        assert report.results[0].valid
+        assert list(report.results[1].errors) == [FILE_ERROR]
+        assert BulkValidator(SampleParameters).validate([]).valid
+
+    def test_model_validator_with_instance(self, tmp_path):
+        Path(tmp_path, 'a.ini').write_text("[ANALYSIS]\nmincov = 10\nmaxcov = 5\ncaller = gatk\n")
+        Path(tmp_path, 'b.ini').write_text("[ANALYSIS]\nmincov = x\nmaxcov = 5\n")
+        Path(tmp_path, 'c.ini').write_text("[ANALYSIS]\nmincov = 1\nmaxcov = 5\n")
+        report = BulkValidator(CoverageParameters, section='ANALYSIS', pool='thread').validate(tmp_path)
+        # Field and model level failures of a file in the same report
+        assert sorted(report.results[0].errors) == ['caller', 'maxcov']
+        assert report.results[0].errors['maxcov'] == ['maxcov is smaller than mincov']
+        assert list(report.results[1].errors) == ['mincov']
+        assert report.results[2].valid
@@ -0,0 +1,89 @@
+from bioit_module import BioitLauncher, CommandParser
+from bioit_module.checkpoint import Checkpoint
+from pathlib import Path
+import logging
+import os
+import pytest
+
+
+class StepLauncher(BioitLauncher):
+    def launch(self):
+        self.ran = []
+        sorted_file = self.args.prefix + ".sorted.txt"
+        counts_file = self.args.prefix + ".counts.txt"
+        self.run_step("sort", lambda: self._sort(sorted_file), inputs=[self.args.input], outputs=[sorted_file])
+        self.run_step(
+            "count", lambda: self._count(sorted_file, counts_file),
+            inputs=[sorted_file], outputs=[counts_file], params={"min": 1}
+        )
+
+    def _sort(self, sorted_file):
+        self.ran.append("sort")
+        Path(sorted_file).write_text("".join(sorted(Path(self.args.input).read_text().splitlines(True))))
+
+    def _count(self, sorted_file, counts_file):
+        self.ran.append("count")
+        Path(counts_file).write_text(str(len(Path(sorted_file).read_text().splitlines())))
+
+
+class StepCommandParser(CommandParser):
+    def set_custom_option(self):
+        self.parser.add_argument("input")
+
+
+def launch(tmp_path, *args):
+    argv = ['-o', str(Path(tmp_path, 'sample')), str(Path(tmp_path, 'input.txt'))] + list(args)
+    launcher = StepLauncher(
+        args=StepCommandParser("1.0", need_parameters=False).parse(argv), logger=logging.getLogger("test")
+    )
+    launcher.launch()
+    return launcher.ran
+
+
+@pytest.fixture
+def input_file(tmp_path):
+    input_file = Path(tmp_path, 'input.txt')
+    input_file.write_text("b\na\n")
+    return input_file
+
+
+def touch_later(path):
+    stat = os.stat(str(path))
+    os.utime(str(path), ns=(stat.st_atime_ns, stat.st_mtime_ns + 10 ** 9))
+
+
+class TestCheckpoint:
+    def test_completed_steps_skipped(self, tmp_path, input_file):
+        assert launch(tmp_path) == ["sort", "count"]
+        assert launch(tmp_path) == []
+        assert Path(tmp_path, 'sample.checkpoints.json').is_file()
+
+    def test_restart(self, tmp_path, input_file):
+        launch(tmp_path)
+        assert launch(tmp_path, '--restart') == ["sort", "count"]
+
+    def test_modified_input(self, tmp_path, input_file):
+        launch(tmp_path)
+        input_file.write_text("c\nb\na\n")
+        touch_later(input_file)
+        assert launch(tmp_path) == ["sort", "count"]
+
+    def test_missing_output(self, tmp_path, input_file):
+        launch(tmp_path)
+        os.remove(str(Path(tmp_path, 'sample.counts.txt')))
+        assert launch(tmp_path) == ["count"]
+
+    def test_interrupted_step(self, tmp_path, input_file):
+        launch(tmp_path)
+        checkpoint = Checkpoint(str(Path(tmp_path, 'sample.checkpoints.json')))
+        del checkpoint.steps["count"]
+        checkpoint.save()
+        assert launch(tmp_path) == ["count"]
+
+    def test_content_fingerprint(self, tmp_path, input_file):
+        checkpoint = Checkpoint(str(Path(tmp_path, 'manifest.json')))
+        fingerprint = checkpoint.fingerprint([input_file], content=True)
+        checkpoint.mark_done("step", fingerprint, [input_file], content=True)
+        touch_later(input_file)
+        assert checkpoint.fingerprint([input_file], content=True) == fingerprint
+        assert Checkpoint(str(Path(tmp_path, 'manifest.json'))).is_done("step", fingerprint, [input_file], content=True)
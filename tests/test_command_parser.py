@@ -50,6 +50,11 @@ class TestCommandParser:
         with pytest.raises(argparse.ArgumentTypeError):
            CommandParser._is_valid_integer('115d5')
 
+    def test_is_valid_positive_integer(self):
+        assert CommandParser._is_valid_positive_integer('4') == 4
+        with pytest.raises(argparse.ArgumentTypeError):
+            CommandParser._is_valid_positive_integer('0')
+
     def test_is_valid_extension(self, monkeypatch):
         def mockreturn(file):
             return True
@@ -74,4 +79,72 @@ class TestCommandParser:
             return True
         monkeypatch.setattr(CommandParser, '_is_valid_file', mockreturn)
         with pytest.raises(argparse.ArgumentTypeError):
-            assert CommandParser._is_valid_extension(['txt', 'png'])('test.fastq.gz')
\ No newline at end of file
+            assert CommandParser._is_valid_extension(['txt', 'png'])('test.fastq.gz')
+
+class LegacyCommandParser(CommandParser):
+    """
+    Module defining options named like the runtime options before they existed
+    """
+    def set_custom_option(self):
+        self.parser.add_argument("--metrics", dest="metrics_file", required=False)
+        self.parser.add_argument("-t", "--threads", dest="nb_threads", type=int, default=2)
+        self.parser.add_argument("--dry-run", dest="simulate", action="store_true")
+
+
+class TestRuntimeOptions:
+    def test_defaults(self):
+        args = CommandParser("1.0", need_parameters=False).parse(['-o', 'out'])
+        assert (args.metrics, args.dry_run, args.threads, args.log_format) == (False, False, 1, "text")
+
+    def test_module_options_kept(self):
+        args = LegacyCommandParser("1.0", need_parameters=False).parse(
+            ['-o', 'out', '--metrics', 'metrics.tsv', '-t', '4', '--dry-run', '--restart']
+        )
+        assert (args.metrics_file, args.nb_threads, args.simulate, args.restart) == ('metrics.tsv', 4, True, True)
+        assert not hasattr(args, 'metrics') and not hasattr(args, 'dry_run') and not hasattr(args, 'threads')
+
+
+class FilesCommandParser(CommandParser):
+    def set_custom_option(self):
+        self.parser.add_argument("--bed", dest="bed", type=self._is_valid_extension([".bed"]))
+        self.parser.add_argument("--dir", dest="dir", type=self._is_valid_dir)
+        self.parser.add_argument("bams", nargs="+", type=self._is_valid_file)
+
+
+class TestDeferredChecks:
+    @pytest.fixture
+    def files(self, tmp_path):
+        for name in ['a.bam', 'b.bam', 'panel.bed']:
+            Path(tmp_path, name).touch()
+        return tmp_path
+
+    def test_valid(self, files):
+        parser = FilesCommandParser("1.0", need_parameters=False, deferred_checks=True)
+        args = parser.parse([
+            '-o', 'out', '--bed', str(files / 'panel.bed'), '--dir', str(files), str(files / 'a.bam'), str(files / 'b.bam')
+        ])
+        assert args.bams == [str(files / 'a.bam'), str(files / 'b.bam')]
+
+    def test_all_errors_reported(self, files, capsys):
+        parser = FilesCommandParser("1.0", need_parameters=False, deferred_checks=True)
+        with pytest.raises(SystemExit):
+            parser.parse([
+                '-o', 'out', '--bed', str(files / 'missing.bed'), '--dir', str(files / 'missing'),
+                str(files / 'a.bam'), str(files / 'c.bam'), str(files / 'd.bam')
+            ])
+        error = capsys.readouterr().err
+        for name in ['missing.bed', 'missing', 'c.bam', 'd.bam']:
+            assert str(files / name) in error
+        assert "'{}'".format(files / 'a.bam') not in error
+
+    def test_extension_checked_while_parsing(self, files, capsys):
+        parser = FilesCommandParser("1.0", need_parameters=False, deferred_checks=True)
+        with pytest.raises(SystemExit):
+            parser.parse(['-o', 'out', '--bed', str(files / 'a.bam'), str(files / 'a.bam')])
+        assert "need to end with" in capsys.readouterr().err
+
+    def test_types_restored(self, files):
+        parser = FilesCommandParser("1.0", need_parameters=False, deferred_checks=True)
+        parser.parse(['-o', 'out', str(files / 'a.bam')])
+        bams = [action for action in parser.parser._actions if action.dest == 'bams'][0]
+        assert bams.type is CommandParser._is_valid_file
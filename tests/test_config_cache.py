@@ -0,0 +1,120 @@
+from bioit_module.config_cache import ConfigCache
+from bioit_module import BioitLauncher, CommandParser, PipelineParameters, exit_code
+from bioit_module.config_type import ExecutableFileType
+from bioit_module.path_cache import get_path_cache
+from pathlib import Path
+from schematics.models import Model
+import logging
+import os
+import pytest
+
+
+@pytest.fixture
+def config_file(tmp_path):
+    config_file = Path(tmp_path, 'params.ini')
+    config_file.write_text("[ANALYSIS]\nmincov = 3\n")
+    return config_file
+
+
+class Loader:
+    def __init__(self, value='value'):
+        self.value = value
+        self.calls = 0
+
+    def __call__(self):
+        self.calls += 1
+        return self.value
+
+
+class ToolsConfig(Model):
+    samtools = ExecutableFileType(required=True)
+
+
+class ToolsLauncher(BioitLauncher):
+    config_cache = ConfigCache()
+
+    def read_install_config(self):
+        config = ToolsConfig({'samtools': self._read_config_file(self.args.config).get("EXTERNALS", "samtools")})
+        config.validate()
+        return config
+
+    def launch(self):
+        pass
+
+
+class TestConfigCache:
+    def test_memory_cache(self, config_file):
+        cache = ConfigCache()
+        loader = Loader()
+        assert cache.get(str(config_file), loader, 'params') == 'value'
+        assert cache.get(str(config_file), loader, 'params') == 'value'
+        assert loader.calls == 1
+        cache.get(str(config_file), loader, 'other_reader')
+        assert loader.calls == 2
+
+    def test_modified_file(self, config_file):
+        cache = ConfigCache()
+        loader = Loader()
+        cache.get(str(config_file), loader)
+        config_file.write_text("[ANALYSIS]\nmincov = 30\n")
+        cache.get(str(config_file), loader)
+        assert loader.calls == 2
+
+    def test_missing_file_not_cached(self, tmp_path):
+        cache = ConfigCache()
+        loader = Loader()
+        cache.get(str(Path(tmp_path, 'missing.ini')), loader)
+        cache.get(None, loader)
+        cache.get(None, loader)
+        assert loader.calls == 3
+
+    def test_lru(self, tmp_path):
+        cache = ConfigCache(maxsize=2)
+        loader = Loader()
+        files = []
+        for name in ['a', 'b', 'c']:
+            files.append(str(Path(tmp_path, name)))
+            Path(files[-1]).touch()
+            cache.get(files[-1], loader)
+        cache.get(files[0], loader)
+        assert loader.calls == 4
+
+    def test_disk_cache(self, config_file, tmp_path):
+        cache_dir = str(Path(tmp_path, 'cache'))
+        parameters = PipelineParameters({'reference_dir': '/data', 'gencode_version': '38'})
+        ConfigCache(cache_dir=cache_dir).get(str(config_file), Loader(parameters))
+        loader = Loader()
+        cached = ConfigCache(cache_dir=cache_dir).get(str(config_file), loader)
+        assert loader.calls == 0
+        assert cached.gencode_version == '38'
+
+    def test_invalidate(self, config_file, tmp_path):
+        cache_dir = str(Path(tmp_path, 'cache'))
+        cache = ConfigCache(cache_dir=cache_dir)
+        loader = Loader()
+        cache.get(str(config_file), loader)
+        assert cache.invalidate(str(Path(tmp_path, 'other.ini'))) == 0
+        assert cache.invalidate(str(config_file)) == 2
+        assert os.listdir(cache_dir) == []
+        cache.get(str(config_file), loader)
+        assert loader.calls == 2
+
+    def test_launcher_paths_checked_on_cache_hit(self, tmp_path):
+        samtools = Path(tmp_path, 'samtools')
+        samtools.write_text("#!/bin/sh\n")
+        samtools.chmod(0o755)
+        install_config = Path(tmp_path, 'install.ini')
+        install_config.write_text("[EXTERNALS]\nsamtools = {}\n".format(samtools))
+        command_parser = CommandParser("1.0", default_install_config=str(install_config), need_parameters=False)
+        args = command_parser.parse(['-o', str(Path(tmp_path, 'out'))])
+        logger = logging.getLogger('test_config_cache')
+        ToolsLauncher(args=args, logger=logger)
+        samtools.unlink()
+        get_path_cache().invalidate(samtools)
+        with pytest.raises(SystemExit) as e:
+            ToolsLauncher(args=args, logger=logger)
+        assert e.value.code == exit_code.ValidationError
+
+    def test_launcher_key_parts(self):
+        assert ToolsLauncher._get_cache_key_parts()[0] == os.path.abspath(__file__)
+        assert ToolsLauncher._get_cache_key_parts()[-1] == 'ToolsLauncher'
@@ -0,0 +1,79 @@
+from bioit_module import BioitLauncher, CommandParser, exit_code
+from bioit_module.reference_catalog import ReferenceCatalog
+from bioit_module.reference_resolver import ReferenceResolver
+from pathlib import Path
+import json
+import pytest
+
+
+class PlannedLauncher(BioitLauncher):
+    cache_configs = False
+    launched = False
+
+    def plan(self):
+        return {
+            "inputs": [self.args.prefix + ".input.txt"],
+            "outputs": [self.args.prefix + "_alphalist.csv"],
+        }
+
+    def launch(self):
+        PlannedLauncher.launched = True
+
+
+@pytest.fixture
+def reference_dir(tmp_path):
+    ReferenceCatalog.clear()
+    ReferenceResolver.clear()
+    reference_dir = Path(tmp_path, 'reference')
+    Path(reference_dir, 'gtf').mkdir(parents=True)
+    Path(reference_dir, 'genome.fa').write_text(">chr1\nACGT\n")
+    Path(reference_dir, 'gtf', 'gencode.v38.annotation.gtf').write_text("gtf\n")
+    yield reference_dir
+    ReferenceCatalog.clear()
+    ReferenceResolver.clear()
+
+
+class TestDryRun:
+    def test_option(self):
+        parser = CommandParser("1.0", need_parameters=False)
+        assert parser.parse(["-o", "out", "--dry-run"]).dry_run
+        assert not parser.parse(["-o", "out"]).dry_run
+
+    def test_plan(self, tmp_path, capsys):
+        prefix = str(Path(tmp_path, 'sample'))
+        Path(prefix + ".input.txt").write_bytes(b"x" * 1000)
+        args = CommandParser("1.0", need_parameters=False).parse(["-o", prefix, "--dry-run", "-t", "4"])
+        PlannedLauncher.launched = False
+        PlannedLauncher(args=args).launch()
+        assert not PlannedLauncher.launched
+        plan = json.loads(capsys.readouterr().out)
+        assert plan["module"] == "PlannedLauncher" and plan["version"] == "1.0"
+        assert plan["inputs"] == [{"path": prefix + ".input.txt", "bytes": 1000}]
+        assert plan["input_bytes"] == 1000
+        assert plan["outputs"] == [prefix + "_alphalist.csv"]
+        assert plan["cpus"] == 4 and plan["memory"] >= 1000
+        assert plan["references"] == {} and plan["errors"] == []
+
+    def test_missing_input(self, tmp_path, capsys):
+        args = CommandParser("1.0", need_parameters=False).parse(["-o", str(Path(tmp_path, 'sample')), "--dry-run"])
+        with pytest.raises(SystemExit) as error:
+            PlannedLauncher(args=args).launch()
+        assert error.value.code == exit_code.ValidationError
+        plan = json.loads(capsys.readouterr().out)
+        assert plan["inputs"][0]["bytes"] is None and len(plan["errors"]) == 1
+
+    def test_references(self, tmp_path, reference_dir, capsys):
+        prefix = str(Path(tmp_path, 'sample'))
+        Path(prefix + ".input.txt").write_text("x")
+        pipe_params = Path(tmp_path, 'pipe.ini')
+        pipe_params.write_text("[PIPE_CONFIG]\ngencode_version = 38\n")
+        args = CommandParser("1.0", need_parameters=False, need_pipeline_parameters=True).parse([
+            "-o", prefix, "--dry-run", "--pipe_params", str(pipe_params), "--reference_dir", str(reference_dir)
+        ])
+        with pytest.raises(SystemExit):
+            PlannedLauncher(args=args).launch()
+        plan = json.loads(capsys.readouterr().out)
+        assert plan["references"]["fasta"] == [{"path": str(Path(reference_dir, 'genome.fa')), "bytes": 11}]
+        assert plan["references"]["gtf"][0]["bytes"] == 4
+        # No bed nor UHRR BAMs in this reference directory
+        assert any(error.startswith("bed:") for error in plan["errors"])
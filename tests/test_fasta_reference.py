@@ -0,0 +1,61 @@
+from bioit_module.fasta_reference import FastaReference
+from pathlib import Path
+import os
+import pytest
+
+FASTA = ">chr1 description\nACGTACGTAC\nGTACGTACGT\nAAC\n>chr2\nTTTTGGGGCC\nCC\n>empty\n"
+
+
+@pytest.fixture
+def fasta_file(tmp_path):
+    fasta_file = Path(tmp_path, 'genome.fa')
+    fasta_file.write_text(FASTA)
+    return fasta_file
+
+
+class TestFastaReference:
+    def test_build_fai(self, fasta_file):
+        FastaReference(fasta_file).close()
+        assert Path(str(fasta_file) + '.fai').read_text() == (
+            "chr1\t23\t18\t10\t11\n"
+            "chr2\t12\t50\t10\t11\n"
+            "empty\t0\t71\t0\t0\n"
+        )
+
+    def test_fai_mode(self, fasta_file):
+        umask = os.umask(0o022)
+        try:
+            FastaReference(fasta_file).close()
+        finally:
+            os.umask(umask)
+        assert os.stat(str(fasta_file) + '.fai').st_mode & 0o777 == 0o644
+
+    def test_fetch(self, fasta_file):
+        with FastaReference(fasta_file) as fasta:
+            assert fasta.references == ['chr1', 'chr2', 'empty']
+            assert fasta.get_length('chr1') == 23
+            assert fasta.fetch('chr1') == 'ACGTACGTACGTACGTACGTAAC'
+            assert fasta.fetch('chr1', 8, 12) == 'ACGT'
+            assert fasta.fetch('chr1', 19, 100) == 'TAAC'
+            assert fasta.fetch('chr2', 0, 3) == 'TTT'
+            assert fasta.fetch('empty') == ''
+            with pytest.raises(KeyError):
+                fasta.fetch('chrX', 0, 1)
+
+    def test_fetch_raw_zero_copy(self, fasta_file):
+        with FastaReference(fasta_file) as fasta:
+            view = fasta.fetch_raw('chr1', 1, 4)
+            assert isinstance(view, memoryview)
+            assert bytes(view) == b'CGT'
+            view.release()
+            assert fasta.fetch_raw('chr1', 8, 12) == b'ACGT'
+
+    def test_fetch_many(self, fasta_file):
+        with FastaReference(fasta_file) as fasta:
+            assert fasta.fetch_many([('chr2', 8, 12), ('chr1', 0, 2), ('chr1', 20, 23)]) == ['CCCC', 'AC', 'AAC']
+
+    def test_irregular_lines(self, tmp_path):
+        fasta_file = Path(tmp_path, 'bad.fa')
+        fasta_file.write_text(">chr1\nACG\nACGTA\n")
+        with pytest.raises(Exception):
+            FastaReference(fasta_file)
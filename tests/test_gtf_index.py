@@ -0,0 +1,88 @@
+from bioit_module.gtf_index import GtfIndex
+from pathlib import Path
+import pytest
+
+GTF = (
+    "##description: test\n"
+    "chr1\tHAVANA\tgene\t100\t500\t.\t+\t.\tgene_id \"G1.1\"; gene_name \"GENE1\";\n"
+    "chr1\tHAVANA\ttranscript\t100\t300\t.\t+\t.\tgene_id \"G1.1\"; transcript_id \"T1.1\"; gene_name \"GENE1\"; transcript_name \"GENE1-201\";\n"
+    "chr1\tHAVANA\texon\t100\t150\t.\t+\t.\tgene_id \"G1.1\"; transcript_id \"T1.1\";\n"
+    "chr1\tHAVANA\texon\t200\t300\t.\t+\t.\tgene_id \"G1.1\"; transcript_id \"T1.1\";\n"
+    "chr1\tHAVANA\ttranscript\t120\t500\t.\t+\t.\tgene_id \"G1.1\"; transcript_id \"T2.1\"; gene_name \"GENE1\"; transcript_name \"GENE1-202\";\n"
+    "chr1\tHAVANA\texon\t120\t500\t.\t+\t.\tgene_id \"G1.1\"; transcript_id \"T2.1\";\n"
+    "chr1\tHAVANA\tgene\t50\t80\t.\t-\t.\tgene_id \"G2.3\"; gene_name \"GENE2\";\n"
+    "chr2\tHAVANA\tgene\t1000\t2000\t.\t-\t.\tgene_id \"G3.1\"; gene_name \"GENE3\";\n"
+    "chr2\tHAVANA\ttranscript\t1000\t2000\t.\t-\t.\tgene_id \"G3.1\"; transcript_id \"T3.1\"; gene_name \"GENE3\";\n"
+)
+
+
+@pytest.fixture
+def gtf_file(tmp_path):
+    gtf_file = Path(tmp_path, 'gencode.v38.annotation.gtf')
+    gtf_file.write_text(GTF)
+    return gtf_file
+
+
+class TestGtfIndex:
+    def test_build_and_reuse(self, gtf_file, monkeypatch):
+        GtfIndex.open(gtf_file).close()
+        assert Path(str(gtf_file) + '.bioidx').is_file()
+
+        def fail_build(gtf_file, index_file):
+            raise AssertionError("index rebuilt")
+        monkeypatch.setattr(GtfIndex, 'build', fail_build)
+        with GtfIndex.open(gtf_file) as index:
+            assert len(index) == 6
+            assert index.get_chroms() == ['chr1', 'chr2']
+
+    def test_lookup(self, gtf_file):
+        with GtfIndex.open(gtf_file) as index:
+            feature, = index.lookup('T1.1')
+            assert (feature.feature, feature.chrom, feature.start, feature.end, feature.strand) == (
+                'transcript', 'chr1', 100, 300, '+'
+            )
+            assert feature.name == 'GENE1-201'
+            assert feature.get_gene().id == 'G1.1'
+            assert [line.split('\t')[2] for line in feature.read_lines()] == ['transcript', 'exon', 'exon']
+            assert [f.id for f in index.lookup('G2')] == ['G2.3']
+            assert [f.id for f in index.lookup('GENE3')] == ['G3.1']
+            assert index.lookup('unknown') == []
+
+    def test_gene_lines(self, gtf_file):
+        with GtfIndex.open(gtf_file) as index:
+            gene, = index.lookup('G1.1')
+            assert len(gene.read_lines()) == 6
+
+    def test_overlap(self, gtf_file):
+        with GtfIndex.open(gtf_file) as index:
+            assert [f.id for f in index.overlap('chr1', 310, 320)] == ['G1.1', 'T2.1']
+            assert [f.id for f in index.overlap('chr1', 60, 100)] == ['G2.3', 'G1.1', 'T1.1']
+            assert [f.id for f in index.overlap('chr1', 60, 100, feature='gene')] == ['G2.3', 'G1.1']
+            assert index.overlap('chr1', 501, 600) == []
+            assert index.overlap('chrX', 1, 600) == []
+
+    def test_iter_chrom(self, gtf_file):
+        with GtfIndex.open(gtf_file) as index:
+            assert [f.id for f in index.iter_chrom('chr1', feature='gene')] == ['G2.3', 'G1.1']
+            assert [f.id for f in index.iter_chrom('chr2')] == ['G3.1', 'T3.1']
+
+    def test_rebuilt_when_gtf_changes(self, gtf_file):
+        GtfIndex.open(gtf_file).close()
+        gtf_file.write_text(GTF + "chr3\tHAVANA\tgene\t1\t2\t.\t+\t.\tgene_id \"G4.1\";\n")
+        with GtfIndex.open(gtf_file) as index:
+            assert index.get_chroms() == ['chr1', 'chr2', 'chr3']
+
+    def test_read_only_directory_fallback(self, gtf_file, tmp_path, monkeypatch):
+        monkeypatch.setenv('BIOIT_CACHE_DIR', str(Path(tmp_path, 'cache')))
+        with GtfIndex.open(gtf_file, index_file=None) as index:
+            assert index.index_file == str(gtf_file) + '.bioidx'
+        original_build = GtfIndex.build
+
+        def read_only_build(gtf, index_file):
+            if index_file.endswith('annotation.gtf.bioidx'):
+                raise PermissionError(index_file)
+            original_build(gtf, index_file)
+        monkeypatch.setattr(GtfIndex, 'build', read_only_build)
+        Path(str(gtf_file) + '.bioidx').unlink()
+        with GtfIndex.open(gtf_file) as index:
+            assert index.index_file.startswith(str(Path(tmp_path, 'cache')))
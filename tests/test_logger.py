@@ -0,0 +1,151 @@
+from bioit_module import logger as bioit_logger
+from pathlib import Path
+from tests import get_subprocess_env
+import json
+import logging
+import subprocess
+import sys
+import pytest
+
+
+@pytest.fixture
+def root_logger(monkeypatch):
+    """
+    Root logger without handlers: pytest adds its own once fixtures are set up, call it in the test
+    """
+    root_logger = logging.getLogger()
+
+    def without_handlers():
+        monkeypatch.setattr(root_logger, 'handlers', [])
+        monkeypatch.setattr(root_logger, 'level', root_logger.level)
+        return root_logger
+    yield without_handlers
+    bioit_logger.stop_logger()
+
+
+class TestLogger:
+    def test_build_logger(self, root_logger, tmp_path):
+        root_logger = root_logger()
+        logfile = Path(tmp_path, 'out.log')
+        bioit_logger.build_logger(str(logfile))
+        root_logger.info("message")
+        assert "[INFO ]  message" in logfile.read_text()
+
+    def test_async_logger(self, root_logger, tmp_path):
+        root_logger = root_logger()
+        logfile = Path(tmp_path, 'out.log')
+        bioit_logger.build_logger(str(logfile), asynchronous=True)
+        for i in range(1000):
+            root_logger.info("message %s", i)
+        bioit_logger.flush_logger()
+        assert len(logfile.read_text().splitlines()) == 1000
+
+    def test_async_logger_drop(self, root_logger, tmp_path):
+        root_logger = root_logger()
+        logfile = Path(tmp_path, 'out.log')
+        bioit_logger.build_logger(str(logfile), asynchronous=True, queue_size=1, overflow=bioit_logger.DROP)
+        listener = bioit_logger._listener
+        listener.stop()
+        listener.dropped = 0
+        for i in range(10):
+            root_logger.info("message %s", i)
+        assert listener.dropped == 9
+
+    def test_async_logger_flushed_at_exit(self, tmp_path):
+        logfile = Path(tmp_path, 'out.log')
+        script = (
+            "import logging\n"
+            "from bioit_module import build_logger, exit_code\n"
+            "build_logger({!r}, asynchronous=True)\n"
+            "for i in range(5000):\n"
+            "    logging.getLogger().info('message %s', i)\n"
+            "exit(exit_code.ValidationParamsError)\n"
+        ).format(str(logfile))
+        process = subprocess.run(
+            [sys.executable, '-c', script], cwd=str(Path(__file__).parent.parent), stderr=subprocess.DEVNULL
+        )
+        assert process.returncode == 7
+        lines = logfile.read_text().splitlines()
+        assert len(lines) == 5000
+        assert lines[-1].endswith("message 4999")
+
+    @pytest.mark.parametrize("asynchronous", [False, True])
+    def test_json_format(self, root_logger, tmp_path, asynchronous):
+        root_logger = root_logger()
+        logfile = Path(tmp_path, 'out.log')
+        bioit_logger.build_logger(str(logfile), asynchronous=asynchronous, log_format=bioit_logger.JSON,
+                                  fields={'module_version': '1.0', 'prefix': 'out/s1', 'module': None})
+        with bioit_logger.log_phase('launch/align'):
+            root_logger.info("message %s", 1)
+        root_logger.warning("done", extra={'exit_code': 0})
+        bioit_logger.flush_logger()
+        first, second = [json.loads(line) for line in logfile.read_text().splitlines()]
+        assert first['message'] == 'message 1'
+        assert (first['level'], first['module_version'], first['prefix'], first['phase']) == (
+            'INFO', '1.0', 'out/s1', 'launch/align'
+        )
+        assert 'module' not in first and 'exit_code' not in first
+        assert 'phase' not in second
+        assert second['exit_code'] == 0
+
+    def test_log_sampled_every_n(self, caplog):
+        logger = logging.getLogger('sampled')
+        with caplog.at_level(logging.DEBUG, logger='sampled'):
+            for i in range(10):
+                bioit_logger.log_sampled(logger, logging.DEBUG, "item %s", i, every_n=4)
+        assert caplog.messages == ['item 0', 'item 4 (3 similar messages suppressed)', 'item 8 (3 similar messages suppressed)']
+        assert [record.suppressed for record in caplog.records] == [0, 3, 3]
+
+    def test_log_sampled_seconds(self, caplog, monkeypatch):
+        now = [100.0]
+        monkeypatch.setattr(bioit_logger.time, 'monotonic', lambda: now[0])
+        logger = logging.getLogger('sampled')
+        with caplog.at_level(logging.INFO, logger='sampled'):
+            for i in range(10):
+                bioit_logger.log_sampled(logger, logging.INFO, "item %s", i, seconds=1)
+                now[0] += 0.3
+        assert caplog.messages == ['item 0', 'item 4 (3 similar messages suppressed)', 'item 8 (3 similar messages suppressed)']
+
+    def test_log_sampled_disabled_level(self, caplog):
+        logger = logging.getLogger('sampled')
+        with caplog.at_level(logging.INFO, logger='sampled'):
+            for i in range(3):
+                bioit_logger.log_sampled(logger, logging.DEBUG, "item %s", i, every_n=1)
+        assert caplog.messages == []
+
+    def test_launcher_json_log(self, tmp_path):
+        script = Path(tmp_path, 'json_module.py')
+        script.write_text(
+            "import logging\n"
+            "from bioit_module import BioitLauncher, CommandParser\n"
+            "class JsonLauncher(BioitLauncher):\n"
+            "    def launch(self):\n"
+            "        with self.span('loop'):\n"
+            "            for i in range(100):\n"
+            "                self.log_every_n(50, logging.INFO, 'item %s', i)\n"
+            "JsonLauncher(CommandParser(version='2.0', need_parameters=False)).launch()\n"
+        )
+        logfile = Path(tmp_path, 'out.log')
+        subprocess.run(
+            [sys.executable, str(script), '-o', str(Path(tmp_path, 'out')), '-l', str(logfile), '--log-format', 'json'],
+            env=get_subprocess_env(), stderr=subprocess.DEVNULL, check=True
+        )
+        records = [json.loads(line) for line in logfile.read_text().splitlines()]
+        assert [record['message'] for record in records] == [
+            'item 0', 'item 50 (49 similar messages suppressed)', 'launch() ended with exit code 0'
+        ]
+        assert [record.get('phase') for record in records] == ['launch/loop', 'launch/loop', None]
+        assert records[-1]['exit_code'] == 0
+        assert all(record['module'] == 'JsonLauncher' and record['module_version'] == '2.0' for record in records)
+
+    def test_launcher_exit_code_before_launch(self, tmp_path, caplog):
+        from bioit_module import BioitLauncher, CommandParser, exit_code
+
+        class InvalidArgsLauncher(BioitLauncher):
+            def _validate_args(self):
+                raise ValueError("invalid arguments")
+
+        args = CommandParser("1.0", need_parameters=False).parse(['-o', str(Path(tmp_path, 'out'))])
+        with caplog.at_level(logging.INFO, logger='exit_code'), pytest.raises(SystemExit):
+            InvalidArgsLauncher(args=args, logger=logging.getLogger('exit_code'))
+        assert caplog.records[-1].exit_code == exit_code.ValidationArgsError
@@ -0,0 +1,85 @@
+from bioit_module import BioitLauncher, CommandParser, exit_code
+from bioit_module.batch_launcher import run_sample
+from bioit_module.memory_governor import MemoryGovernor, parse_memory, get_current_rss
+from pathlib import Path
+from tests import get_subprocess_env
+import argparse
+import subprocess
+import sys
+import pytest
+
+ALLOCATING_MODULE = '''
+import time
+from bioit_module import BioitLauncher, CommandParser
+
+
+class AllocatingLauncher(BioitLauncher):
+    def launch(self):
+        blocks = []
+        for _ in range(100):
+            blocks.append(bytearray(20 * 1024 * 1024))
+            time.sleep(0.05)
+
+
+AllocatingLauncher(CommandParser(version="1.0", need_parameters=False)).launch()
+'''
+
+
+class GovernedLauncher(BioitLauncher):
+    governors = []
+
+    def launch(self):
+        GovernedLauncher.governors.append(self.memory_governor)
+
+
+class TestMemoryGovernor:
+    def test_parse_memory(self):
+        assert parse_memory("1024") == 1024
+        assert parse_memory("500M") == 500 * 1024 ** 2
+        assert parse_memory("8g") == 8 * 1024 ** 3
+        assert parse_memory("1.5GB") == int(1.5 * 1024 ** 3)
+
+    def test_is_valid_memory(self):
+        assert CommandParser._is_valid_memory("2G") == 2 * 1024 ** 3
+        with pytest.raises(argparse.ArgumentTypeError):
+            CommandParser._is_valid_memory("lots")
+        for size in ["inf", "1e400G", "nan"]:
+            with pytest.raises(argparse.ArgumentTypeError):
+                CommandParser._is_valid_memory(size)
+
+    def test_pressure(self):
+        rss = get_current_rss()
+        with MemoryGovernor(rss * 10, interval=0.01) as governor:
+            assert not governor.under_pressure()
+            assert governor.peak_rss >= rss
+        with MemoryGovernor(int(rss * 1.1), soft_ratio=10, interval=0.01) as governor:
+            assert governor.under_pressure()
+
+    def test_on_limit(self):
+        reached = []
+        governor = MemoryGovernor(get_current_rss() // 2, interval=0.01, on_limit=reached.append)
+        governor.start()
+        governor._thread.join(timeout=5)
+        governor.stop()
+        assert reached == [governor]
+
+    def test_launcher_exit_code(self, tmp_path):
+        script = Path(tmp_path, 'allocating_module.py')
+        script.write_text(ALLOCATING_MODULE)
+        process = subprocess.run(
+            [sys.executable, str(script), '-o', str(Path(tmp_path, 'out')), '--max-memory', '200M', '--metrics'],
+            cwd=str(tmp_path), env=get_subprocess_env(),
+            stdout=subprocess.PIPE, stderr=subprocess.PIPE, universal_newlines=True
+        )
+        assert process.returncode == exit_code.MemoryLimitError, process.stderr
+        assert "Memory limit reached" in process.stderr
+        assert '"exit_code": {}'.format(exit_code.MemoryLimitError) in Path(tmp_path, 'out.metrics.json').read_text()
+
+    def test_ignored_in_shared_process(self, tmp_path):
+        args = CommandParser("1.0", need_parameters=False).parse(
+            ['-o', str(Path(tmp_path, 'out')), '--max-memory', '1M']
+        )
+        GovernedLauncher.governors = []
+        assert run_sample(GovernedLauncher, 0, args, (None, None, None)) == 0
+        assert GovernedLauncher.governors == [None]
+        assert "--max-memory is ignored" in Path(tmp_path, 'out.log').read_text()
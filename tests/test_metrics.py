@@ -0,0 +1,74 @@
+from bioit_module import BioitLauncher, CommandParser, exit_code
+from bioit_module.metrics import LauncherMetrics
+from pathlib import Path
+import json
+import logging
+import pytest
+
+
+class MetricsLauncher(BioitLauncher):
+    def launch(self):
+        with self.span("compute"):
+            sum(range(1000))
+        if self.args.debug:
+            exit(exit_code.UnknownError)
+
+
+class InvalidParamsLauncher(MetricsLauncher):
+    def _validate_params(self):
+        raise ValueError("invalid parameters")
+
+
+def build_launcher(tmp_path, *args, launcher_class=MetricsLauncher):
+    argv = ['-o', str(Path(tmp_path, 'out', 'sample'))] + list(args)
+    parsed = CommandParser("1.0", need_parameters=False).parse(argv)
+    return launcher_class(args=parsed, logger=logging.getLogger("test_metrics"))
+
+
+class TestMetrics:
+    def test_nested_spans(self):
+        metrics = LauncherMetrics()
+        with metrics.span("launch"):
+            with metrics.span("align"):
+                pass
+        assert [span.name for span in metrics.spans] == ["launch/align", "launch"]
+        assert all(span.wall_time >= 0 and span.cpu_time >= 0 for span in metrics.spans)
+        assert all(span.status == 'ok' for span in metrics.spans)
+
+    def test_span_status(self):
+        metrics = LauncherMetrics()
+        with pytest.raises(SystemExit):
+            with metrics.span("launch"):
+                exit(3)
+        assert metrics.spans[0].status == 'exit 3'
+
+    def test_launcher_metrics_file(self, tmp_path):
+        launcher = build_launcher(tmp_path, '--metrics')
+        launcher.launch()
+        metrics = json.loads(Path(tmp_path, 'out', 'sample.metrics.json').read_text())
+        assert metrics['module'] == 'MetricsLauncher'
+        assert metrics['exit_code'] == 0
+        names = [span['name'] for span in metrics['spans']]
+        assert names == [
+            'validate_args', 'read_install_config', 'read_parameters', 'read_pipeline_parameters',
+            'validate_install_config', 'validate_params', 'launch/compute', 'launch'
+        ]
+
+    def test_launcher_metrics_file_on_exit(self, tmp_path):
+        launcher = build_launcher(tmp_path, '--metrics', '-d')
+        with pytest.raises(SystemExit):
+            launcher.launch()
+        metrics = json.loads(Path(tmp_path, 'out', 'sample.metrics.json').read_text())
+        assert metrics['exit_code'] == exit_code.UnknownError
+
+    def test_launcher_metrics_file_on_validation_exit(self, tmp_path):
+        with pytest.raises(SystemExit):
+            build_launcher(tmp_path, '--metrics', launcher_class=InvalidParamsLauncher)
+        metrics = json.loads(Path(tmp_path, 'out', 'sample.metrics.json').read_text())
+        assert metrics['exit_code'] == exit_code.ValidationParamsError
+        assert metrics['spans'][-1]['name'] == 'validate_params'
+        assert list(Path(tmp_path, 'out').iterdir()) == [Path(tmp_path, 'out', 'sample.metrics.json')]
+
+    def test_launcher_without_metrics_option(self, tmp_path):
+        build_launcher(tmp_path).launch()
+        assert not Path(tmp_path, 'out', 'sample.metrics.json').exists()
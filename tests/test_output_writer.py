@@ -0,0 +1,73 @@
+from bioit_module.output_writer import BgzfWriter, OutputWriter, CSV, JSONL, TSV
+from pathlib import Path
+import gzip
+import json
+import os
+import pytest
+
+ROWS = [{'gene': 'GENE{}'.format(i), 'depth': i, 'extra': [i]} for i in range(2500)]
+
+
+class TestOutputWriter:
+    def test_csv_and_jsonl(self, tmp_path):
+        prefix = str(Path(tmp_path, 'out', 'sample_alphalist'))
+        with OutputWriter(prefix, ['gene', 'depth'], formats=(CSV, JSONL, TSV), buffer_rows=100) as output:
+            output.write_rows(ROWS)
+        lines = Path(prefix + '.csv').read_text().splitlines()
+        assert lines[:3] == ['gene,depth', 'GENE0,0', 'GENE1,1']
+        assert len(lines) == 2501
+        assert Path(prefix + '.tsv').read_text().splitlines()[1] == 'GENE0\t0'
+        records = [json.loads(line) for line in Path(prefix + '.jsonl').read_text().splitlines()]
+        assert records == ROWS
+        assert output.row_count == 2500
+        assert sorted(path.name for path in Path(tmp_path, 'out').iterdir()) == [
+            'sample_alphalist.csv', 'sample_alphalist.jsonl', 'sample_alphalist.tsv'
+        ]
+
+    def test_file_mode(self, tmp_path):
+        prefix = str(Path(tmp_path, 'out'))
+        umask = os.umask(0o022)
+        try:
+            with OutputWriter(prefix, ['gene', 'depth']) as output:
+                output.write_rows(ROWS[:10])
+        finally:
+            os.umask(umask)
+        assert os.stat(prefix + '.csv').st_mode & 0o777 == 0o644
+
+    def test_bgzip(self, tmp_path):
+        prefix = str(Path(tmp_path, 'sample'))
+        with OutputWriter(prefix, ['gene', 'depth'], formats=(CSV, JSONL), compress=True, buffer_rows=1000) as output:
+            output.write_rows(ROWS * 20)
+        data = Path(prefix + '.csv.gz').read_bytes()
+        assert data.endswith(BgzfWriter.EOF_BLOCK)
+        # BGZF: gzip members with the BC extra field
+        assert data[:4] == b'\x1f\x8b\x08\x04' and data[12:14] == b'BC'
+        with gzip.open(prefix + '.csv.gz', 'rt') as csv_file:
+            assert len(csv_file.read().splitlines()) == 50001
+        with gzip.open(prefix + '.jsonl.gz', 'rt') as jsonl_file:
+            assert json.loads(jsonl_file.readline()) == ROWS[0]
+
+    def test_no_partial_file_on_error(self, tmp_path):
+        prefix = str(Path(tmp_path, 'sample'))
+        with pytest.raises(RuntimeError):
+            with OutputWriter(prefix, ['gene'], formats=(CSV, JSONL), buffer_rows=10) as output:
+                output.write_rows(ROWS[:100])
+                raise RuntimeError("crash")
+        assert list(Path(tmp_path).iterdir()) == []
+
+    def test_serialization_error(self, tmp_path):
+        prefix = str(Path(tmp_path, 'sample'))
+        output = OutputWriter(prefix, ['gene'], formats=(CSV,))
+        output.write_row({'gene': 'A', 'unknown': 1})
+        output.close()
+        assert Path(prefix + '.csv').read_text() == 'gene\nA\n'
+        output = OutputWriter(prefix + '_bad', ['gene'], formats=(CSV, JSONL))
+        output.write_row({'gene': 'A', 'bad': float('nan')})
+        output.write_row(['not', 'a', 'dict'])
+        with pytest.raises(Exception):
+            output.close()
+        assert sorted(path.name for path in Path(tmp_path).iterdir()) == ['sample.csv']
+
+    def test_unknown_format(self, tmp_path):
+        with pytest.raises(ValueError):
+            OutputWriter(str(Path(tmp_path, 'sample')), ['gene'], formats=('xlsx',))
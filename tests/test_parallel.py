@@ -0,0 +1,127 @@
+from bioit_module import CommandParser, exception, exit_code
+from bioit_module.parallel import WorkerKilledError, get_exit_code, parallel_map
+from pathlib import Path
+from tests import get_subprocess_env
+import logging
+import os
+import signal
+import subprocess
+import sys
+import time
+import pytest
+
+PARALLEL_MODULE = '''
+from bioit_module import BioitLauncher, CommandParser, exception
+
+
+def check(value):
+    if value == 3:
+        raise exception.InvalidParametersError("invalid value 3")
+    return value
+
+
+class ParallelLauncher(BioitLauncher):
+    def launch(self):
+        self.parallel_map(check, range(10))
+
+
+if __name__ == "__main__":
+    ParallelLauncher(CommandParser(version="1.0", need_parameters=False)).launch()
+'''
+
+
+def square(value):
+    return value * value
+
+
+def add(a, b):
+    return a + b
+
+
+def log_value(value):
+    logging.getLogger("worker").info("value %s from %s", value, os.getpid())
+    return os.getpid()
+
+
+def fail_or_sleep(value):
+    if value == 0:
+        raise ValueError("task 0 failed")
+    time.sleep(10)
+
+
+def kill_self(value):
+    if value == 0:
+        os.kill(os.getpid(), signal.SIGKILL)
+    time.sleep(10)
+
+
+class ListHandler(logging.Handler):
+    def __init__(self):
+        super().__init__()
+        self.records = []
+
+    def emit(self, record):
+        self.records.append(record)
+
+
+class TestParallelMap:
+    @pytest.mark.parametrize("workers", [1, 3])
+    def test_results_in_order(self, workers):
+        assert parallel_map(square, range(100), workers=workers, chunksize=7) == [i * i for i in range(100)]
+        assert parallel_map(add, [(1, 2), (3, 4)], workers=workers, star=True) == [3, 7]
+
+    def test_worker_logs_forwarded(self):
+        logger = logging.getLogger("parallel_test")
+        logger.propagate = False
+        logger.setLevel(logging.INFO)
+        handler = ListHandler()
+        logger.addHandler(handler)
+        try:
+            pids = parallel_map(log_value, range(8), workers=2, chunksize=1, logger=logger)
+        finally:
+            logger.removeHandler(handler)
+        assert os.getpid() not in pids
+        assert sorted(record.getMessage().split()[1] for record in handler.records) == [str(i) for i in range(8)]
+
+    def test_failure_cancels_remaining_tasks(self):
+        start = time.perf_counter()
+        with pytest.raises(ValueError, match="task 0 failed"):
+            parallel_map(fail_or_sleep, range(20), workers=2, chunksize=1)
+        assert time.perf_counter() - start < 5
+
+    def test_killed_worker(self):
+        with pytest.raises(WorkerKilledError) as error:
+            parallel_map(kill_self, range(4), workers=2, chunksize=1)
+        assert error.value.exit_code == exit_code.SigKillOOM
+
+    def test_get_exit_code(self):
+        assert get_exit_code(exception.InvalidArgsError()) == exit_code.ValidationArgsError
+        assert get_exit_code(exception.InvalidParametersError()) == exit_code.ValidationParamsError
+        assert get_exit_code(MemoryError()) == exit_code.MemoryLimitError
+        assert get_exit_code(WorkerKilledError(signal.SIGTERM)) == exit_code.SigTerm
+        assert get_exit_code(ValueError()) == exit_code.UnknownError
+
+
+class TestThreadsOption:
+    def test_threads(self):
+        args = CommandParser("1.0", need_parameters=False).parse(["-o", "out", "-t", "4"])
+        assert args.threads == 4
+        assert CommandParser("1.0", need_parameters=False).parse(["-o", "out"]).threads == 1
+
+    def test_module_short_option_kept(self):
+        class TargetCommandParser(CommandParser):
+            def set_custom_option(self):
+                self.parser.add_argument("-t", "--targetfile", dest="targetfile")
+        args = TargetCommandParser("1.0", need_parameters=False).parse(["-o", "out", "-t", "targets.csv", "--threads", "2"])
+        assert (args.targetfile, args.threads) == ("targets.csv", 2)
+
+    def test_launcher_exit_code(self, tmp_path):
+        script = Path(tmp_path, 'parallel_module.py')
+        script.write_text(PARALLEL_MODULE)
+        process = subprocess.run(
+            [sys.executable, str(script), '-o', str(Path(tmp_path, 'out')), '-t', '2'],
+            env=get_subprocess_env(),
+            stdout=subprocess.PIPE, stderr=subprocess.PIPE, universal_newlines=True
+        )
+        assert process.returncode == exit_code.ValidationParamsError, process.stderr
+        assert "invalid value 3" in process.stderr
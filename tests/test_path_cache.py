@@ -0,0 +1,98 @@
+from bioit_module import path_cache
+from bioit_module.config_type import ExecutableFileType, ExistingDirType, ExistingFileType
+from bioit_module.path_cache import PathCache
+from schematics.exceptions import DataError
+from schematics.models import Model
+from pathlib import Path
+import os
+import pytest
+
+
+class InstallConfig(Model):
+    samtools = ExecutableFileType(required=True)
+    bwa = ExecutableFileType(required=True)
+    reference = ExistingFileType(required=True)
+    tmp_dir = ExistingDirType(required=True)
+
+
+@pytest.fixture
+def tools_dir(tmp_path):
+    for name in ['samtools', 'bwa']:
+        tool = Path(tmp_path, name)
+        tool.write_text("#!/bin/sh\n")
+        tool.chmod(0o755)
+    Path(tmp_path, 'genome.fa').write_text(">chr1\n")
+    Path(tmp_path, 'tmp').mkdir()
+    return tmp_path
+
+
+@pytest.fixture
+def scandir_calls(monkeypatch):
+    calls = []
+    original_scandir = os.scandir
+
+    def scandir(path):
+        calls.append(path)
+        return original_scandir(path)
+    monkeypatch.setattr(path_cache.os, 'scandir', scandir)
+    return calls
+
+
+class TestPathCache:
+    def test_checks(self, tools_dir):
+        cache = PathCache()
+        assert cache.is_file(Path(tools_dir, 'samtools'))
+        assert cache.is_executable(Path(tools_dir, 'samtools'))
+        assert not cache.is_executable(Path(tools_dir, 'genome.fa'))
+        assert not cache.is_file(Path(tools_dir, 'tmp'))
+        assert cache.is_dir(Path(tools_dir, 'tmp'))
+        assert not cache.is_file(Path(tools_dir, 'missing'))
+        assert not cache.is_file(Path(tools_dir, 'missing', 'file'))
+        assert not cache.is_file(Path(tools_dir, 'genome.fa', 'file'))
+        assert cache.is_dir('/')
+
+    def test_one_scandir_per_directory(self, tools_dir, scandir_calls):
+        cache = PathCache()
+        for name in ['samtools', 'bwa', 'genome.fa', 'missing']:
+            cache.is_file(Path(tools_dir, name))
+        assert scandir_calls == [str(tools_dir)]
+
+    def test_ttl(self, tools_dir, scandir_calls):
+        cache = PathCache(ttl=0)
+        assert not cache.is_file(Path(tools_dir, 'new'))
+        Path(tools_dir, 'new').touch()
+        assert cache.is_file(Path(tools_dir, 'new'))
+        assert len(scandir_calls) == 2
+
+    def test_invalidate(self, tools_dir):
+        cache = PathCache()
+        assert not cache.is_file(Path(tools_dir, 'new'))
+        Path(tools_dir, 'new').touch()
+        assert not cache.is_file(Path(tools_dir, 'new'))
+        cache.invalidate(Path(tools_dir, 'new'))
+        assert cache.is_file(Path(tools_dir, 'new'))
+
+
+class TestConfigTypes:
+    def test_valid(self, tools_dir, monkeypatch):
+        monkeypatch.setattr(path_cache, '_path_cache', PathCache())
+        config = InstallConfig({
+            'samtools': str(Path(tools_dir, 'samtools')), 'bwa': str(Path(tools_dir, 'bwa')),
+            'reference': str(Path(tools_dir, 'genome.fa')), 'tmp_dir': str(Path(tools_dir, 'tmp')),
+        })
+        config.validate()
+
+    def test_invalid(self, tools_dir, monkeypatch):
+        monkeypatch.setattr(path_cache, '_path_cache', PathCache())
+        config = InstallConfig({
+            'samtools': str(Path(tools_dir, 'genome.fa')), 'bwa': str(Path(tools_dir, 'missing')),
+            'reference': str(Path(tools_dir, 'tmp')), 'tmp_dir': str(Path(tools_dir, 'genome.fa')),
+        })
+        with pytest.raises(DataError) as error:
+            config.validate()
+        assert error.value.to_primitive() == {
+            'samtools': ["File isn't executable"],
+            'bwa': ["File doesn't exist"],
+            'reference': ["File doesn't exist"],
+            'tmp_dir': ["Directory doesn't exist"],
+        }
@@ -0,0 +1,93 @@
+from bioit_module.reference_catalog import ReferenceCatalog
+from pathlib import Path
+import os
+import pytest
+
+
+@pytest.fixture
+def reference_dir(tmp_path):
+    Path(tmp_path, 'genome.fa').touch()
+    Path(tmp_path, 'panel.bed').touch()
+    Path(tmp_path, 'gtf').mkdir()
+    Path(tmp_path, 'gtf', 'gencode.v38.annotation.gtf').touch()
+    Path(tmp_path, 'gtf', 'gencode.v38.collapsed.gtf').touch()
+    Path(tmp_path, 'UHRR_v38').mkdir()
+    Path(tmp_path, 'UHRR_v38', 'a.bam').touch()
+    Path(tmp_path, 'UHRR_v38', 'a.bam.bai').touch()
+    return tmp_path
+
+
+class TestReferenceCatalog:
+    def test_lookups(self, reference_dir):
+        catalog = ReferenceCatalog(reference_dir)
+        assert catalog.get_fasta_files() == [Path(reference_dir, 'genome.fa')]
+        assert catalog.get_bed_files() == [Path(reference_dir, 'panel.bed')]
+        assert catalog.get_UHRR_bams(38) == [str(Path(reference_dir, 'UHRR_v38', 'a.bam'))]
+        assert catalog.get_gtf_file(38) == Path(reference_dir, 'gtf', 'gencode.v38.annotation.gtf')
+        assert catalog.get_gtf_collapse_file(38) == Path(reference_dir, 'gtf', 'gencode.v38.collapsed.gtf')
+
+    def test_unknown_gtf_version_default_path(self, reference_dir):
+        catalog = ReferenceCatalog(reference_dir)
+        assert catalog.get_gtf_file(12) == Path(reference_dir, 'gtf', 'gencode.v12.annotation.gtf')
+
+    def test_directory_listed_once(self, reference_dir, monkeypatch):
+        catalog = ReferenceCatalog(reference_dir)
+        catalog.get_fasta_files()
+        catalog.get_fasta_files()
+        listed = []
+        original_iterdir = Path.iterdir
+
+        def counting_iterdir(path):
+            listed.append(path)
+            return original_iterdir(path)
+        monkeypatch.setattr(Path, 'iterdir', counting_iterdir)
+        catalog.get_fasta_files()
+        catalog.get_bed_files()
+        assert listed == []
+
+    def test_manifest_reused_by_new_process(self, reference_dir, monkeypatch):
+        ReferenceCatalog(reference_dir).get_fasta_files()
+        # Manifest creation changes the directory mtime: the second scan stabilizes it
+        ReferenceCatalog(reference_dir).get_fasta_files()
+        assert ReferenceCatalog(reference_dir).manifest_file.is_file()
+
+        def failing_iterdir(path):
+            raise AssertionError("directory listed")
+        monkeypatch.setattr(Path, 'iterdir', failing_iterdir)
+        assert ReferenceCatalog(reference_dir).get_fasta_files() == [Path(reference_dir, 'genome.fa')]
+
+    def test_manifest_relative_to_reference_dir(self, reference_dir, monkeypatch):
+        monkeypatch.chdir(reference_dir.parent)
+        relative_dir = reference_dir.name
+        assert ReferenceCatalog(relative_dir).get_fasta_files() == [Path(relative_dir, 'genome.fa')]
+        # Same manifest read from another working directory with an absolute path
+        monkeypatch.chdir(Path(reference_dir, 'gtf'))
+        catalog = ReferenceCatalog(reference_dir)
+        assert catalog.get_fasta_files() == [Path(reference_dir, 'genome.fa')]
+        assert catalog.get_UHRR_bams(38) == [str(Path(reference_dir, 'UHRR_v38', 'a.bam'))]
+
+    def test_manifest_not_rewritten_if_unchanged(self, reference_dir):
+        def lookups():
+            catalog = ReferenceCatalog(reference_dir)
+            catalog.get_fasta_files()
+            catalog.get_UHRR_bams(38)
+            catalog.get_gtf_file(38)
+            return catalog
+        lookups()
+        manifest_file = lookups().manifest_file
+        mtime = os.stat(str(manifest_file)).st_mtime_ns
+        lookups()
+        assert os.stat(str(manifest_file)).st_mtime_ns == mtime
+
+    def test_invalidated_by_directory_mtime(self, reference_dir):
+        catalog = ReferenceCatalog(reference_dir)
+        assert len(catalog.get_bed_files()) == 1
+        Path(reference_dir, 'other.bed').touch()
+        stat = os.stat(str(reference_dir))
+        os.utime(str(reference_dir), ns=(stat.st_atime_ns, stat.st_mtime_ns + 10 ** 9))
+        assert len(catalog.get_bed_files()) == 2
+
+    def test_get_shared_instance(self, reference_dir):
+        ReferenceCatalog.clear()
+        assert ReferenceCatalog.get(reference_dir) is ReferenceCatalog.get(str(reference_dir))
+        ReferenceCatalog.clear()
@@ -0,0 +1,137 @@
+from bioit_module import BioitLauncher, CommandParser, exit_code
+from bioit_module import reference_integrity
+from bioit_module.config_cache import ConfigCache
+from bioit_module.reference_catalog import ReferenceCatalog
+from bioit_module.reference_integrity import IntegrityIndex, hash_file
+from bioit_module.reference_resolver import ReferenceResolver
+from pathlib import Path
+import hashlib
+import os
+import pytest
+
+
+class VerifiedLauncher(BioitLauncher):
+    verify_references = True
+    cache_configs = False
+
+    def launch(self):
+        pass
+
+
+class CachedVerifiedLauncher(VerifiedLauncher):
+    cache_configs = True
+    config_cache = ConfigCache()
+
+
+@pytest.fixture
+def reference_dir(tmp_path, monkeypatch):
+    monkeypatch.setenv('BIOIT_CACHE_DIR', str(Path(tmp_path, 'cache')))
+    ReferenceCatalog.clear()
+    ReferenceResolver.clear()
+    reference_dir = Path(tmp_path, 'reference')
+    Path(reference_dir, 'gtf').mkdir(parents=True)
+    Path(reference_dir, 'UHRR_v38').mkdir()
+    Path(reference_dir, 'genome.fa').write_text(">chr1\nACGT\n")
+    Path(reference_dir, 'panel.bed').write_text("chr1\t0\t4\n")
+    Path(reference_dir, 'gtf', 'gencode.v38.annotation.gtf').write_text("gtf\n")
+    Path(reference_dir, 'gtf', 'gencode.v38.collapsed.gtf').write_text("collapsed\n")
+    Path(reference_dir, 'UHRR_v38', 'a.bam').write_bytes(b"bam" * 1000)
+    yield reference_dir
+    ReferenceCatalog.clear()
+    ReferenceResolver.clear()
+
+
+def touch_later(path):
+    stat = os.stat(str(path))
+    os.utime(str(path), ns=(stat.st_atime_ns, stat.st_mtime_ns + 10 ** 9))
+
+
+class TestIntegrityIndex:
+    def test_hash_file(self, tmp_path):
+        data = os.urandom(100000)
+        Path(tmp_path, 'data').write_bytes(data)
+        assert hash_file(str(Path(tmp_path, 'data')), block_size=4096) == hashlib.sha256(data).hexdigest()
+
+    def test_update_only_changed(self, reference_dir, monkeypatch):
+        index = IntegrityIndex(reference_dir)
+        assert sorted(Path(filename).name for filename in index.update()) == [
+            'a.bam', 'gencode.v38.annotation.gtf', 'gencode.v38.collapsed.gtf', 'genome.fa', 'panel.bed'
+        ]
+        assert Path(reference_dir, IntegrityIndex.MANIFEST_DIR, IntegrityIndex.MANIFEST_NAME).is_file()
+        hashed = []
+        original_hash_file = reference_integrity.hash_file
+
+        def counting_hash_file(filename, algorithm):
+            hashed.append(filename)
+            return original_hash_file(filename, algorithm)
+        monkeypatch.setattr(reference_integrity, 'hash_file', counting_hash_file)
+        index = IntegrityIndex(reference_dir)
+        assert index.update() == []
+        Path(reference_dir, 'genome.fa').write_text(">chr1\nACGTT\n")
+        assert index.update() == [str(Path(reference_dir, 'genome.fa'))]
+        assert hashed == [str(Path(reference_dir, 'genome.fa'))]
+
+    def test_verify(self, reference_dir):
+        index = IntegrityIndex(reference_dir)
+        assert set(index.verify().values()) == {"not indexed"}
+        index.update()
+        assert index.verify() == {}
+        assert index.verify(full=True) == {}
+        bam = Path(reference_dir, 'UHRR_v38', 'a.bam')
+        stat = os.stat(str(bam))
+        # Same size and mtime: only the full verification sees it
+        bam.write_bytes(b"BAM" * 1000)
+        os.utime(str(bam), ns=(stat.st_atime_ns, stat.st_mtime_ns))
+        assert IntegrityIndex(reference_dir).verify() == {}
+        assert IntegrityIndex(reference_dir).verify(full=True) == {str(bam): "content changed"}
+        touch_later(Path(reference_dir, 'panel.bed'))
+        assert IntegrityIndex(reference_dir).verify() == {str(Path(reference_dir, 'panel.bed')): "size or mtime changed"}
+        Path(reference_dir, 'genome.fa').unlink()
+        ReferenceResolver.clear()
+        assert IntegrityIndex(reference_dir).verify()[str(Path(reference_dir, 'genome.fa'))] == "missing"
+
+    def test_manifest_readable_by_others(self, reference_dir):
+        umask = os.umask(0o022)
+        try:
+            IntegrityIndex(reference_dir).update()
+        finally:
+            os.umask(umask)
+        assert os.stat(str(Path(reference_dir, IntegrityIndex.MANIFEST_DIR, IntegrityIndex.MANIFEST_NAME))).st_mode & 0o777 == 0o644
+
+    def test_update_keeps_reference_dir_mtime(self, reference_dir):
+        index = IntegrityIndex(reference_dir)
+        index.update()
+        mtime = os.stat(str(reference_dir)).st_mtime_ns
+        Path(reference_dir, 'genome.fa').write_text(">chr1\nACGTT\n")
+        index.update()
+        assert os.stat(str(reference_dir)).st_mtime_ns == mtime
+
+    def test_newest_manifest_loaded(self, reference_dir):
+        IntegrityIndex(reference_dir).update()
+        stale, newest = IntegrityIndex(reference_dir).get_manifest_files()
+        Path(newest).parent.mkdir(parents=True, exist_ok=True)
+        Path(newest).write_text(Path(stale).read_text())
+        Path(stale).write_text("{}")
+        touch_later(newest)
+        assert IntegrityIndex(reference_dir).verify() == {}
+
+    def test_main(self, reference_dir):
+        assert reference_integrity.main([str(reference_dir), '--verify']) == 1
+        assert reference_integrity.main([str(reference_dir)]) == 0
+        assert reference_integrity.main([str(reference_dir), '--verify', '--full']) == 0
+
+    @pytest.mark.parametrize("launcher_class", [VerifiedLauncher, CachedVerifiedLauncher])
+    def test_launcher_verify(self, reference_dir, tmp_path, launcher_class):
+        IntegrityIndex(reference_dir).update()
+        pipe_params = Path(tmp_path, 'pipe.ini')
+        pipe_params.write_text("[PIPE_CONFIG]\ngencode_version = 38\n")
+        command_parser = CommandParser("1.0", need_parameters=False, need_pipeline_parameters=True)
+        args = command_parser.parse([
+            '-o', str(Path(tmp_path, 'out')), '--pipe_params', str(pipe_params), '--reference_dir', str(reference_dir)
+        ])
+        launcher_class(args=args)
+        touch_later(Path(reference_dir, 'gtf', 'gencode.v38.annotation.gtf'))
+        # With the config cache, the pipeline parameters aren't read again: the assets are still verified
+        with pytest.raises(SystemExit) as error:
+            launcher_class(args=args)
+        assert error.value.code == exit_code.ValidationError
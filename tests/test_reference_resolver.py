@@ -0,0 +1,123 @@
+from bioit_module import BioitLauncher, CommandParser, exit_code
+from bioit_module.config_cache import ConfigCache
+from bioit_module.reference_catalog import ReferenceCatalog
+from bioit_module.reference_resolver import BED, FASTA, GTF, ReferenceResolver
+from schematics.exceptions import ValidationError
+from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor
+import pytest
+
+
+class ReferenceLauncher(BioitLauncher):
+    required_references = (GTF, FASTA)
+    cache_configs = False
+
+    def launch(self):
+        pass
+
+
+class CachedReferenceLauncher(ReferenceLauncher):
+    cache_configs = True
+    config_cache = ConfigCache()
+
+
+@pytest.fixture
+def reference_dir(tmp_path):
+    ReferenceCatalog.clear()
+    ReferenceResolver.clear()
+    reference_dir = Path(tmp_path, 'reference')
+    Path(reference_dir, 'gtf').mkdir(parents=True)
+    Path(reference_dir, 'genome.fa').touch()
+    Path(reference_dir, 'panel.bed').touch()
+    for version in ['38', '40']:
+        Path(reference_dir, 'gtf', 'gencode.v{}.annotation.gtf'.format(version)).touch()
+        Path(reference_dir, 'gtf', 'gencode.v{}.collapsed.gtf'.format(version)).touch()
+    Path(reference_dir, 'gtf', 'gencode.v9.annotation.gtf').touch()
+    Path(reference_dir, 'UHRR_v38').mkdir()
+    Path(reference_dir, 'UHRR_v38', 'a.bam').touch()
+    yield reference_dir
+    ReferenceCatalog.clear()
+    ReferenceResolver.clear()
+
+
+class TestReferenceResolver:
+    def test_load_every_version(self, reference_dir):
+        resolver = ReferenceResolver(reference_dir)
+        assert resolver.get_versions() == ['9', '38', '40']
+        reference = resolver.resolve(38)
+        assert reference.get_gtf_file() == Path(reference_dir, 'gtf', 'gencode.v38.annotation.gtf')
+        assert reference.get_fasta_ref() == Path(reference_dir, 'genome.fa')
+        assert reference.get_UHRR_bam() == [str(Path(reference_dir, 'UHRR_v38', 'a.bam'))]
+        assert resolver.get_invalid().keys() == {'9', '40'}
+        assert sorted(resolver.get_invalid()['9']) == ['UHRR', 'gtf_collapse']
+        assert sorted(resolver.get_invalid()['40']) == ['UHRR']
+
+    def test_fail_fast(self, reference_dir):
+        resolver = ReferenceResolver(reference_dir)
+        assert resolver.resolve(40, [GTF, FASTA, BED]).gencode_version == '40'
+        with pytest.raises(ValidationError, match="UHRR"):
+            resolver.resolve(40)
+        with pytest.raises(ValidationError, match="UHRR"):
+            resolver.resolve(40, []).get_UHRR_bam()
+        with pytest.raises(ValidationError, match="gtf"):
+            resolver.resolve(12, [GTF])
+
+    def test_resolve_only_requested_version(self, reference_dir, monkeypatch):
+        resolved = []
+        original_resolve = ReferenceResolver._resolve
+
+        def recording_resolve(resolver, version):
+            resolved.append(version)
+            return original_resolve(resolver, version)
+        monkeypatch.setattr(ReferenceResolver, '_resolve', recording_resolve)
+        resolver = ReferenceResolver(reference_dir)
+        resolver.resolve(38, [GTF])
+        resolver.resolve(38, [GTF])
+        assert resolved == ['38']
+        resolver.resolve(38, [GTF], refresh=True)
+        assert resolved == ['38', '38']
+
+    def test_warm_lookups(self, reference_dir, monkeypatch):
+        resolver = ReferenceResolver(reference_dir)
+        resolver.load()
+
+        def fail_iterdir(path):
+            raise AssertionError("directory listed again")
+        monkeypatch.setattr(Path, 'iterdir', fail_iterdir)
+        with ThreadPoolExecutor(8) as executor:
+            references = list(executor.map(lambda i: resolver.resolve(38), range(100)))
+        assert all(reference is references[0] for reference in references)
+
+    def test_reload(self, reference_dir):
+        resolver = ReferenceResolver(reference_dir)
+        assert '40' in resolver.get_invalid()
+        Path(reference_dir, 'UHRR_v40').mkdir()
+        Path(reference_dir, 'UHRR_v40', 'b.bam').touch()
+        resolver.reload()
+        assert '40' not in resolver.get_invalid()
+
+    def test_launcher_required_references(self, reference_dir, tmp_path):
+        pipe_params = Path(tmp_path, 'pipe.ini')
+        command_parser = CommandParser("1.0", need_parameters=False, need_pipeline_parameters=True)
+        argv = ['-o', str(Path(tmp_path, 'out')), '--pipe_params', str(pipe_params), '--reference_dir', str(reference_dir)]
+        pipe_params.write_text("[PIPE_CONFIG]\ngencode_version = 38\n")
+        launcher = ReferenceLauncher(args=command_parser.parse(argv))
+        assert launcher.get_reference().get_bed_ref() == Path(reference_dir, 'panel.bed')
+        Path(reference_dir, 'genome.fa').unlink()
+        ReferenceCatalog.clear()
+        ReferenceResolver.clear()
+        with pytest.raises(SystemExit) as error:
+            ReferenceLauncher(args=command_parser.parse(argv))
+        assert error.value.code == exit_code.ValidationError
+
+    def test_launcher_required_references_cached_config(self, reference_dir, tmp_path):
+        pipe_params = Path(tmp_path, 'pipe.ini')
+        pipe_params.write_text("[PIPE_CONFIG]\ngencode_version = 38\n")
+        command_parser = CommandParser("1.0", need_parameters=False, need_pipeline_parameters=True)
+        argv = ['-o', str(Path(tmp_path, 'out')), '--pipe_params', str(pipe_params), '--reference_dir', str(reference_dir)]
+        CachedReferenceLauncher(args=command_parser.parse(argv))
+        Path(reference_dir, 'gtf', 'gencode.v38.annotation.gtf').unlink()
+        # The pipeline parameters come from the cache, the assets are checked again
+        with pytest.raises(SystemExit) as error:
+            CachedReferenceLauncher(args=command_parser.parse(argv))
+        assert error.value.code == exit_code.ValidationError
@@ -0,0 +1,79 @@
+import os
+import re
+import subprocess
+import sys
+from pathlib import Path
+from tests import get_subprocess_env
+import pytest
+
+# Import time budget of a minimal module answering --version, in microseconds. The default is about 3 times the
+# usual ~30ms so a loaded CI host passes, BIOIT_STARTUP_BUDGET_US sets a tighter (or looser) one
+STARTUP_BUDGET_US = int(os.environ.get("BIOIT_STARTUP_BUDGET_US", 100000))
+
+MINIMAL_MODULE = '''
+from bioit_module import BioitLauncher, CommandParser
+
+
+class MinimalCommandParser(CommandParser):
+    pass
+
+
+class MinimalLauncher(BioitLauncher):
+    def launch(self):
+        pass
+
+
+MinimalLauncher(MinimalCommandParser(version="1.0", need_parameters=False)).launch()
+'''
+
+
+def run_importtime(script, *args):
+    """
+    Run a script with -X importtime, return the top level imports done by the script: {package: cumulative us}
+    """
+    env = get_subprocess_env()
+    process = subprocess.run(
+        [sys.executable, "-X", "importtime", str(script)] + list(args),
+        stdout=subprocess.PIPE, stderr=subprocess.PIPE, env=env, universal_newlines=True, check=True
+    )
+    imports = {}
+    started = False
+    for line in process.stderr.splitlines():
+        match = re.match(r"^import time:\s+\d+ \|\s+(\d+) \| (\S.*)$", line)
+        if not match:
+            continue
+        # Everything before bioit_module is interpreter startup
+        started = started or match.group(2) == 'bioit_module'
+        if started:
+            imports[match.group(2)] = int(match.group(1))
+    return imports
+
+
+@pytest.fixture
+def minimal_module(tmp_path):
+    script = Path(tmp_path, 'minimal_module.py')
+    script.write_text(MINIMAL_MODULE)
+    return script
+
+
+class TestStartup:
+    def test_version_does_not_import_schematics(self, minimal_module):
+        imports = run_importtime(minimal_module, '--version')
+        assert 'bioit_module' in imports
+        assert not [package for package in imports if package.startswith('schematics')]
+        assert 'configparser' not in imports
+
+    def test_version_startup_budget(self, minimal_module):
+        budget = STARTUP_BUDGET_US
+        imports = run_importtime(minimal_module, '--version')
+        startup = sum(imports.values())
+        assert startup <= budget, "Startup import time {}us exceeds budget {}us: {}".format(
+            startup, budget, sorted(imports.items(), key=lambda item: -item[1])
+        )
+
+    def test_lazy_names(self):
+        import bioit_module
+        assert bioit_module.CommandParser.__name__ == 'CommandParser'
+        assert bioit_module.exit_code.UnknownError == 1
+        with pytest.raises(AttributeError):
+            bioit_module.Unknown
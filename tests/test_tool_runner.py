@@ -0,0 +1,99 @@
+from bioit_module import BioitLauncher, CommandParser, exit_code
+from bioit_module.tool_runner import ToolError, ToolRunner, get_signal_exit_code
+from pathlib import Path
+import logging
+import signal
+import sys
+import threading
+import time
+import pytest
+
+
+class InstallConfig:
+    python = sys.executable
+
+
+class ToolLauncher(BioitLauncher):
+    def read_install_config(self):
+        return InstallConfig()
+
+    def launch(self):
+        self.run_tool("python", ["-c", "import os, signal; os.kill(os.getpid(), signal.SIGSEGV)"])
+
+
+def python(code):
+    return ["-c", code]
+
+
+class TestToolRunner:
+    def test_stdout_to_file_and_callback(self, tmp_path):
+        runner = ToolRunner(InstallConfig())
+        output = Path(tmp_path, 'out.txt')
+        result = runner.run("python", python("print('a'); print('b')"), stdout=str(output))
+        assert result.ok and output.read_text() == "a\nb\n"
+        assert result.command[0] == sys.executable
+        assert result.wall_time > 0 and result.cpu_time > 0
+        lines = []
+        runner.run("python", python("import sys; print('x'); print('y', file=sys.stderr)"), stdout=lines.append,
+                   stderr=lines.append)
+        assert sorted(lines) == [b"x\n", b"y\n"]
+
+    def test_logged(self, caplog):
+        with caplog.at_level(logging.DEBUG):
+            ToolRunner(InstallConfig()).run("python", python("print('hello')"))
+        assert "[python stdout] hello" in caplog.text
+        record = [record for record in caplog.records if hasattr(record, "tool")][0]
+        assert record.tool["returncode"] == 0 and record.tool["cpu_time"] is not None
+
+    def test_stream(self):
+        runner = ToolRunner(InstallConfig())
+        with runner.stream("python", python("for i in range(3): print(i)")) as lines:
+            assert [int(line) for line in lines] == [0, 1, 2]
+        # Lines left unread: the tool is terminated, not an error
+        with runner.stream("python", python("while True: print('y' * 100)")) as lines:
+            assert next(lines) == b"y" * 100 + b"\n"
+
+    def test_failure(self):
+        runner = ToolRunner(InstallConfig())
+        with pytest.raises(ToolError) as error:
+            runner.run("python", python("import sys; print('bad input', file=sys.stderr); sys.exit(2)"))
+        assert error.value.result.returncode == 2
+        assert error.value.exit_code == exit_code.UnknownError
+        assert "bad input" in str(error.value)
+        assert runner.run("python", python("import sys; sys.exit(2)"), check=False).returncode == 2
+
+    @pytest.mark.parametrize("signal_number, code", [
+        (signal.SIGSEGV, exit_code.SigSegv), (signal.SIGKILL, exit_code.SigKillOOM), (signal.SIGTERM, exit_code.SigTerm),
+    ])
+    def test_signal_exit_code(self, signal_number, code):
+        with pytest.raises(ToolError) as error:
+            ToolRunner(InstallConfig()).run(
+                "python", python("import os; os.kill(os.getpid(), {})".format(int(signal_number)))
+            )
+        assert error.value.signal_number == signal_number
+        assert error.value.exit_code == code
+        assert get_signal_exit_code(signal.SIGINT) == 130
+
+    def test_concurrency_cap(self):
+        runner = ToolRunner(InstallConfig(), max_concurrent=2)
+        running = []
+        lock = threading.Lock()
+
+        def count(line):
+            with lock:
+                running.append(line)
+        start = time.perf_counter()
+        results = runner.run_many([("python", python("import time; time.sleep(0.3); print(1)"), {"stdout": count})] * 4)
+        assert len(results) == 4 and all(result.ok for result in results)
+        # 4 tools of 0.3s, 2 at a time
+        assert time.perf_counter() - start >= 0.6
+        assert len(running) == 4
+
+
+class TestRunTool:
+    def test_launcher_exit_code(self, tmp_path):
+        args = CommandParser("1.0", need_parameters=False).parse(['-o', str(Path(tmp_path, 'out'))])
+        launcher = ToolLauncher(args=args)
+        with pytest.raises(SystemExit) as error:
+            launcher.launch()
+        assert error.value.code == exit_code.SigSegv
@@ -0,0 +1,106 @@
+from bioit_module import BioitLauncher, CommandParser, exit_code
+from bioit_module.worker import LauncherWorker
+from pathlib import Path
+import io
+import json
+import socket
+import threading
+import time
+import pytest
+
+
+class JobCommandParser(CommandParser):
+    def set_custom_option(self):
+        self.parser.add_argument("--value", dest="value", required=True, type=self._is_valid_integer)
+
+
+class JobLauncher(BioitLauncher):
+    read_count = 0
+
+    def read_parameters(self):
+        JobLauncher.read_count += 1
+        return self._read_config_file(self.args.params).get("ANALYSIS", "factor")
+
+    def launch(self):
+        print("printed by launch")
+        if self.args.value == 0:
+            exit(exit_code.ValidationParamsError)
+        Path(self.args.prefix + ".txt").write_text(str(self.args.value * int(self.params)))
+
+
+@pytest.fixture
+def shared_argv(tmp_path):
+    params = Path(tmp_path, 'params.ini')
+    params.write_text("[ANALYSIS]\nfactor = 3\n")
+    return ['-p', str(params)]
+
+
+def job(tmp_path, job_id, value):
+    return json.dumps({"id": job_id, "argv": ['-o', str(Path(tmp_path, job_id)), '--value', value]}) + "\n"
+
+
+class TestLauncherWorker:
+    def test_stream(self, tmp_path, shared_argv):
+        JobLauncher.read_count = 0
+        worker = LauncherWorker(JobLauncher, JobCommandParser("1.0"), shared_argv)
+        requests = io.StringIO(
+            job(tmp_path, 'a', '2') + job(tmp_path, 'b', '0') + job(tmp_path, 'c', 'x') + "not json\n"
+            + '{"command": "shutdown"}\n' + job(tmp_path, 'd', '1')
+        )
+        output = io.StringIO()
+        worker.serve_stream(requests, output)
+        responses = [json.loads(line) for line in output.getvalue().splitlines()]
+        assert [(response['id'], response['exit_code']) for response in responses] == [
+            ('a', 0), ('b', exit_code.ValidationParamsError), ('c', exit_code.ValidationArgsError),
+            (None, exit_code.ValidationArgsError)
+        ]
+        assert Path(tmp_path, 'a.txt').read_text() == '6'
+        assert not Path(tmp_path, 'd.txt').exists()
+        assert JobLauncher.read_count == 1
+
+    def test_malformed_requests(self, tmp_path, shared_argv):
+        worker = LauncherWorker(JobLauncher, JobCommandParser("1.0"), shared_argv)
+        requests = io.StringIO(
+            '[1]\n' + '{"id": "b", "argv": ["-o", 5]}\n' + '{"id": "c", "argv": "-o x"}\n' + job(tmp_path, 'd', '1')
+        )
+        output = io.StringIO()
+        worker.serve_stream(requests, output)
+        responses = [json.loads(line) for line in output.getvalue().splitlines()]
+        assert [(response['id'], response['exit_code']) for response in responses] == [
+            (None, exit_code.ValidationArgsError), ('b', exit_code.ValidationArgsError),
+            ('c', exit_code.ValidationArgsError), ('d', 0)
+        ]
+
+    def test_job_error(self, tmp_path, shared_argv, monkeypatch):
+        worker = LauncherWorker(JobLauncher, JobCommandParser("1.0"), shared_argv)
+
+        def parse(argv):
+            raise RuntimeError("parser failure")
+        monkeypatch.setattr(worker.command_parser, "parse", parse)
+        assert worker.handle_request(job(tmp_path, 'a', '1'))['exit_code'] == exit_code.UnknownError
+
+    def test_socket(self, tmp_path, shared_argv):
+        socket_path = str(Path(tmp_path, 'worker.sock'))
+        worker = LauncherWorker(JobLauncher, JobCommandParser("1.0"), shared_argv + ['--socket', socket_path])
+        thread = threading.Thread(target=worker.serve)
+        thread.start()
+        for _ in range(100):
+            if Path(socket_path).exists():
+                break
+            time.sleep(0.05)
+        client = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        client.connect(socket_path)
+        stream = client.makefile('rw')
+        stream.write(job(tmp_path, 'a', '5'))
+        stream.flush()
+        assert json.loads(stream.readline())['exit_code'] == 0
+        stream.write('{"command": "shutdown"}\n')
+        stream.flush()
+        thread.join(timeout=10)
+        client.close()
+        assert not thread.is_alive()
+        assert Path(tmp_path, 'a.txt').read_text() == '15'
+
+    def test_workers_at_least_one(self, shared_argv):
+        with pytest.raises(SystemExit):
+            LauncherWorker(JobLauncher, JobCommandParser("1.0"), shared_argv + ['--workers', '0'])